@@ -0,0 +1,76 @@
+"""Compara conexão por chamada (modo antigo) com a conexão persistente.
+
+Uso (a partir de src/):  python -m benchmarks.bench_conexao [n_operacoes]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+import models.db as db
+
+def _legado(caminho):
+    """Reproduz o padrão antigo: abre, executa, commita e fecha a cada chamada."""
+    def salvar_cliente(*dados):
+        conn = sqlite3.connect(caminho)
+        conn.cursor().execute("""
+            INSERT INTO clientes (nome, telefone, endereco, carro, placa, ano, km, observacoes, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'Aberto')
+        """, dados)
+        conn.commit()
+        conn.close()
+
+    def atualizar_status(id_cliente, novo_status):
+        conn = sqlite3.connect(caminho)
+        conn.cursor().execute("UPDATE clientes SET status=? WHERE id=?", (novo_status, id_cliente))
+        conn.commit()
+        conn.close()
+
+    def calcular_total_dia(data_str):
+        conn = sqlite3.connect(caminho)
+        c = conn.cursor()
+        c.execute("SELECT SUM(valor_total) FROM historico_servicos WHERE data_servico = ?", (data_str,))
+        res = c.fetchone()[0]
+        conn.close()
+        return res if res else 0.0
+
+    return salvar_cliente, atualizar_status, calcular_total_dia
+
+def _medir(nome, funcao, n):
+    inicio = time.perf_counter()
+    for i in range(n):
+        funcao(i)
+    duracao = time.perf_counter() - inicio
+    return nome, n / duracao if duracao else float("inf")
+
+def _rodada(salvar_cliente, atualizar_status, calcular_total_dia, n):
+    cliente = ("Fulano", "21999999999", "Rua A, 1", "Gol", "ABC1D23", "2015", "80000", "")
+    return [
+        _medir("salvar_cliente", lambda i: salvar_cliente(*cliente), n),
+        _medir("atualizar_status", lambda i: atualizar_status(i % n + 1, "Em Andamento"), n),
+        _medir("calcular_total_dia", lambda i: calcular_total_dia("01/01/2024"), n),
+    ]
+
+def main(n=500):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_antes = os.path.join(pasta, "antes.db")
+        caminho_depois = os.path.join(pasta, "depois.db")
+
+        # Antes: banco sem pragmas, conexão nova por operação
+        db.configurar(caminho_antes, pragmas={})
+        db.criar_tabelas()  # o esquema só é criado na primeira conexão
+        db.fechar_conexao()
+        antes = _rodada(*_legado(caminho_antes), n)
+
+        # Depois: API db.* sobre a conexão persistente e ajustada
+        db.configurar(caminho_depois)
+        depois = _rodada(db.salvar_cliente, db.atualizar_status, db.calcular_total_dia, n)
+        db.fechar_conexao()
+
+    print(f"{'operação':<22}{'antes (ops/s)':>16}{'depois (ops/s)':>16}{'ganho':>9}")
+    for (nome, a), (_, d) in zip(antes, depois):
+        print(f"{nome:<22}{a:>16,.0f}{d:>16,.0f}{d / a:>8.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,124 @@
+"""Gera uma base sintética de oficina em escala de produção.
+
+Uso (a partir de src/):
+    python -m benchmarks.gerar_dados --destino /tmp/oficina.db
+    python -m benchmarks.gerar_dados --destino /tmp/oficina.db --clientes 100000 --notas 1000000 --produtos 20000
+
+A mesma semente sempre gera a mesma base.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import models.db as db
+
+NOMES = ["Ana", "Bruno", "Carlos", "Daniela", "Eduardo", "Fernanda", "Gabriel", "Helena", "Igor", "Juliana",
+         "Lucas", "Mariana", "Nelson", "Patrícia", "Rafael", "Sabrina", "Thiago", "Vanessa", "Wagner", "João"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida",
+              "Nascimento", "Carvalho", "Gomes", "Martins", "Araújo", "Ribeiro", "Barbosa", "Diniz"]
+CARROS = ["Gol", "Uno", "Palio", "Onix", "HB20", "Corsa", "Celta", "Fiesta", "Ka", "Sandero", "Civic",
+          "Corolla", "Strada", "Saveiro", "Fox", "Kwid", "Argo", "Cruze", "Polo", "Tracker"]
+RUAS = ["Av Almirante Tamandaré", "Rua Dr. Paulo César", "Estrada Francisco da Cruz Nunes", "Rua Noronha Torrezão",
+        "Av Sete de Setembro", "Rua Mário Viana", "Estrada Fróes", "Rua Gavião Peixoto"]
+PECAS = ["Filtro de óleo", "Filtro de ar", "Filtro de combustível", "Vela de ignição", "Bateria 60Ah",
+         "Alternador", "Motor de arranque", "Relé", "Fusível", "Lâmpada farol", "Pastilha de freio",
+         "Disco de freio", "Amortecedor", "Correia dentada", "Bomba d'água", "Sensor de temperatura",
+         "Bobina de ignição", "Cabo de vela", "Óleo 5W30", "Fluido de freio"]
+SERVICOS = ["Mão de obra", "Diagnóstico elétrico", "Revisão", "Troca de óleo", "Alinhamento", "Balanceamento"]
+STATUS = ["Aberto", "Aguardando Peça", "Em Andamento", "Concluído", "Entregue"]
+UID = "lower(hex(randomblob(16)))"   # como a API grava: o registro de alterações identifica as linhas por ele
+
+def _placa(rnd):
+    letras = "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+    if rnd.random() < 0.5:
+        return f"{letras}{rnd.randint(0, 9999):04d}"
+    return f"{letras}{rnd.randint(0, 9)}{rnd.choice('ABCDEFGHIJ')}{rnd.randint(0, 99):02d}"
+
+def _clientes(rnd, n):
+    for _ in range(n):
+        yield (f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}",
+               f"(21) 9{rnd.randint(6000, 9999)}-{rnd.randint(0, 9999):04d}",
+               f"{rnd.choice(RUAS)}, {rnd.randint(1, 2000)}",
+               rnd.choice(CARROS), _placa(rnd), str(rnd.randint(1995, 2025)),
+               str(rnd.randint(0, 300000)), "", rnd.choice(STATUS))
+
+def _produtos(rnd, n):
+    for i in range(n):
+        base = rnd.choice(PECAS)
+        yield f"{base} {i:05d}", round(rnd.uniform(5, 900), 2)
+
+def _notas(rnd, n, n_clientes, catalogo, anos):
+    hoje = date.today()
+    dias = 365 * anos
+    for id_nota in range(1, n + 1):
+        itens = []
+        for _ in range(rnd.randint(1, 8)):
+            if rnd.random() < 0.25:
+                itens.append([1, rnd.choice(SERVICOS), round(rnd.uniform(50, 400), 2), None])
+            else:
+                id_produto, nome, valor = rnd.choice(catalogo)
+                qtd = rnd.randint(1, 4)
+                # Como na interface e na CLI: o valor do item é o da linha (qtd x preço)
+                itens.append([qtd, nome, round(qtd * valor, 2), id_produto])
+        total = round(sum(v for _, _, v, _ in itens), 2)
+        data = (hoje - timedelta(days=rnd.randint(0, dias))).isoformat()
+        yield id_nota, rnd.randint(1, n_clientes), data, itens, total
+
+def gerar(destino, clientes=100_000, notas=1_000_000, produtos=20_000, anos=5, semente=42, lote=20_000):
+    """Cria (ou sobrescreve) `destino` com a base sintética."""
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(destino + sufixo): os.remove(destino + sufixo)
+    db.configurar(destino)
+    rnd = random.Random(semente)
+    inicio = time.perf_counter()
+
+    with db.transacao() as c:
+        c.executemany(f"""
+            INSERT INTO clientes (nome, telefone, endereco, carro, placa, ano, km, observacoes, status, uid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {UID})
+        """, _clientes(rnd, clientes))
+        c.executemany(f"INSERT INTO produtos (nome, valor_padrao, uid) VALUES (?, ?, {UID})", _produtos(rnd, produtos))
+        catalogo = c.execute("SELECT id, nome, valor_padrao FROM produtos").fetchall()
+
+    pendentes_h, pendentes_i = [], []
+    def gravar():
+        with db.transacao() as c:
+            c.executemany(f"""
+                INSERT INTO historico_servicos (id, id_cliente, data_servico, itens_json, valor_total, arquivo_path, uid)
+                VALUES (?, ?, ?, ?, ?, ?, {UID})
+            """, pendentes_h)
+            c.executemany("""
+                INSERT INTO servico_itens (id_servico, quantidade, descricao, valor_total_item, id_produto)
+                VALUES (?, ?, ?, ?, ?)
+            """, pendentes_i)
+        pendentes_h.clear(); pendentes_i.clear()
+
+    for id_nota, id_cliente, data, itens, total in _notas(rnd, notas, clientes, catalogo, anos):
+        pendentes_h.append((id_nota, id_cliente, data, json.dumps([i[:3] for i in itens]), total,
+                            f"Nota_{id_nota}.pdf"))
+        pendentes_i.extend((id_nota, q, d, v, p) for q, d, v, p in itens)
+        if len(pendentes_h) >= lote: gravar()
+    if pendentes_h: gravar()
+
+    with db.transacao() as c:
+        c.execute("ANALYZE")
+    db.fechar_conexao()
+    return time.perf_counter() - inicio
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera uma base sintética para benchmarks.")
+    parser.add_argument("--destino", required=True, help="arquivo .db a criar (será sobrescrito)")
+    parser.add_argument("--clientes", type=int, default=100_000)
+    parser.add_argument("--notas", type=int, default=1_000_000)
+    parser.add_argument("--produtos", type=int, default=20_000)
+    parser.add_argument("--anos", type=int, default=5, help="anos de histórico até hoje")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+    segundos = gerar(args.destino, args.clientes, args.notas, args.produtos, args.anos, args.semente)
+    print(f"Base gerada em {args.destino} ({segundos:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Mede os caminhos quentes do sistema e grava o resultado em JSON.
+
+Uso (a partir de src/):
+    python -m benchmarks.gerar_dados --destino /tmp/oficina.db
+    python -m benchmarks.suite --banco /tmp/oficina.db --saida resultados.json
+
+Os casos "partida[...]" medem a abertura a frio: um processo novo do Python
+importando cada camada (banco, serviços, interface) ou rodando a CLI.
+
+Cada medição guarda mínimo, mediana, p95 e máximo em milissegundos, para
+comparar uma execução com a outra. Os casos de interface (PyQt5 offscreen)
+e de PDF (ReportLab) são pulados se a biblioteca não estiver instalada.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+import models.db as db
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "repeticoes": repeticoes,
+        "min_ms": tempos[0],
+        "mediana_ms": statistics.median(tempos),
+        "p95_ms": tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+        "max_ms": tempos[-1],
+    }
+
+def _casos_banco(repeticoes):
+    hoje = date.today()
+    id_cliente = db.conectar().execute(
+        "SELECT id_cliente FROM historico_servicos GROUP BY id_cliente ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    id_cliente = id_cliente[0] if id_cliente else 1
+    placa = db.conectar().execute(
+        "SELECT placa_chave FROM historico_servicos WHERE placa_chave IS NOT NULL "
+        "GROUP BY placa_chave ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    placa = placa[0] if placa else "ABC1234"
+    return {
+        "listar_clientes": (db.listar_clientes, max(1, repeticoes // 10)),
+        "listar_clientes_pagina": (lambda: db.listar_clientes_pagina(0, 200), repeticoes),
+        "buscar_clientes": (lambda: db.buscar_clientes("silva gol", 50), repeticoes),
+        "calcular_total_dia": (lambda: db.calcular_total_dia(hoje.isoformat()), repeticoes),
+        "calcular_total_mes": (lambda: db.calcular_total_mes(hoje.month, hoje.year), repeticoes),
+        "calcular_total_periodo_ano": (lambda: db.calcular_total_periodo(date(hoje.year, 1, 1), hoje), repeticoes),
+        "listar_historico": (lambda: db.listar_historico(id_cliente), repeticoes),
+        "listar_historico_pagina": (lambda: db.listar_historico_pagina(id_cliente), repeticoes),
+        "obter_cliente_por_placa": (lambda: db.obter_cliente_por_placa(placa), repeticoes),
+        "listar_historico_veiculo_pagina": (lambda: db.listar_historico_veiculo_pagina(placa), repeticoes),
+        "listar_fechamentos": (db.listar_fechamentos, repeticoes),
+        "listar_fechamentos_pagina": (db.listar_fechamentos_pagina, repeticoes),
+        "sugerir_produtos": (lambda: db.sugerir_produtos("filtro", 20), repeticoes),
+    }
+
+def _casos_interface(repeticoes):
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return {}
+    import main
+    app = QApplication.instance() or QApplication([])
+    janela = main.MenuPrincipal()
+
+    def carregar():
+        janela.carregar()
+        while main.banco().pendentes():
+            app.processEvents()
+        app.processEvents()
+
+    return {"MenuPrincipal.carregar": (carregar, repeticoes)}
+
+def _casos_pdf(repeticoes):
+    try:
+        from servicos.pdf import criar_pdf
+    except ImportError:
+        return {}
+    pasta = tempfile.mkdtemp()
+    arquivo = os.path.join(pasta, "nota.pdf")
+    cliente = {"nome": "Cliente Benchmark"}
+    casos = {}
+    for n in (1, 50, 500):
+        itens = [(1, f"Filtro de óleo {i}", 25.5) for i in range(n)]
+        casos[f"criar_pdf[{n}]"] = (lambda itens=itens: criar_pdf(arquivo, cliente, itens, 25.5 * len(itens)),
+                                    max(1, repeticoes // (1 + n // 50)))
+    return casos
+
+def _casos_partida(repeticoes, banco):
+    src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    codigos = {
+        "partida[models.db]": "import models.db",
+        "partida[servicos.operacoes]": "import servicos.operacoes",
+        "partida[cli resumo]": f"import models.db as db; db.configurar({banco!r}); import cli; cli.main(['resumo'])",
+    }
+    try:
+        import PyQt5  # noqa: F401
+        codigos["partida[main]"] = "import main"
+    except ImportError:
+        pass
+
+    def processo(codigo):
+        subprocess.run([sys.executable, "-c", codigo], cwd=src, check=True, stdout=subprocess.DEVNULL,
+                       env=dict(os.environ, QT_QPA_PLATFORM="offscreen"))
+
+    n = max(3, repeticoes // 5)
+    return {nome: (lambda codigo=codigo: processo(codigo), n) for nome, codigo in codigos.items()}
+
+def _contagens():
+    return {tabela: db.conectar().execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+            for tabela in ("clientes", "historico_servicos", "servico_itens", "produtos", "fechamentos")}
+
+def _versao_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def executar(banco, repeticoes=50, filtro=None):
+    db.configurar(banco)
+    casos = {}
+    casos.update(_casos_banco(repeticoes))
+    casos.update(_casos_interface(repeticoes))
+    casos.update(_casos_pdf(repeticoes))
+    casos.update(_casos_partida(repeticoes, os.path.abspath(banco)))
+
+    resultados = {}
+    for nome, (funcao, n) in casos.items():
+        if filtro and filtro not in nome: continue
+        funcao()  # aquecimento (cache de páginas, catálogo etc.)
+        resultados[nome] = _medir(funcao, n)
+        print(f"{nome:<30}{resultados[nome]['mediana_ms']:>10.2f} ms (p95 {resultados[nome]['p95_ms']:.2f})",
+              file=sys.stderr)
+
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": _versao_git(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "banco": os.path.abspath(banco),
+        "contagens": _contagens(),
+        "resultados": resultados,
+    }
+
+def comparar(anterior, atual, tolerancia=1.2):
+    """Lista os casos cuja mediana piorou mais que `tolerancia` vezes."""
+    regressoes = []
+    for nome, res in atual["resultados"].items():
+        antes = anterior.get("resultados", {}).get(nome)
+        if antes and antes["mediana_ms"] > 0:
+            razao = res["mediana_ms"] / antes["mediana_ms"]
+            if razao > tolerancia:
+                regressoes.append((nome, antes["mediana_ms"], res["mediana_ms"], razao))
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes.")
+    parser.add_argument("--banco", required=True, help="base gerada por benchmarks.gerar_dados")
+    parser.add_argument("--saida", help="arquivo JSON de resultado (padrão: saída padrão)")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--filtro", help="roda só os casos cujo nome contém este texto")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior; sai com código 1 se houver regressão")
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.banco, args.repeticoes, args.filtro)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(relatorio, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(json.load(f), relatorio)
+        for nome, antes, depois, razao in regressoes:
+            print(f"REGRESSÃO {nome}: {antes:.2f} ms -> {depois:.2f} ms ({razao:.1f}x)", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
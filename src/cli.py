@@ -0,0 +1,135 @@
+"""Linha de comando da oficina, sem interface gráfica.
+
+Uso (a partir de src/):
+    python cli.py clientes silva
+    python cli.py historico 42 [--arquivados]
+    python cli.py veiculo ABC1234
+    python cli.py nota 42 --item 1 "Filtro de óleo" - --item 1 "Mão de obra" 80 --saida nota.pdf
+    python cli.py resumo --mes 03/2024
+    python cli.py fechar dia --sim
+
+Um valor "-" no item usa o preço do catálogo de peças. Com --servidor
+HOST:PORTA (ou OFICINA_SERVIDOR) os comandos vão para servicos.servidor
+em vez de abrir o banco local.
+"""
+import argparse
+import os
+import sys
+
+import models.db as db
+from servicos import operacoes
+
+def _moeda(valor):
+    return f"R$ {valor:,.2f}"
+
+def _valor(texto):
+    return float(texto.replace(",", "."))
+
+def clientes(args):
+    if args.termo:
+        linhas = db.buscar_clientes(args.termo, args.limite)
+    else:
+        linhas = db.listar_clientes_pagina(0, args.limite)
+    for id_cli, status, nome, telefone, _, carro, placa, *_ in linhas:
+        print(f"{id_cli:>6}  {nome:<35} {telefone or '':<16} {carro or '':<12} {placa or '':<8} {status}")
+
+def historico(args):
+    for data, resumo, valor in db.listar_historico(args.id_cliente, arquivados=args.arquivados):
+        print(f"{data}  {_moeda(valor):>14}  {resumo}")
+
+def veiculo(args):
+    dono = db.obter_cliente_por_placa(args.placa)
+    if dono is None:
+        print(f"Placa {db.chave_placa(args.placa) or args.placa} sem dono cadastrado.")
+    else:
+        print(f"Placa {dono[6]}: {dono[5] or '-'} de {dono[2]} (cliente {dono[0]})")
+    for _, data, cliente, resumo, valor in db.listar_historico_veiculo_pagina(args.placa, limite=args.limite):
+        print(f"{data}  {_moeda(valor):>14}  {cliente:<30} {resumo}")
+
+def nota(args):
+    cliente = db.obter_cliente(args.id_cliente)
+    if cliente is None:
+        sys.exit(f"Cliente {args.id_cliente} não encontrado.")
+    itens = []
+    for qtd, descricao, valor in args.item:
+        if valor == "-":
+            preco = db.preco_produto(descricao)
+            if preco is None:
+                sys.exit(f"'{descricao}' não está no catálogo; informe o valor.")
+        else:
+            preco = _valor(valor)
+        itens.append((int(qtd), descricao, int(qtd) * preco))
+    total = sum(v for _, _, v in itens)
+    id_nota = operacoes.emitir_nota(args.saida, {"id": cliente[0], "nome": cliente[2]}, itens, total)
+    print(f"Nota {id_nota} de {cliente[2]} salva em {args.saida} ({_moeda(total)})")
+
+def resumo(args):
+    if args.mes:
+        total, notas = db.resumo_mes(*args.mes.split("/"))
+        periodo = args.mes
+    else:
+        periodo = args.dia or operacoes.fechamento_dia()[1]
+        total, notas = db.resumo_dia(periodo)
+    print(f"{periodo}: {_moeda(total)} em {notas} nota(s)")
+
+def fechar(args):
+    if args.periodo == "mes":
+        tipo, periodo, valor = operacoes.fechamento_mes(*(args.mes.split("/") if args.mes else ()))
+    else:
+        tipo, periodo, valor = operacoes.fechamento_dia(args.dia)
+    if valor == 0:
+        sys.exit(f"Não há faturamento em {periodo} para fechar.")
+    print(f"{tipo} {periodo}: {_moeda(valor)}")
+    if args.sim:
+        db.registrar_fechamento(tipo, periodo, valor)
+        print("Fechamento registrado.")
+    else:
+        print("Nada registrado; repita com --sim para confirmar.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Oficina pela linha de comando.")
+    parser.add_argument("--servidor", default=os.environ.get("OFICINA_SERVIDOR"),
+                        help="HOST:PORTA de servicos.servidor (token em OFICINA_TOKEN)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("clientes", help="lista ou busca clientes")
+    p.add_argument("termo", nargs="?", help="nome, telefone, carro, placa ou endereço")
+    p.add_argument("--limite", type=int, default=50)
+    p.set_defaults(funcao=clientes)
+
+    p = sub.add_parser("historico", help="notas de um cliente")
+    p.add_argument("id_cliente", type=int)
+    p.add_argument("--arquivados", action="store_true", help="inclui os anos arquivados")
+    p.set_defaults(funcao=historico)
+
+    p = sub.add_parser("veiculo", help="dono atual e notas do carro com todos os donos")
+    p.add_argument("placa", help="formato antigo (ABC1234) ou Mercosul (ABC1D23)")
+    p.add_argument("--limite", type=int, default=100)
+    p.set_defaults(funcao=veiculo)
+
+    p = sub.add_parser("nota", help="gera o PDF e grava o histórico")
+    p.add_argument("id_cliente", type=int)
+    p.add_argument("--item", nargs=3, action="append", required=True, metavar=("QTD", "DESCRICAO", "VALOR"))
+    p.add_argument("--saida", required=True, help="arquivo PDF")
+    p.set_defaults(funcao=nota)
+
+    p = sub.add_parser("resumo", help="faturamento do dia ou do mês")
+    p.add_argument("--dia", help="dd/mm/YYYY (padrão: hoje)")
+    p.add_argument("--mes", help="MM/YYYY")
+    p.set_defaults(funcao=resumo)
+
+    p = sub.add_parser("fechar", help="registra o fechamento de caixa")
+    p.add_argument("periodo", choices=("dia", "mes"))
+    p.add_argument("--dia", help="dd/mm/YYYY (padrão: hoje)")
+    p.add_argument("--mes", help="MM/YYYY (padrão: mês atual)")
+    p.add_argument("--sim", action="store_true", help="confirma o registro")
+    p.set_defaults(funcao=fechar)
+
+    args = parser.parse_args(argv)
+    if args.servidor:
+        from servicos import remoto
+        remoto.conectar_servidor(args.servidor, token=os.environ.get("OFICINA_TOKEN"))
+    args.funcao(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,28 @@
 import sys
 import os
-import json
-import webbrowser
+import bisect
+import time
+from collections import OrderedDict
 from datetime import datetime
 
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QVBoxLayout, QWidget, QLineEdit, QPushButton, 
     QTableWidget, QTableWidgetItem, QHBoxLayout, QHeaderView, QDialog, 
     QDialogButtonBox, QFileDialog, QMessageBox, QAbstractItemView,
-    QComboBox, QFrame, QCompleter
+    QComboBox, QFrame, QCompleter, QTableView, QStyledItemDelegate, QCheckBox,
+    QInputDialog
+)
+from PyQt5.QtGui import QIntValidator, QColor, QFont, QPalette
+from PyQt5.QtCore import (
+    Qt, QStringListModel, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal,
+    QObject, QRunnable, QThreadPool, QThread
 )
-from PyQt5.QtGui import QIntValidator, QColor, QFont
-from PyQt5.QtCore import Qt, QStringListModel
-
-# --- BIBLIOTECAS PARA O PDF ---
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
 
 # --- IMPORTAÇÃO DO BANCO DE DADOS ---
 try:
     import models.db as db
-    from models.db import conectar, salvar_cliente
+    from servicos import operacoes, diagnostico, importacao, contabil, backup, remoto
+    from servicos.exportacao import exportar_periodo
 except ImportError:
     print("ERRO CRÍTICO: Pasta 'models' ou arquivo 'db.py' não encontrados.")
     sys.exit(1)
@@ -57,7 +58,7 @@ STYLESHEET = """
     }
 
     /* Tabelas */
-    QTableWidget {
+    QTableView {
         border: 1px solid #E5E5EA;
         border-radius: 10px;
         gridline-color: #F0F0F0;
@@ -150,52 +151,355 @@ STYLESHEET = """
 """
 
 # =============================================================================
-# FUNÇÕES DE CONFIGURAÇÃO
+# NOTIFICAÇÕES DO BANCO
 # =============================================================================
-def verificar_banco_historico():
-    """Garante que as tabelas existam."""
-    try:
-        conn = conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS historico_servicos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                id_cliente INTEGER,
-                data_servico TEXT,
-                itens_json TEXT,
-                valor_total REAL,
-                arquivo_path TEXT
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS fechamentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tipo TEXT,
-                periodo TEXT,
-                valor REAL,
-                data_registro TEXT
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT,
-                valor_padrao REAL
-            )
-        """)
+class NotificadorBanco(QObject):
+    """Repassa as alterações do models.db para a thread da interface."""
+    alterado = pyqtSignal(str, str, int)
 
-        try:
-            cursor.execute("SELECT status FROM clientes LIMIT 1")
-        except:
-            cursor.execute("ALTER TABLE clientes ADD COLUMN status TEXT DEFAULT 'Aberto'")
-            
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Erro ao verificar banco: {e}")
+_notificador = None
+
+def notificador():
+    global _notificador
+    if _notificador is None:
+        _notificador = NotificadorBanco()
+        db.inscrever(_notificador.alterado.emit)
+    return _notificador
+
+# =============================================================================
+# BANCO EM SEGUNDO PLANO
+# =============================================================================
+class _ExecutorBanco(QObject):
+    concluido = pyqtSignal(int, object)
+    falhou = pyqtSignal(int, str)
+
+    def executar(self, id_pedido, funcao, args):
+        try: res = funcao(*args)
+        except Exception as e:
+            self.falhou.emit(id_pedido, str(e))
+            return
+        self.concluido.emit(id_pedido, res)
+
+class TrabalhadorBanco(QObject):
+    """Fila de chamadas ao models.db atendida por uma única thread.
+
+    A interface nunca espera o SQLite: `executar` devolve na hora e o
+    resultado chega depois, na thread da interface, em `ao_concluir`.
+    """
+    pedido = pyqtSignal(int, object, object)
+
+    def __init__(self):
+        super().__init__()
+        self._thread = QThread()
+        self._thread.setObjectName("banco")
+        self._executor = _ExecutorBanco()
+        self._executor.moveToThread(self._thread)
+        self.pedido.connect(self._executor.executar)
+        self._executor.concluido.connect(self._concluido)
+        self._executor.falhou.connect(self._falhou)
+        self._retornos = {}
+        self._ultimo_pedido = 0
+        self._thread.start()
+
+    def executar(self, funcao, *args, ao_concluir=None, ao_falhar=None):
+        self._ultimo_pedido += 1
+        self._retornos[self._ultimo_pedido] = (ao_concluir, ao_falhar, funcao, time.perf_counter())
+        self.pedido.emit(self._ultimo_pedido, funcao, args)
+        return self._ultimo_pedido
+
+    def pendentes(self):
+        return len(self._retornos)
+
+    def _concluido(self, id_pedido, res):
+        ao_concluir, _, funcao, inicio = self._retornos.pop(id_pedido, (None, None, None, None))
+        if ao_concluir:
+            # A janela que pediu pode ter sido fechada nesse meio tempo
+            try: ao_concluir(res)
+            except RuntimeError: pass
+        self._medir_resposta(funcao, inicio)
+
+    def _falhou(self, id_pedido, erro):
+        _, ao_falhar, funcao, inicio = self._retornos.pop(id_pedido, (None, None, None, None))
+        if ao_falhar:
+            try: ao_falhar(erro)
+            except RuntimeError: pass
+        else:
+            print(f"Erro no banco: {erro}")
+        self._medir_resposta(funcao, inicio)
+
+    def _medir_resposta(self, funcao, inicio):
+        # Da chamada até o retorno pintado na tela: fila + banco + callback
+        if inicio is not None and diagnostico.ativo():
+            nome = getattr(funcao, "__name__", str(funcao))
+            diagnostico.registrar(diagnostico.RESPOSTA, nome, (time.perf_counter() - inicio) * 1000)
+
+    def encerrar(self):
+        self._thread.quit()
+        self._thread.wait()
+
+_banco = None
+
+def banco():
+    global _banco
+    if _banco is None:
+        _banco = TrabalhadorBanco()
+    return _banco
+
+# =============================================================================
+# MODELOS DE TABELA
+# =============================================================================
+class ModeloClientes(QAbstractTableModel):
+    """Clientes carregados do banco em páginas, conforme a tabela rola."""
+    COLUNAS = ["Status", "Nome", "Telefone", "Endereço", "Carro", "Placa", "Ano", "KM", "Obs"]
+    TAMANHO_PAGINA = 200
+    LIMITE_BUSCA = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._linhas = []
+        self._posicao = {}    # id do cliente -> linha no modelo
+        self._ultimo_id = 0
+        self._fim = False
+        self._termo = ""
+        self._buscando = False
+        self._geracao = 0     # descarta respostas de buscas/páginas antigas
+        notificador().alterado.connect(self.aplicar_alteracao)
+
+    def recarregar(self):
+        self.filtrar(self._termo)
+
+    def filtrar(self, termo):
+        """Sem termo: lista paginada. Com termo: só os melhores resultados da busca."""
+        self._geracao += 1
+        self._termo = termo.strip()
+        if self._termo:
+            geracao = self._geracao
+            banco().executar(db.buscar_clientes, self._termo, self.LIMITE_BUSCA,
+                             ao_concluir=lambda linhas: self._resetar(geracao, linhas, True))
+        else:
+            self._resetar(self._geracao, [], False)
+            self.fetchMore()
+
+    def _resetar(self, geracao, linhas, fim):
+        if geracao != self._geracao: return
+        self.beginResetModel()
+        self._linhas = linhas
+        self._posicao = {row[0]: i for i, row in enumerate(linhas)}
+        self._ultimo_id = 0
+        self._fim = fim
+        self._buscando = False
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._linhas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUNAS)
+
+    def headerData(self, secao, orientacao, role=Qt.DisplayRole):
+        if orientacao == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUNAS[secao]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid(): return None
+        row = self._linhas[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 0: return row[1] if row[1] else 'Aberto'
+            valor = row[index.column() + 1]
+            return "" if valor is None else str(valor)
+        if role == Qt.UserRole:
+            return row[0]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._fim and not self._buscando
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent): return
+        self._buscando = True
+        geracao = self._geracao
+        banco().executar(db.listar_clientes_pagina, self._ultimo_id, self.TAMANHO_PAGINA,
+                         ao_concluir=lambda pagina: self._receber_pagina(geracao, pagina))
+
+    def _receber_pagina(self, geracao, pagina):
+        if geracao != self._geracao: return
+        self._buscando = False
+        if len(pagina) < self.TAMANHO_PAGINA: self._fim = True
+        if not pagina: return
+        inicio = len(self._linhas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(pagina) - 1)
+        self._linhas.extend(pagina)
+        for i, row in enumerate(pagina, inicio):
+            self._posicao[row[0]] = i
+        self._ultimo_id = pagina[-1][0]
+        self.endInsertRows()
+
+    def aplicar_alteracao(self, tabela, acao, id_cli):
+        """Atualiza só a linha afetada, sem recarregar a tabela."""
+        if tabela != "clientes": return
+        if acao == db.RECARREGADO:
+            self.recarregar()
+            return
+        linha = self._posicao.get(id_cli)
+        if acao == db.REMOVIDO and linha is not None:
+            self.beginRemoveRows(QModelIndex(), linha, linha)
+            del self._linhas[linha]
+            self._posicao = {row[0]: i for i, row in enumerate(self._linhas)}
+            self.endRemoveRows()
+        elif acao == db.ATUALIZADO and linha is not None:
+            banco().executar(db.obter_cliente, id_cli, ao_concluir=self._substituir)
+        elif acao == db.INSERIDO and not self._termo and self._fim:
+            # Enquanto ainda há páginas, o novo id (o maior) chega pelo fetchMore
+            banco().executar(db.obter_cliente, id_cli, ao_concluir=self._acrescentar)
+
+    def _substituir(self, row):
+        linha = self._posicao.get(row[0]) if row else None
+        if linha is None: return
+        self._linhas[linha] = row
+        self.dataChanged.emit(self.index(linha, 0), self.index(linha, len(self.COLUNAS) - 1))
+
+    def _acrescentar(self, row):
+        if row is None or row[0] in self._posicao or self._termo or not self._fim: return
+        id_cli = row[0]
+        fim = len(self._linhas)
+        self.beginInsertRows(QModelIndex(), fim, fim)
+        self._linhas.append(row)
+        self._posicao[id_cli] = fim
+        self._ultimo_id = id_cli
+        self.endInsertRows()
+
+    def cliente(self, linha):
+        """(id, status, [nome, telefone, endereço, carro, placa, ano, km, obs])"""
+        row = self._linhas[linha]
+        return row[0], row[1] if row[1] else 'Aberto', ["" if v is None else str(v) for v in row[2:10]]
+
+class DelegateStatus(QStyledItemDelegate):
+    """Pinta a coluna de status com cores/fontes compartilhadas entre as linhas."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        verde = QColor("#2E7D32")
+        self.cores = {
+            "Concluído": verde, "Entregue": verde,
+            "Aguardando Peça": QColor("#E65100"),
+            "Em Andamento": QColor("#1565C0"),
+        }
+        self.negrito = QFont("Segoe UI", weight=QFont.Bold)
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        status = index.data()
+        cor = self.cores.get(status)
+        if cor is not None:
+            option.palette.setColor(QPalette.Text, cor)
+        if status in ("Concluído", "Entregue"):
+            option.font = self.negrito
+
+class CampoBusca(QLineEdit):
+    """Campo de busca que emite `buscar` quando o usuário para de digitar."""
+    buscar = pyqtSignal(str)
+
+    def __init__(self, placeholder="Buscar por nome, telefone, carro ou placa...", parent=None):
+        super().__init__(parent)
+        self.setPlaceholderText(placeholder)
+        self.setClearButtonEnabled(True)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(150)
+        self._timer.timeout.connect(lambda: self.buscar.emit(self.text()))
+        self.textChanged.connect(self._timer.start)
+
+class ModeloSugestoes(QStringListModel):
+    """Sugestões do catálogo para o QCompleter, consultadas no banco conforme se digita.
+
+    Abrir a tela não carrega nada; cada prefixo novo é uma consulta indexada
+    (db.sugerir_produtos, já ordenada pelos itens mais usados). As últimas
+    respostas ficam num LRU pequeno, limpo quando produtos ou notas mudam.
+    """
+    TAMANHO_CACHE = 64
+    LIMITE = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.completer = None
+        self._cache = OrderedDict()
+        self._prefixo = ""
+        notificador().alterado.connect(self._alterado)
+
+    def buscar(self, prefixo):
+        prefixo = prefixo.strip()
+        self._prefixo = prefixo
+        if not prefixo:
+            self.setStringList([])
+        elif prefixo in self._cache:
+            self._cache.move_to_end(prefixo)
+            self._mostrar(self._cache[prefixo])
+        else:
+            banco().executar(db.sugerir_produtos, prefixo, self.LIMITE,
+                             ao_concluir=lambda nomes: self._recebido(prefixo, nomes))
+
+    def _recebido(self, prefixo, nomes):
+        self._cache[prefixo] = nomes
+        if len(self._cache) > self.TAMANHO_CACHE:
+            self._cache.popitem(last=False)
+        if prefixo == self._prefixo:
+            self._mostrar(nomes)
+
+    def _mostrar(self, nomes):
+        self.setStringList(nomes)
+        # A resposta chega depois da digitação: reabre o popup com a lista nova
+        if self.completer and nomes and self.completer.widget() and self.completer.widget().hasFocus():
+            self.completer.complete()
+
+    def _alterado(self, tabela, acao, id_registro):
+        if tabela in ("produtos", "historico_servicos"):
+            self._cache.clear()
+
+class PaginacaoRolagem(QObject):
+    """Busca páginas de `funcao(*args, antes_id, limite)` conforme a tabela rola.
+
+    As linhas devolvidas começam pelo id, que vira o cursor da próxima página.
+    A primeira página sai em reiniciar(); se ela não encher a tabela, a
+    seguinte já é pedida.
+    """
+    def __init__(self, tabela, funcao, *args, ao_receber, tamanho=100):
+        super().__init__(tabela)
+        self.tabela = tabela
+        self.funcao = funcao
+        self.args = args
+        self.ao_receber = ao_receber
+        self.tamanho = tamanho
+        barra = tabela.verticalScrollBar()
+        barra.valueChanged.connect(self._rolou)
+        barra.rangeChanged.connect(lambda *_: self._rolou(barra.value()))
+        self._geracao = 0
+        self._fim = True
+
+    def reiniciar(self):
+        self._geracao += 1
+        self._cursor = None
+        self._fim = False
+        self._pedindo = False
+        self.proxima()
+
+    def proxima(self):
+        if self._fim or self._pedindo: return
+        self._pedindo = True
+        geracao = self._geracao
+        banco().executar(self.funcao, *self.args, self._cursor, self.tamanho,
+                         ao_concluir=lambda linhas: self._recebida(geracao, linhas))
+
+    def _recebida(self, geracao, linhas):
+        if geracao != self._geracao: return
+        self._pedindo = False
+        self._fim = len(linhas) < self.tamanho
+        if linhas: self._cursor = linhas[-1][0]
+        self.ao_receber(linhas)
+
+    def _rolou(self, valor):
+        barra = self.tabela.verticalScrollBar()
+        if valor >= barra.maximum() - 3 * max(1, barra.singleStep()):
+            self.proxima()
 
 # =============================================================================
 # JANELAS AUXILIARES
@@ -241,12 +545,23 @@ class DialogoProdutos(QDialog):
         self.lista.setAlternatingRowColors(True)
         layout.addWidget(self.lista)
         
+        h_rodape = QHBoxLayout()
+        self.btn_importar = QPushButton("Importar CSV")
+        self.btn_importar.setCursor(Qt.PointingHandCursor)
+        self.btn_importar.clicked.connect(self.importar)
+        self.lbl_importacao = QLabel("", styleSheet="color: #666;")
         btn_close = QPushButton("Fechar")
         btn_close.clicked.connect(self.close)
-        layout.addWidget(btn_close, alignment=Qt.AlignRight)
+        h_rodape.addWidget(self.btn_importar)
+        h_rodape.addWidget(self.lbl_importacao)
+        h_rodape.addStretch()
+        h_rodape.addWidget(btn_close)
+        layout.addLayout(h_rodape)
         
         self.setLayout(layout)
+        self.nomes = []
         self.carregar()
+        notificador().alterado.connect(self.aplicar_alteracao)
 
     def salvar(self):
         nome = self.inp_nome.text().strip()
@@ -258,19 +573,41 @@ class DialogoProdutos(QDialog):
         try: valor = float(valor_txt)
         except: valor = 0.0
         
-        db.salvar_produto(nome, valor)
+        banco().executar(db.salvar_produto, nome, valor)
         self.inp_nome.clear(); self.inp_valor.clear()
-        self.carregar()
 
     def carregar(self):
-        dados = db.listar_produtos()
+        banco().executar(db.listar_produtos, ao_concluir=self.preencher)
+
+    def importar(self):
+        iniciar_importacao(self, importacao.importar_produtos, self.btn_importar, self.lbl_importacao)
+
+    def preencher(self, dados):
+        self.nomes = [nome for nome, _ in dados]
         self.lista.setRowCount(len(dados))
         for i, (nome, valor) in enumerate(dados):
             self.lista.setItem(i, 0, QTableWidgetItem(nome))
             self.lista.setItem(i, 1, QTableWidgetItem(f"R$ {valor:.2f}"))
 
+    def aplicar_alteracao(self, tabela, acao, id_produto):
+        if tabela != "produtos": return
+        if acao == db.RECARREGADO:
+            self.carregar()
+        elif acao == db.INSERIDO:
+            banco().executar(db.obter_produto, id_produto, ao_concluir=self.inserir_produto)
+
+    def inserir_produto(self, produto):
+        if produto is None: return
+        nome, valor = produto
+        # Insere na posição certa da ordem alfabética
+        i = bisect.bisect_right(self.nomes, nome)
+        self.nomes.insert(i, nome)
+        self.lista.insertRow(i)
+        self.lista.setItem(i, 0, QTableWidgetItem(nome))
+        self.lista.setItem(i, 1, QTableWidgetItem(f"R$ {valor:.2f}"))
+
 class DialogoHistorico(QDialog):
-    def __init__(self, id_cliente, nome_cliente, parent=None):
+    def __init__(self, id_cliente, nome_cliente, parent=None, placa=None):
         super().__init__(parent)
         self.setWindowTitle(f"Histórico - {nome_cliente}")
         self.resize(700, 500)
@@ -282,10 +619,14 @@ class DialogoHistorico(QDialog):
         lbl.setProperty("class", "titulo")
         layout.addWidget(lbl)
         
+        # O mesmo carro pode ter passado por outros donos (placa antiga ou Mercosul)
+        self.id_cliente, self.placa = id_cliente, placa
+        self.chk_veiculo = QCheckBox(f"Todas as notas do veículo {placa} (qualquer dono)")
+        self.chk_veiculo.setVisible(bool(db.chave_placa(placa)))
+        self.chk_veiculo.toggled.connect(lambda _: self.carregar_dados(self.id_cliente))
+        layout.addWidget(self.chk_veiculo)
+        
         self.tabela = QTableWidget()
-        self.tabela.setColumnCount(3)
-        self.tabela.setHorizontalHeaderLabels(["Data", "Resumo", "Total"])
-        self.tabela.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         self.tabela.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.tabela.setAlternatingRowColors(True)
@@ -301,17 +642,28 @@ class DialogoHistorico(QDialog):
         self.carregar_dados(id_cliente)
 
     def carregar_dados(self, id_cliente):
-        dados = db.listar_historico(id_cliente)
-        self.tabela.setRowCount(len(dados))
-        for i, (data, itens_json, valor) in enumerate(dados):
-            self.tabela.setItem(i, 0, QTableWidgetItem(data))
-            try:
-                lista = json.loads(itens_json)
-                resumo = ", ".join([item[1] for item in lista])
-            except: resumo = "-"
-            self.tabela.setItem(i, 1, QTableWidgetItem(resumo))
-            self.tabela.setItem(i, 2, QTableWidgetItem(f"R$ {valor:,.2f}"))
-        # conn.close() removido
+        if self.chk_veiculo.isChecked():
+            colunas, funcao, chave = ["Data", "Cliente", "Resumo", "Total"], db.listar_historico_veiculo_pagina, self.placa
+        else:
+            colunas, funcao, chave = ["Data", "Resumo", "Total"], db.listar_historico_pagina, id_cliente
+        self.tabela.setColumnCount(len(colunas))
+        self.tabela.setHorizontalHeaderLabels(colunas)
+        self.tabela.horizontalHeader().setSectionResizeMode(len(colunas) - 2, QHeaderView.Stretch)
+        self.tabela.setRowCount(0)
+        # Clientes de frota têm milhares de notas: páginas conforme rola
+        if not hasattr(self, "paginas"):
+            self.paginas = PaginacaoRolagem(self.tabela, funcao, chave, ao_receber=self.preencher)
+        else:
+            # Trocar de modo reinicia a paginação; páginas pedidas antes são descartadas
+            self.paginas.funcao, self.paginas.args = funcao, (chave,)
+        self.paginas.reiniciar()
+
+    def preencher(self, dados):
+        inicio = self.tabela.rowCount()
+        self.tabela.setRowCount(inicio + len(dados))
+        for i, (_, data, *textos, valor) in enumerate(dados, start=inicio):
+            for col, texto in enumerate([data, *textos, f"R$ {valor:,.2f}"]):
+                self.tabela.setItem(i, col, QTableWidgetItem(texto))
 
 class DialogoFinanceiro(QDialog):
     def __init__(self, parent=None):
@@ -353,13 +705,31 @@ class DialogoFinanceiro(QDialog):
         self.tabela.verticalHeader().setVisible(False)
         layout.addWidget(self.tabela)
         
+        h_rodape = QHBoxLayout()
+        self.btn_exportar = QPushButton("Exportar Notas do Mês")
+        self.btn_exportar.setCursor(Qt.PointingHandCursor)
+        self.btn_exportar.clicked.connect(self.exportar_notas_mes)
+        self.lbl_exportacao = QLabel("", styleSheet="color: #666;")
+        
         btn_close = QPushButton("Sair")
         btn_close.setCursor(Qt.PointingHandCursor)
         btn_close.clicked.connect(self.close)
-        layout.addWidget(btn_close, alignment=Qt.AlignRight)
+        
+        self.btn_contabil = QPushButton("Exportar p/ Contabilidade")
+        self.btn_contabil.setCursor(Qt.PointingHandCursor)
+        self.btn_contabil.clicked.connect(self.exportar_contabil)
+        
+        h_rodape.addWidget(self.btn_exportar)
+        h_rodape.addWidget(self.btn_contabil)
+        h_rodape.addWidget(self.lbl_exportacao)
+        h_rodape.addStretch()
+        h_rodape.addWidget(btn_close)
+        layout.addLayout(h_rodape)
         
         self.setLayout(layout)
+        self.paginas = PaginacaoRolagem(self.tabela, db.listar_fechamentos_pagina, ao_receber=self.preencher_fechamentos)
         self.atualizar_dados()
+        notificador().alterado.connect(self.aplicar_alteracao)
 
     def criar_card(self, titulo, valor_inicial, texto_botao, funcao_botao):
         frame = QFrame()
@@ -375,6 +745,9 @@ class DialogoFinanceiro(QDialog):
         lbl_v.setProperty("class", "card-value")
         lbl_v.setAlignment(Qt.AlignCenter)
         
+        lbl_n = QLabel("")
+        lbl_n.setProperty("class", "card-title")
+        
         btn = QPushButton(texto_botao)
         btn.setProperty("class", "primary")
         btn.setCursor(Qt.PointingHandCursor)
@@ -382,71 +755,229 @@ class DialogoFinanceiro(QDialog):
         
         l.addWidget(lbl_t, alignment=Qt.AlignCenter)
         l.addWidget(lbl_v, alignment=Qt.AlignCenter)
+        l.addWidget(lbl_n, alignment=Qt.AlignCenter)
         l.addWidget(btn)
         
         frame.lbl_valor = lbl_v 
+        frame.lbl_notas = lbl_n
         return frame
 
     def atualizar_dados(self):
+        self.atualizar_cards()
+        self.tabela.setRowCount(0)
+        self.paginas.reiniciar()
+
+    def preencher_fechamentos(self, registros):
+        inicio = self.tabela.rowCount()
+        self.tabela.setRowCount(inicio + len(registros))
+        for i, row in enumerate(registros, start=inicio):
+            self.preencher_fechamento(i, row[1:])
+
+    def atualizar_cards(self):
         # Card Dia
         hoje = datetime.now().strftime("%d/%m/%Y")
-        total_dia = db.calcular_total_dia(hoje)
-        self.card_dia.lbl_valor.setText(f"R$ {total_dia:,.2f}")
+        banco().executar(db.resumo_dia, hoje, ao_concluir=lambda r: self.mostrar_resumo(self.card_dia, r))
         
         # Card Mês
         mes = datetime.now().strftime("%m")
         ano = datetime.now().strftime("%Y")
-        total_mes = db.calcular_total_mes(mes, ano)
-        self.card_mes.lbl_valor.setText(f"R$ {total_mes:,.2f}")
-        
-        # Tabela
-        registros = db.listar_fechamentos()
-        self.tabela.setRowCount(len(registros))
-        for i, row in enumerate(registros):
-            if len(row) >= 4:
-                tipo, periodo, valor, data_reg = row[:4]
-                self.tabela.setItem(i, 0, QTableWidgetItem(tipo))
-                self.tabela.setItem(i, 1, QTableWidgetItem(periodo))
-                item_val = QTableWidgetItem(f"R$ {valor:,.2f}")
-                item_val.setForeground(QColor("#2E7D32"))
-                self.tabela.setItem(i, 2, item_val)
-                self.tabela.setItem(i, 3, QTableWidgetItem(data_reg))
+        banco().executar(db.resumo_mes, mes, ano, ao_concluir=lambda r: self.mostrar_resumo(self.card_mes, r))
 
-    def fechar_dia(self):
-        hoje = datetime.now().strftime("%d/%m/%Y")
-        valor = db.calcular_total_dia(hoje)
-        
-        if valor == 0:
-            QMessageBox.warning(self, "Aviso", "Não há faturamento hoje para fechar.")
-            return
+    def mostrar_resumo(self, card, resumo):
+        total, notas = resumo
+        card.lbl_valor.setText(f"R$ {total:,.2f}")
+        card.lbl_notas.setText(f"{notas} nota(s)")
 
-        msg = QMessageBox.question(self, "Confirmar Fechamento", 
-                                   f"Deseja fechar o caixa de HOJE ({hoje})?\n\nValor Total: R$ {valor:,.2f}",
-                                   QMessageBox.Yes | QMessageBox.No)
-        
-        if msg == QMessageBox.Yes:
-            db.registrar_fechamento("Diário", hoje, valor)
-            QMessageBox.information(self, "Sucesso", "Caixa diário fechado e registrado!")
+    def preencher_fechamento(self, i, row):
+        tipo, periodo, valor, data_reg = row[:4]
+        self.tabela.setItem(i, 0, QTableWidgetItem(tipo))
+        self.tabela.setItem(i, 1, QTableWidgetItem(periodo))
+        item_val = QTableWidgetItem(f"R$ {valor:,.2f}")
+        item_val.setForeground(QColor("#2E7D32"))
+        self.tabela.setItem(i, 2, item_val)
+        self.tabela.setItem(i, 3, QTableWidgetItem(data_reg))
+
+    def aplicar_alteracao(self, tabela, acao, id_registro):
+        if tabela == "fechamentos" and acao == db.INSERIDO:
+            banco().executar(db.obter_fechamento, id_registro, ao_concluir=self.inserir_fechamento)
+        elif tabela == "fechamentos" or acao == db.RECARREGADO:
+            # Arquivamento, sincronização ou servidor reiniciado: cards e tabela podem ter mudado
             self.atualizar_dados()
+        elif tabela == "historico_servicos":
+            self.atualizar_cards()
+
+    def inserir_fechamento(self, row):
+        if row is None: return
+        self.tabela.insertRow(0)
+        self.preencher_fechamento(0, row)
+
+    def fechar_dia(self):
+        banco().executar(operacoes.fechamento_dia, ao_concluir=lambda f: self.confirmar_fechamento(*f))
 
     def fechar_mes(self):
-        mes_ano = datetime.now().strftime("%m/%Y")
-        mes = datetime.now().strftime("%m")
-        ano = datetime.now().strftime("%Y")
-        valor = db.calcular_total_mes(mes, ano)
-        
+        banco().executar(operacoes.fechamento_mes, ao_concluir=lambda f: self.confirmar_fechamento(*f))
+
+    def confirmar_fechamento(self, tipo, periodo, valor):
+        diario = tipo == operacoes.DIARIO
         if valor == 0:
-            QMessageBox.warning(self, "Aviso", "Não há faturamento neste mês.")
+            QMessageBox.warning(self, "Aviso", "Não há faturamento hoje para fechar." if diario else "Não há faturamento neste mês.")
             return
 
+        pergunta = f"Deseja fechar o caixa de HOJE ({periodo})?" if diario else f"Deseja encerrar o caixa do MÊS ({periodo})?"
         msg = QMessageBox.question(self, "Confirmar Fechamento", 
-                                   f"Deseja encerrar o caixa do MÊS ({mes_ano})?\n\nValor Total: R$ {valor:,.2f}",
+                                   f"{pergunta}\n\nValor Total: R$ {valor:,.2f}",
                                    QMessageBox.Yes | QMessageBox.No)
         
         if msg == QMessageBox.Yes:
-            db.registrar_fechamento("Mensal", mes_ano, valor)
-            QMessageBox.information(self, "Sucesso", "Caixa mensal encerrado e registrado!")
-            self.atualizar_dados()
+            sucesso = "Caixa diário fechado e registrado!" if diario else "Caixa mensal encerrado e registrado!"
+            banco().executar(db.registrar_fechamento, tipo, periodo, valor,
+                             ao_concluir=lambda _: QMessageBox.information(self, "Sucesso", sucesso),
+                             ao_falhar=lambda erro: QMessageBox.critical(self, "Erro", erro))
+
+    def exportar_notas_mes(self):
+        pasta = QFileDialog.getExistingDirectory(self, "Pasta para as notas do mês")
+        if not pasta: return
+        inicio, fim = db.periodo_do_mes(datetime.now().month, datetime.now().year)
+        tarefa = TarefaExportacao(inicio, fim, pasta)
+        tarefa.sinais.progresso.connect(
+            lambda feitas, total: self.lbl_exportacao.setText(f"Exportando {feitas}/{total} notas..."))
+        tarefa.sinais.concluida.connect(self.exportacao_concluida)
+        tarefa.sinais.falhou.connect(self.exportacao_falhou)
+        self.tarefa_exportacao = tarefa.sinais
+        self.btn_exportar.setEnabled(False)
+        QThreadPool.globalInstance().start(tarefa)
+
+    def exportar_contabil(self):
+        formatos = contabil.formatos_disponiveis()
+        formato, ok = QInputDialog.getItem(self, "Exportar p/ Contabilidade", "Formato:", formatos, 0, False)
+        if not ok: return
+        pasta = QFileDialog.getExistingDirectory(self, "Pasta para os arquivos do mês")
+        if not pasta: return
+        inicio, fim = db.periodo_do_mes(datetime.now().month, datetime.now().year)
+        tarefa = TarefaContabil(inicio, fim, pasta, formato)
+        tarefa.sinais.progresso.connect(
+            lambda tabela, linhas: self.lbl_exportacao.setText(f"Exportando {tabela}: {linhas} linhas..."))
+        tarefa.sinais.concluida.connect(self.contabil_concluida)
+        tarefa.sinais.falhou.connect(self.contabil_falhou)
+        self.tarefa_contabil = tarefa.sinais
+        self.btn_contabil.setEnabled(False)
+        QThreadPool.globalInstance().start(tarefa)
+
+    def contabil_concluida(self, res):
+        self.btn_contabil.setEnabled(True)
+        self.lbl_exportacao.setText(f"{res['linhas']} linhas exportadas em {res['segundos']:.1f}s")
+
+    def contabil_falhou(self, erro):
+        self.btn_contabil.setEnabled(True)
+        self.lbl_exportacao.setText("")
+        QMessageBox.critical(self, "Erro", erro)
+
+    def exportacao_concluida(self, res):
+        self.btn_exportar.setEnabled(True)
+        self.lbl_exportacao.setText(
+            f"{res['notas']} notas exportadas ({res['paginas_por_segundo']:.1f} páginas/s)")
+
+    def exportacao_falhou(self, erro):
+        self.btn_exportar.setEnabled(True)
+        self.lbl_exportacao.setText("")
+        QMessageBox.critical(self, "Erro", erro)
+
+class DialogoDiagnostico(QDialog):
+    """Tempos medidos pelo servicos.diagnostico, para investigar lentidão."""
+    COLUNAS = ["Tipo", "Nome", "Chamadas", "Total (ms)", "Média (ms)", "p95 (ms)", "Máx (ms)", "Linhas"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnóstico de Desempenho")
+        self.resize(1000, 600)
+        
+        layout = QVBoxLayout()
+        layout.setContentsMargins(20, 20, 20, 20)
+        
+        lbl = QLabel("Diagnóstico")
+        lbl.setProperty("class", "titulo")
+        layout.addWidget(lbl)
+        
+        h_topo = QHBoxLayout()
+        self.chk_ativo = QCheckBox("Medição ligada")
+        self.chk_ativo.setChecked(diagnostico.ativo())
+        self.chk_ativo.toggled.connect(self.alternar)
+        self.filtro = QComboBox()
+        self.filtro.addItems(["Todos", diagnostico.SQL, diagnostico.BANCO, diagnostico.RESPOSTA,
+                              diagnostico.INTERFACE, diagnostico.PDF])
+        self.filtro.currentIndexChanged.connect(self.atualizar)
+        h_topo.addWidget(self.chk_ativo)
+        h_topo.addStretch()
+        h_topo.addWidget(QLabel("Tipo:"))
+        h_topo.addWidget(self.filtro)
+        layout.addLayout(h_topo)
+        
+        self.tabela = QTableWidget(0, len(self.COLUNAS))
+        self.tabela.setHorizontalHeaderLabels(self.COLUNAS)
+        self.tabela.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.tabela.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tabela.setAlternatingRowColors(True)
+        self.tabela.setShowGrid(False)
+        self.tabela.verticalHeader().setVisible(False)
+        self.tabela.currentCellChanged.connect(lambda linha, *_: self.mostrar_histograma(linha))
+        layout.addWidget(self.tabela)
+        
+        self.lbl_histograma = QLabel("", styleSheet="color: #666;")
+        self.lbl_histograma.setWordWrap(True)
+        layout.addWidget(self.lbl_histograma)
+        
+        h_btns = QHBoxLayout()
+        for texto, funcao in (("Atualizar", self.atualizar), ("Limpar", self.limpar),
+                              ("Exportar JSON", self.exportar_json), ("Exportar CSV", self.exportar_csv)):
+            btn = QPushButton(texto)
+            btn.setCursor(Qt.PointingHandCursor)
+            btn.clicked.connect(funcao)
+            h_btns.addWidget(btn)
+        h_btns.addStretch()
+        btn_close = QPushButton("Fechar")
+        btn_close.clicked.connect(self.close)
+        h_btns.addWidget(btn_close)
+        layout.addLayout(h_btns)
+        
+        self.setLayout(layout)
+        self.resumo = []
+        self.atualizar()
+
+    def alternar(self, ligado):
+        if ligado: diagnostico.ativar()
+        else: diagnostico.desativar()
+
+    def atualizar(self):
+        tipo = self.filtro.currentText()
+        self.resumo = [e for e in diagnostico.resumo() if tipo == "Todos" or e["tipo"] == tipo]
+        self.tabela.setRowCount(len(self.resumo))
+        for i, e in enumerate(self.resumo):
+            valores = [e["tipo"], e["nome"], str(e["chamadas"]), f"{e['total_ms']:.1f}", f"{e['media_ms']:.2f}",
+                       f"{e['p95_ms']:g}", f"{e['max_ms']:.1f}", "" if e["linhas"] is None else str(e["linhas"])]
+            for j, valor in enumerate(valores):
+                item = QTableWidgetItem(valor)
+                if j >= 2: item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if j == 1: item.setToolTip(e["nome"])
+                self.tabela.setItem(i, j, item)
+        self.lbl_histograma.setText("")
+
+    def mostrar_histograma(self, linha):
+        if not 0 <= linha < len(self.resumo): return
+        faixas = self.resumo[linha]["histograma"]
+        self.lbl_histograma.setText("Latência (ms):  " + "   ".join(f"{f}: {n}" for f, n in faixas.items() if n))
+
+    def limpar(self):
+        diagnostico.limpar()
+        self.atualizar()
+
+    def exportar_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar diagnóstico", "diagnostico.json", "JSON (*.json)")
+        if path: diagnostico.exportar_json(path)
+
+    def exportar_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar diagnóstico", "diagnostico.csv", "CSV (*.csv)")
+        if path: diagnostico.exportar_csv(path)
 
 class DialogoSelecionarCliente(QDialog):
     def __init__(self, parent=None):
@@ -462,15 +993,26 @@ class DialogoSelecionarCliente(QDialog):
         lbl.setProperty("class", "titulo")
         layout.addWidget(lbl)
         
-        self.tabela = QTableWidget()
-        self.tabela.setColumnCount(5)
-        self.tabela.setHorizontalHeaderLabels(["Nome", "Telefone", "Carro", "Placa", "Ano"])
+        self.busca = CampoBusca()
+        self.busca.buscar.connect(self.carregar_clientes)
+        self.busca.returnPressed.connect(self.confirmar)
+        layout.addWidget(self.busca)
+        
+        self.modelo = ModeloClientes(self)
+        self.tabela = QTableView()
+        self.tabela.setModel(self.modelo)
+        # Mostra só Nome, Telefone, Carro, Placa e Ano
+        for col in (0, 3, 7, 8):
+            self.tabela.setColumnHidden(col, True)
         self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.tabela.setSelectionMode(QAbstractItemView.SingleSelection)
         self.tabela.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabela.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tabela.verticalHeader().setVisible(False)
         self.tabela.setShowGrid(False)
         self.tabela.setAlternatingRowColors(True)
+        self.tabela.doubleClicked.connect(lambda _: self.confirmar())
+        self.modelo.modelReset.connect(self.selecionar_primeiro)
         layout.addWidget(self.tabela)
         
         self.carregar_clientes()
@@ -490,29 +1032,25 @@ class DialogoSelecionarCliente(QDialog):
         layout.addLayout(btns)
         self.setLayout(layout)
 
-    def carregar_clientes(self):
-        dados = db.listar_clientes()
-        self.tabela.setRowCount(len(dados))
-        for i, row in enumerate(dados):
-            item_nome = QTableWidgetItem(str(row[2]))
-            item_nome.setData(Qt.UserRole, row[0])
-            self.tabela.setItem(i, 0, item_nome)
-            self.tabela.setItem(i, 1, QTableWidgetItem(str(row[3])))
-            self.tabela.setItem(i, 2, QTableWidgetItem(str(row[5])))
-            self.tabela.setItem(i, 3, QTableWidgetItem(str(row[6])))
-            self.tabela.setItem(i, 4, QTableWidgetItem(str(row[7])))
+    def carregar_clientes(self, termo=""):
+        self.modelo.filtrar(termo)
+
+    def selecionar_primeiro(self):
+        if self.busca.text().strip() and self.modelo.rowCount():
+            self.tabela.selectRow(0)
 
     def confirmar(self):
-        r = self.tabela.currentRow()
+        r = self.tabela.currentIndex().row()
         if r < 0: 
             QMessageBox.warning(self, "Aviso", "Selecione um cliente da lista.")
             return
+        id_cli, _, dados = self.modelo.cliente(r)
         self.cliente_selecionado = {
-            "id": self.tabela.item(r, 0).data(Qt.UserRole),
-            "nome": self.tabela.item(r, 0).text(),
-            "telefone": self.tabela.item(r, 1).text(),
-            "carro": self.tabela.item(r, 2).text(),
-            "placa": self.tabela.item(r, 3).text()
+            "id": id_cli,
+            "nome": dados[0],
+            "telefone": dados[1],
+            "carro": dados[3],
+            "placa": dados[4]
         }
         self.accept()
     
@@ -542,9 +1080,11 @@ class DialogoServico(QDialog):
         layout.addWidget(card)
         
         # --- AUTOCOMPLETAR ---
-        produtos = [p[0] for p in db.listar_produtos()]
-        self.completer = QCompleter(produtos)
+        # As sugestões vêm do banco conforme se digita; abrir a tela não carrega o catálogo
+        self.sugestoes = ModeloSugestoes(self)
+        self.completer = QCompleter(self.sugestoes, self)
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.sugestoes.completer = self.completer
         
         layout.addWidget(QLabel("Itens do Serviço"))
         
@@ -603,6 +1143,8 @@ class DialogoServico(QDialog):
         
         # Descrição com Autocomplete
         inp_desc = QLineEdit()
+        # Conectado antes do completer para as sugestões já estarem prontas
+        inp_desc.textEdited.connect(self.atualizar_sugestoes)
         inp_desc.setCompleter(self.completer)
         # Quando selecionar um item, preencher o valor
         inp_desc.editingFinished.connect(lambda: self.preencher_valor(r, inp_desc.text()))
@@ -610,14 +1152,17 @@ class DialogoServico(QDialog):
         
         self.tabela.setItem(r, 2, QTableWidgetItem("0,00"))
 
+    def atualizar_sugestoes(self, texto):
+        self.sugestoes.buscar(texto)
+
     def preencher_valor(self, row, nome_item):
-        # Procura o valor no banco
-        produtos_db = db.listar_produtos()
-        for nome, valor in produtos_db:
-            if nome.lower() == nome_item.lower():
-                self.tabela.setItem(row, 2, QTableWidgetItem(f"{valor:.2f}".replace('.', ',')))
-                self.calc()
-                break
+        # Procura o valor no catálogo fora da thread da interface
+        banco().executar(db.preco_produto, nome_item, ao_concluir=lambda valor: self.mostrar_valor(row, valor))
+
+    def mostrar_valor(self, row, valor):
+        if valor is not None and row < self.tabela.rowCount():
+            self.tabela.setItem(row, 2, QTableWidgetItem(f"{valor:.2f}".replace('.', ',')))
+            self.calc()
     
     def remover_item(self):
         r = self.tabela.currentRow()
@@ -700,6 +1245,15 @@ class CadastroCliente(QWidget):
         btn.clicked.connect(self.salvar)
         layout.addWidget(btn)
         
+        # Cadastro em massa a partir de planilha
+        self.btn_importar = QPushButton("Importar Clientes de CSV")
+        self.btn_importar.setCursor(Qt.PointingHandCursor)
+        self.btn_importar.clicked.connect(
+            lambda: iniciar_importacao(self, importacao.importar_clientes, self.btn_importar, self.lbl_importacao))
+        self.lbl_importacao = QLabel("", styleSheet="color: #666;")
+        layout.addWidget(self.btn_importar)
+        layout.addWidget(self.lbl_importacao)
+        
         self.setLayout(layout)
         
     def salvar(self):
@@ -707,8 +1261,17 @@ class CadastroCliente(QWidget):
         if not dados[0].strip():
             QMessageBox.warning(self, "Atenção", "Nome obrigatório.")
             return
-        salvar_cliente(*dados)
-        if self.parent: self.parent.carregar()
+        # Placa já cadastrada em outra ficha: o carro trocou de dono
+        banco().executar(db.obter_cliente_por_placa, dados[4], ao_concluir=lambda dono: self.confirmar_salvar(dados, dono))
+
+    def confirmar_salvar(self, dados, dono):
+        if dono and QMessageBox.question(
+                self, "Placa já cadastrada",
+                f"A placa {dados[4]} está na ficha de {dono[2]}.\n"
+                "Salvar transfere o veículo para o novo cliente (o histórico do carro é mantido). Continuar?"
+        ) != QMessageBox.Yes:
+            return
+        banco().executar(db.salvar_cliente, *dados)
         self.close()
 
 class DetalheCliente(QWidget):
@@ -760,7 +1323,7 @@ class DetalheCliente(QWidget):
         h_btns = QHBoxLayout()
         btn_hist = QPushButton("Ver Histórico")
         btn_hist.setCursor(Qt.PointingHandCursor)
-        btn_hist.clicked.connect(lambda: DialogoHistorico(id_cli, dados[0], self).exec_())
+        btn_hist.clicked.connect(lambda: DialogoHistorico(id_cli, dados[0], self, placa=dados[4]).exec_())
         
         btn_del = QPushButton("Excluir")
         btn_del.setProperty("class", "danger")
@@ -776,24 +1339,158 @@ class DetalheCliente(QWidget):
         if not telefone:
             QMessageBox.warning(self, "Erro", "Cliente sem telefone cadastrado.")
             return
-            
-        # Adiciona o código do país se não tiver (assumindo Brasil +55)
-        if len(telefone) <= 11: # Se for só DDD + Número
-            telefone = "55" + telefone
-            
-        url = f"https://web.whatsapp.com/send?phone={telefone}&text=Olá, gostaria de falar sobre o serviço do seu veículo."
-        webbrowser.open(url)
+
+        import webbrowser
+        webbrowser.open(operacoes.link_whatsapp(telefone))
 
     def mudar_status(self, txt):
-        db.atualizar_status(self.id_cli, txt)
-        if self.parent: self.parent.carregar()
+        # As telas abertas recebem a alteração pelo notificador
+        banco().executar(db.atualizar_status, self.id_cli, txt)
         
     def excluir(self):
         if QMessageBox.question(self, "Excluir", "Tem certeza?") == QMessageBox.Yes:
-            db.deletar_cliente(self.id_cli)
-            if self.parent: self.parent.carregar()
+            banco().executar(db.deletar_cliente, self.id_cli)
             self.close()
 
+# =============================================================================
+# GERAÇÃO DE NOTAS (PDF)
+# =============================================================================
+class SinaisNota(QObject):
+    progresso = pyqtSignal(str)
+    concluida = pyqtSignal(str)
+    falhou = pyqtSignal(str)
+
+class TarefaNota(QRunnable):
+    """Gera o PDF fora da thread da interface e só então grava o histórico."""
+    def __init__(self, arquivo, cliente, itens, total):
+        super().__init__()
+        self.arquivo = arquivo
+        self.cliente = cliente
+        self.itens = itens
+        self.total = total
+        self.sinais = SinaisNota()
+
+    def run(self):
+        try:
+            operacoes.emitir_nota(self.arquivo, self.cliente, self.itens, self.total,
+                                  progresso=self.sinais.progresso.emit)
+        except Exception as e:
+            self.sinais.falhou.emit(f"{self.cliente['nome']}: {e}")
+            return
+        self.sinais.concluida.emit(self.arquivo)
+
+class SinaisExportacao(QObject):
+    progresso = pyqtSignal(int, int)
+    concluida = pyqtSignal(dict)
+    falhou = pyqtSignal(str)
+
+class TarefaExportacao(QRunnable):
+    """Reemissão em lote (pool de processos) sem travar a interface."""
+    def __init__(self, inicio, fim, destino):
+        super().__init__()
+        self.inicio = inicio
+        self.fim = fim
+        self.destino = destino
+        self.sinais = SinaisExportacao()
+
+    def run(self):
+        try:
+            res = exportar_periodo(self.inicio, self.fim, self.destino, progresso=self.sinais.progresso.emit)
+        except Exception as e:
+            self.sinais.falhou.emit(str(e))
+            return
+        self.sinais.concluida.emit(res)
+
+class SinaisContabil(QObject):
+    progresso = pyqtSignal(str, int)
+    concluida = pyqtSignal(dict)
+    falhou = pyqtSignal(str)
+
+class TarefaContabil(QRunnable):
+    """Exportação para a contabilidade; lê de uma conexão própria, sem segurar a da interface."""
+    def __init__(self, inicio, fim, destino, formato):
+        super().__init__()
+        self.inicio = inicio
+        self.fim = fim
+        self.destino = destino
+        self.formato = formato
+        self.sinais = SinaisContabil()
+
+    def run(self):
+        try:
+            res = contabil.exportar_contabil(self.inicio, self.fim, self.destino, self.formato,
+                                             progresso=self.sinais.progresso.emit)
+        except Exception as e:
+            self.sinais.falhou.emit(str(e))
+            return
+        self.sinais.concluida.emit(res)
+
+class SinaisImportacao(QObject):
+    progresso = pyqtSignal(int, int)
+    concluida = pyqtSignal(dict)
+    falhou = pyqtSignal(str)
+
+class TarefaImportacao(QRunnable):
+    """Importação de CSV em segundo plano; as telas se atualizam pelo notificador."""
+    def __init__(self, importar, arquivo):
+        super().__init__()
+        self.importar = importar
+        self.arquivo = arquivo
+        self.sinais = SinaisImportacao()
+
+    def run(self):
+        try:
+            res = self.importar(self.arquivo, progresso=self.sinais.progresso.emit)
+        except Exception as e:
+            self.sinais.falhou.emit(str(e))
+            return
+        self.sinais.concluida.emit(res)
+
+def iniciar_importacao(janela, importar, botao, lbl):
+    """Escolhe o CSV e roda `importar` no pool, mostrando o avanço em `lbl`."""
+    path, _ = QFileDialog.getOpenFileName(janela, "Importar CSV", "", "CSV (*.csv *.txt)")
+    if not path: return
+
+    def concluida(res):
+        botao.setEnabled(True)
+        lbl.setText(f"{res['importadas']} importados, {res['duplicadas']} duplicados, "
+                    f"{res['invalidas']} inválidos ({res['segundos']:.1f}s)")
+        if res["erros"]:
+            detalhes = "\n".join(f"Linha {n}: {motivo}" for n, motivo in res["erros"][:15])
+            QMessageBox.warning(janela, "Linhas ignoradas", detalhes)
+
+    def falhou(erro):
+        botao.setEnabled(True)
+        lbl.setText("")
+        QMessageBox.critical(janela, "Erro", f"Não foi possível importar: {erro}")
+
+    tarefa = TarefaImportacao(importar, path)
+    tarefa.sinais.progresso.connect(lambda linha, pct: lbl.setText(f"Importando... {pct}%"))
+    tarefa.sinais.concluida.connect(concluida)
+    tarefa.sinais.falhou.connect(falhou)
+    janela.tarefa_importacao = tarefa.sinais
+    botao.setEnabled(False)
+    QThreadPool.globalInstance().start(tarefa)
+
+class SinaisBackup(QObject):
+    progresso = pyqtSignal(str, int, int)
+    concluida = pyqtSignal(dict)
+    falhou = pyqtSignal(str)
+
+class TarefaBackup(QRunnable):
+    """Backup com o programa aberto; a cópia usa uma conexão própria, só de leitura."""
+    def __init__(self):
+        super().__init__()
+        self.sinais = SinaisBackup()
+
+    def run(self):
+        try:
+            res = backup.criar_backup(progresso=self.sinais.progresso.emit)
+        except Exception as e:
+            self.sinais.falhou.emit(str(e))
+            return
+        self.sinais.concluida.emit(res)
+
 # =============================================================================
 # MENU PRINCIPAL
 # =============================================================================
@@ -801,7 +1498,8 @@ class DetalheCliente(QWidget):
 class MenuPrincipal(QWidget):
     def __init__(self):
         super().__init__()
-        verificar_banco_historico()
+        self.pool = QThreadPool.globalInstance()
+        self.tarefas_pendentes = set()
         
         self.setWindowTitle("Sistema Oficina Pro")
         self.setGeometry(100, 100, 1200, 700)
@@ -815,10 +1513,16 @@ class MenuPrincipal(QWidget):
         lbl_logo.setProperty("class", "titulo")
         layout.addWidget(lbl_logo)
         
+        # Busca
+        self.busca = CampoBusca()
+        self.busca.buscar.connect(lambda termo: self.modelo.filtrar(termo))
+        layout.addWidget(self.busca)
+        
         # Tabela
-        colunas = ["Status", "Nome", "Telefone", "Endereço", "Carro", "Placa", "Ano", "KM", "Obs"]
-        self.tabela = QTableWidget(0, len(colunas))
-        self.tabela.setHorizontalHeaderLabels(colunas)
+        self.modelo = ModeloClientes(self)
+        self.tabela = QTableView()
+        self.tabela.setModel(self.modelo)
+        self.tabela.setItemDelegateForColumn(0, DelegateStatus(self.tabela))
         self.tabela.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.tabela.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.tabela.horizontalHeader().setSectionResizeMode(8, QHeaderView.Stretch)
@@ -850,6 +1554,16 @@ class MenuPrincipal(QWidget):
         b_cat.setCursor(Qt.PointingHandCursor)
         b_cat.clicked.connect(self.abrir_catalogo)
         
+        b_diag = QPushButton("Diagnóstico")
+        b_diag.setCursor(Qt.PointingHandCursor)
+        b_diag.clicked.connect(self.abrir_diagnostico)
+        
+        self.b_backup = QPushButton("Backup")
+        self.b_backup.setCursor(Qt.PointingHandCursor)
+        self.b_backup.clicked.connect(self.fazer_backup)
+        # No terminal de um servidor o backup é feito no computador do banco
+        self.b_backup.setVisible(not remoto.conectado())
+        
         b_sair = QPushButton("Sair")
         b_sair.clicked.connect(self.close)
         
@@ -858,13 +1572,20 @@ class MenuPrincipal(QWidget):
         hbox.addWidget(b_fin)
         hbox.addWidget(b_cat)
         hbox.addStretch()
+        self.lbl_status = QLabel("", styleSheet="color: #666;")
+        hbox.addWidget(self.lbl_status)
+        hbox.addWidget(self.b_backup)
+        hbox.addWidget(b_diag)
         hbox.addWidget(b_sair)
         
         layout.addLayout(hbox)
         self.setLayout(layout)
         
         self.carregar()
-        self.tabela.cellDoubleClicked.connect(self.detalhes)
+        self.tabela.doubleClicked.connect(self.detalhes)
+        # Backup diário ao abrir só se a oficina pedir (OFICINA_BACKUP_DIARIO=1)
+        if os.environ.get("OFICINA_BACKUP_DIARIO") == "1" and not remoto.conectado() and backup.precisa_backup():
+            self.fazer_backup()
         
     def abrir_cadastro(self):
         self.janela_cadastro = CadastroCliente(self)
@@ -878,143 +1599,88 @@ class MenuPrincipal(QWidget):
         self.janela_catalogo = DialogoProdutos(self)
         self.janela_catalogo.show()
 
+    def abrir_diagnostico(self):
+        self.janela_diagnostico = DialogoDiagnostico(self)
+        self.janela_diagnostico.show()
+
     def carregar(self):
-        conn = conectar()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, status, nome, telefone, endereco, carro, placa, ano, km, observacoes FROM clientes")
-        except:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, 'Aberto', nome, telefone, endereco, carro, placa, ano, km, observacoes FROM clientes")
-            
-        dados = cursor.fetchall()
-        self.tabela.setRowCount(len(dados))
-        for i, row in enumerate(dados):
-            id_cli = row[0]
-            status = row[1] if row[1] else 'Aberto'
-            
-            item_st = QTableWidgetItem(status)
-            item_st.setData(Qt.UserRole, id_cli)
-            
-            if status in ["Concluído", "Entregue"]: 
-                item_st.setForeground(QColor("#2E7D32"))
-                item_st.setFont(QFont("Segoe UI", weight=QFont.Bold))
-            elif status == "Aguardando Peça": 
-                item_st.setForeground(QColor("#E65100"))
-            elif status == "Em Andamento": 
-                item_st.setForeground(QColor("#1565C0"))
-            
-            self.tabela.setItem(i, 0, item_st)
-            for j in range(2, 10): 
-                self.tabela.setItem(i, j-1, QTableWidgetItem(str(row[j])))
-        conn.close()
+        # Só a primeira página é buscada; o resto vem via fetchMore ao rolar
+        self.modelo.recarregar()
                 
-    def detalhes(self, r, c):
-        id_cli = self.tabela.item(r, 0).data(Qt.UserRole)
-        status = self.tabela.item(r, 0).text()
-        dados = [self.tabela.item(r, x).text() for x in range(1, 9)]
+    def detalhes(self, index):
+        id_cli, status, dados = self.modelo.cliente(index.row())
         self.janela_detalhes = DetalheCliente(id_cli, dados, status, self)
         self.janela_detalhes.show()
         
     def gerar_nota(self):
         sel = DialogoSelecionarCliente(self)
-        if sel.exec_():
-            cli = sel.get_dados()
+        ok = sel.exec_()
+        cli = sel.get_dados()
+        # Descarta o diálogo para o modelo dele parar de receber notificações
+        sel.deleteLater()
+        if ok:
             serv = DialogoServico(cli, self)
             if serv.exec_():
                 itens, tot = serv.get_data()
                 path, _ = QFileDialog.getSaveFileName(self, "Salvar PDF", f"Nota_{cli['nome']}.pdf", "PDF (*.pdf)")
                 if path:
-                    try:
-                        self.criar_pdf(path, cli, itens, tot)
-                        
-                        itens_json = json.dumps(itens)
-                        hj = datetime.now().strftime('%d/%m/%Y')
-                        db.salvar_historico(cli['id'], hj, itens_json, tot, path)
-                        
-                        QMessageBox.information(self, "Sucesso", "Nota salva com sucesso!")
-                    except Exception as e: QMessageBox.critical(self, "Erro", str(e))
-
-    def criar_pdf(self, arquivo, cliente, itens, total):
-        c = canvas.Canvas(arquivo, pagesize=A4)
-        w, h = A4; m = 50; y = 800
-        
-        c.setFont("Helvetica-Bold", 16)
-        c.drawCentredString(w/2, y, "Auto Elétrica Diniz")
-        y -= 20
-        c.setFont("Helvetica", 11)
-        c.drawCentredString(w/2, y, "Av Almirante Tamandaré, 700 - Piratininga")
-        y -= 15
-        c.drawCentredString(w/2, y, "Telefone: (21) 97612-4007")
-        y -= 20
-        c.drawCentredString(w/2, y, f"Data: {datetime.now().strftime('%d/%m/%Y')}")
-        
-        y -= 20
-        c.setLineWidth(1)
-        c.line(m, y, w-m, y)
-        
-        y -= 40
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(m, y, f"Cliente: {cliente['nome']}")
-        
-        y -= 30
-        col_qtd = m
-        col_desc = m + 40
-        col_val = w - 150
-        h_row = 20
-        
-        c.setFillColor(colors.lightgrey)
-        c.rect(col_qtd, y-5, w-(m*2), h_row, fill=1, stroke=1)
-        c.setFillColor(colors.black)
-        
-        c.line(col_desc, y-5, col_desc, y+15)
-        c.line(col_val, y-5, col_val, y+15)
-        
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(col_qtd+5, y, "Qtd.")
-        c.drawString(col_desc+5, y, "Descrição")
-        c.drawString(col_val+5, y, "Valor Total")
-        
-        y -= h_row
-        c.setFont("Helvetica", 11)
-        
-        for q, d, v in itens:
-            c.rect(col_qtd, y-5, w-(m*2), h_row, fill=0, stroke=1)
-            c.line(col_desc, y-5, col_desc, y+15)
-            c.line(col_val, y-5, col_val, y+15)
-            
-            c.drawString(col_qtd+5, y, str(q))
-            c.drawString(col_desc+5, y, d)
-            c.drawString(col_val+5, y, f"R$ {v:,.2f}".replace('.', ','))
-            y -= h_row
-            
-            if y < 100:
-                c.showPage()
-                y = 800
-                c.setFont("Helvetica", 11)
-
-        y -= 20
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(m, y, f"Valor Total: R$ {total:,.2f}".replace('.', ','))
-        
-        y -= 30
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(m, y, "Forma de Pagamento: [Dinheiro / PIX / Cartão / Transferência]")
-        
-        y -= 50
-        c.setFont("Helvetica-Oblique", 11)
-        c.drawString(m, y, "Observações:")
-        y -= 20
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawString(m, y, "- Garantia de 90 dias conforme o Código de Defesa do Consumidor.")
-        y -= 15
-        c.drawString(m, y, "- Qualquer problema, favor entrar em contato imediatamente.")
-        
-        c.save()
+                    # O PDF sai em segundo plano; já dá para começar a próxima nota
+                    tarefa = TarefaNota(path, cli, itens, tot)
+                    tarefa.sinais.progresso.connect(self.lbl_status.setText)
+                    tarefa.sinais.concluida.connect(lambda p, s=tarefa.sinais: self.nota_concluida(s, p))
+                    tarefa.sinais.falhou.connect(lambda e, s=tarefa.sinais: self.nota_falhou(s, e))
+                    self.tarefas_pendentes.add(tarefa.sinais)
+                    self.pool.start(tarefa)
+
+    def nota_concluida(self, sinais, arquivo):
+        self.tarefas_pendentes.discard(sinais)
+        self.lbl_status.setText(f"Nota salva: {os.path.basename(arquivo)}")
+
+    def nota_falhou(self, sinais, erro):
+        self.tarefas_pendentes.discard(sinais)
+        self.lbl_status.setText("")
+        QMessageBox.critical(self, "Erro", erro)
+
+    def fazer_backup(self):
+        tarefa = TarefaBackup()
+        tarefa.sinais.progresso.connect(self.progresso_backup)
+        tarefa.sinais.concluida.connect(self.backup_concluido)
+        tarefa.sinais.falhou.connect(self.backup_falhou)
+        self.tarefa_backup = tarefa.sinais
+        self.b_backup.setEnabled(False)
+        self.pool.start(tarefa)
+
+    def progresso_backup(self, etapa, feito, total):
+        texto = {"banco": "copiando o banco", "notas": "guardando as notas", "verificacao": "verificando"}[etapa]
+        self.lbl_status.setText(f"Backup: {texto}... {feito * 100 // max(total, 1)}%")
+
+    def backup_concluido(self, res):
+        self.b_backup.setEnabled(True)
+        texto = f"Backup salvo: {os.path.basename(res['arquivo'])} ({res['bytes'] / 2**20:.1f} MB, {res['segundos']:.0f}s)"
+        if res["faltando"]:
+            texto += f", {len(res['faltando'])} PDF(s) não encontrados"
+        self.lbl_status.setText(texto)
+
+    def backup_falhou(self, erro):
+        self.b_backup.setEnabled(True)
+        self.lbl_status.setText("")
+        QMessageBox.critical(self, "Erro no backup", erro)
 
 if __name__ == "__main__":
+    # Terminal de um servidor (servicos.servidor): o banco local não é aberto
+    servidor = os.environ.get("OFICINA_SERVIDOR")
+    if "--servidor" in sys.argv[:-1]:
+        i = sys.argv.index("--servidor")
+        servidor = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
+    if servidor:
+        remoto.conectar_servidor(servidor, token=os.environ.get("OFICINA_TOKEN"))
     app = QApplication(sys.argv)
     app.setStyleSheet(STYLESHEET)
+    # Termina as notas em andamento antes de fechar o banco
+    app.aboutToQuit.connect(QThreadPool.globalInstance().waitForDone)
+    app.aboutToQuit.connect(banco().encerrar)
+    app.aboutToQuit.connect(db.fechar_conexao)
     window = MenuPrincipal()
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -1,22 +1,239 @@
 import sqlite3
 import os
-from datetime import datetime
+import atexit
+import json
+import re
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
 
 # --- CONFIGURAÇÃO DO CAMINHO ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 DB_NAME = os.path.join(DATA_DIR, "banco.db")
 
+# --- AJUSTES DO SQLITE ---
+PRAGMAS = {
+    "journal_mode": "WAL",        # leitores não bloqueiam o escritor
+    "busy_timeout": 5000,         # ms esperando outra instância liberar o arquivo
+    "synchronous": "NORMAL",      # com WAL, fsync só no checkpoint
+    "cache_size": -20000,         # ~20 MB de cache de páginas
+    "mmap_size": 268435456,       # 256 MB mapeados em memória
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+}
+
+class GerenciadorConexao:
+    """Mantém uma única conexão aberta durante todo o processo.
+
+    O arquivo só é aberto (e o esquema conferido) no primeiro uso, então
+    importar este módulo não toca no disco.
+    """
+
+    def __init__(self, caminho=DB_NAME, pragmas=None):
+        self.caminho = caminho
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self.lock = threading.RLock()
+        self._conn = None
+        self.anexados = {}    # ano -> arquivo já anexado (ATTACH) na conexão aberta
+
+    def _abrir(self):
+        caminho = self.caminho
+        pasta = os.path.dirname(caminho)
+        if pasta and not os.path.exists(pasta):
+            try: os.makedirs(pasta)
+            except: caminho = "banco.db"
+        conn = sqlite3.connect(caminho, check_same_thread=False)
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome}={valor}")
+        if _rastreador:
+            conn.set_trace_callback(_rastreador)
+        return conn
+
+    def conexao(self):
+        with self.lock:
+            if self._conn is None:
+                conn = self._abrir()
+                _migrar(conn)
+                self._conn = conn
+            return self._conn
+
+    def fechar(self):
+        with self.lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("PRAGMA optimize")
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass
+            self._conn.close()
+            self._conn = None
+            self.anexados = {}
+
+class _ConexaoCompartilhada:
+    """Envolve a conexão persistente; close() não fecha de verdade."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+_gerenciador = GerenciadorConexao()
+_rastreador = None
+
 def conectar():
-    if not os.path.exists(DATA_DIR):
-        try: os.makedirs(DATA_DIR)
-        except: return sqlite3.connect("banco.db")
-    return sqlite3.connect(DB_NAME)
+    return _ConexaoCompartilhada(_gerenciador.conexao())
+
+def fechar_conexao():
+    """Gancho de encerramento: otimiza, faz checkpoint do WAL e fecha."""
+    _gerenciador.fechar()
+
+atexit.register(fechar_conexao)
+
+def configurar(caminho, pragmas=None):
+    """Aponta a camada de dados para outro arquivo (testes, benchmarks)."""
+    global _gerenciador
+    _gerenciador.fechar()
+    _gerenciador = GerenciadorConexao(caminho, pragmas)
+
+def caminho_banco():
+    return _gerenciador.caminho
+
+def definir_rastreador(funcao):
+    """Recebe o texto de cada comando SQL executado (None desliga). Ver servicos.diagnostico."""
+    global _rastreador
+    _rastreador = funcao
+    with _gerenciador.lock:
+        if _gerenciador._conn is not None:
+            _gerenciador._conn.set_trace_callback(funcao)
+
+_lote = threading.local()
+
+@contextmanager
+def transacao():
+    """Cursor dentro de uma transação: commit no sucesso, rollback no erro.
+
+    Dentro de lote_escrita() vira um SAVEPOINT: o erro desfaz só esta escrita.
+    """
+    conn = _gerenciador.conexao()
+    with _gerenciador.lock:
+        if getattr(_lote, "ativo", False):
+            conn.execute("SAVEPOINT transacao")
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.execute("ROLLBACK TO transacao")
+                conn.execute("RELEASE transacao")
+                raise
+            conn.execute("RELEASE transacao")
+            return
+        with conn:
+            yield conn.cursor()
+
+@contextmanager
+def lote_escrita():
+    """Várias escritas numa só transação: um commit (e um fsync) para todas.
+
+    Cada transacao() do bloco é um SAVEPOINT, então uma escrita que falha não
+    derruba as outras. Os ouvintes são avisados antes do commit do lote; quem
+    usa (servicos.servidor) segura os avisos até o fim do bloco.
+    """
+    conn = _gerenciador.conexao()
+    with _gerenciador.lock:
+        conn.execute("BEGIN IMMEDIATE")
+        _lote.ativo = True
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            _lote.ativo = False
+
+@contextmanager
+def leitura_isolada():
+    """Conexão só de leitura, à parte da compartilhada, numa única transação.
+
+    Para leituras longas (exportações): com WAL, todo o período é lido do
+    mesmo instante do banco e a conexão compartilhada segue livre para a
+    interface e para quem grava.
+    """
+    caminho = os.path.abspath(_gerenciador.caminho)
+    conectar()  # garante o arquivo criado e migrado
+    conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        conn.execute("PRAGMA busy_timeout=5000")
+        # ATTACH não roda dentro de transação: os anos arquivados entram antes
+        _anexar_arquivos(conn, dict(conn.execute("SELECT ano, arquivo FROM arquivos_anuais")), somente_leitura=True)
+        conn.execute("BEGIN")
+        yield conn
+    finally:
+        conn.close()
+
+def _consultar(sql, params=()):
+    with _gerenciador.lock:
+        return _gerenciador.conexao().execute(sql, params).fetchall()
+
+def _consultar_um(sql, params=()):
+    with _gerenciador.lock:
+        return _gerenciador.conexao().execute(sql, params).fetchone()
+
+# --- NOTIFICAÇÕES DE ALTERAÇÃO ---
+# Ouvintes recebem (tabela, ação, id) depois do commit, na thread que escreveu.
+# RECARREGADO (id 0) avisa que muitas linhas mudaram de uma vez: releia a tabela.
+INSERIDO, ATUALIZADO, REMOVIDO, RECARREGADO = "inserido", "atualizado", "removido", "recarregado"
+_ouvintes = []
+
+def inscrever(funcao):
+    _ouvintes.append(funcao)
+
+def cancelar_inscricao(funcao):
+    if funcao in _ouvintes: _ouvintes.remove(funcao)
+
+def _notificar(tabela, acao, id_registro):
+    for funcao in list(_ouvintes):
+        try: funcao(tabela, acao, id_registro)
+        except Exception as e: print(f"Erro ao notificar alteração em {tabela}: {e}")
+
+# --- ESQUEMA E MIGRAÇÕES ---
+# Cada migração roda uma única vez, em ordem, dentro de uma transação, e o
+# número da última aplicada fica em PRAGMA user_version. Numa base já
+# atualizada a abertura só lê esse número. Mudança de esquema nova entra
+# como uma função nova no fim de MIGRACOES; as existentes não mudam mais.
+
+def _migrar(conn):
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    for numero in range(versao + 1, len(MIGRACOES) + 1):
+        with conn:
+            c = conn.cursor()
+            c.execute("BEGIN")  # o sqlite3 não abre transação sozinho antes de DDL
+            MIGRACOES[numero - 1](c)
+            c.execute(f"PRAGMA user_version = {numero}")
+
+def versao_esquema():
+    """Número da última migração aplicada à base atual."""
+    return _consultar_um("PRAGMA user_version")[0]
 
 def criar_tabelas():
-    conn = conectar()
-    c = conn.cursor()
-    
+    """Aplica as migrações pendentes; a primeira conexão já faz isso sozinha."""
+    with _gerenciador.lock:
+        _migrar(_gerenciador.conexao())
+
+def _criar_tabelas_base(c):
+    """Tabelas originais. Bases antigas podem já tê-las, sem a coluna status."""
     # Clientes
     c.execute("""
         CREATE TABLE IF NOT EXISTS clientes (
@@ -26,7 +243,7 @@ def criar_tabelas():
             status TEXT DEFAULT 'Aberto'
         )
     """)
-    
+
     # Histórico
     c.execute("""
         CREATE TABLE IF NOT EXISTS historico_servicos (
@@ -39,7 +256,7 @@ def criar_tabelas():
             FOREIGN KEY(id_cliente) REFERENCES clientes(id)
         )
     """)
-    
+
     # Fechamentos
     c.execute("""
         CREATE TABLE IF NOT EXISTS fechamentos (
@@ -60,104 +277,1205 @@ def criar_tabelas():
         )
     """)
 
-    conn.commit()
-    conn.close()
+    colunas = [linha[1] for linha in c.execute("PRAGMA table_info(clientes)")]
+    if "status" not in colunas:
+        c.execute("ALTER TABLE clientes ADD COLUMN status TEXT DEFAULT 'Aberto'")
+
+# Data já no formato ISO (o que as consultas por faixa e os agregados entendem)
+_SQL_DATA_ISO = "GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+def _migrar_datas_iso(c):
+    """Converte datas 'd/m/YYYY' antigas (com ou sem zeros) para ISO e indexa a coluna.
+
+    O que não é uma data válida fica como está e é avisado aqui; a lista
+    sai em datas_invalidas() (manutencao datas-invalidas).
+    """
+    convertidas = []
+    for id_nota, data in c.execute(
+            "SELECT id, data_servico FROM historico_servicos WHERE data_servico LIKE '%/%/%'").fetchall():
+        try: convertidas.append((datetime.strptime(data.strip(), "%d/%m/%Y").date().isoformat(), id_nota))
+        except ValueError: pass
+    c.executemany("UPDATE historico_servicos SET data_servico = ? WHERE id = ?", convertidas)
+    restantes = c.execute(f"""
+        SELECT COUNT(*) FROM historico_servicos WHERE data_servico IS NULL OR NOT data_servico {_SQL_DATA_ISO}
+    """).fetchone()[0]
+    if restantes:
+        print(f"Aviso: {restantes} nota(s) sem data ou com data que não foi possível converter; "
+              "veja 'python -m servicos.manutencao datas-invalidas'.")
+    # Índice de cobertura: somas por período viram busca por faixa sem tocar na tabela
+    c.execute("CREATE INDEX IF NOT EXISTS idx_historico_data ON historico_servicos (data_servico, valor_total)")
+
+# Telefone e placa também entram só com letras/dígitos, para casar prefixos
+# como "2197612" ou "ABC1" independente de como foram digitados.
+def _sql_so_alfanumerico(coluna):
+    expr = f"COALESCE({coluna}, '')"
+    for ch in "()-. /":
+        expr = f"replace({expr}, '{ch}', '')"
+    return expr
+
+# --- PLACAS ---
+# A chave da placa é a forma Mercosul: no formato antigo (ABC1234) o 5º
+# caractere, 0-9, vira A-J (ABC1C34), como na conversão oficial. Assim a
+# mesma placa digitada nos dois formatos cai no mesmo veículo.
+PLACA_ANTIGA = re.compile(r"^[A-Z]{3}[0-9]{4}$")
+PLACA_MERCOSUL = re.compile(r"^[A-Z]{3}[0-9][A-Z][0-9]{2}$")
+_SEPARADORES_PLACA = str.maketrans("", "", "()-. /")
+
+def chave_placa(placa):
+    """'abc-1234' e 'ABC1C34' -> 'ABC1C34'; vazio -> None. Igual a _sql_chave_placa."""
+    chave = (placa or "").translate(_SEPARADORES_PLACA).upper()
+    if PLACA_ANTIGA.match(chave):
+        chave = chave[:4] + chr(ord(chave[4]) + 17) + chave[5:]
+    return chave or None
+
+def _sql_chave_placa(coluna):
+    chave = f"upper({_sql_so_alfanumerico(coluna)})"
+    return f"""NULLIF(CASE WHEN {chave} GLOB '[A-Z][A-Z][A-Z][0-9][0-9][0-9][0-9]'
+                      THEN substr({chave}, 1, 4) || char(unicode(substr({chave}, 5, 1)) + 17) || substr({chave}, 6)
+                      ELSE {chave} END, '')"""
+
+def _sql_linha_busca(t):
+    return (f"{t}.id, {t}.nome, COALESCE({t}.telefone, '') || ' ' || {_sql_so_alfanumerico(t + '.telefone')}, "
+            f"{t}.carro, COALESCE({t}.placa, '') || ' ' || {_sql_so_alfanumerico(t + '.placa')}, {t}.endereco")
+
+_COLUNAS_BUSCA = "rowid, nome, telefone, carro, placa, endereco"
+
+def _sql_gatilho_busca_ins():
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS clientes_fts_ins AFTER INSERT ON clientes BEGIN
+            INSERT INTO clientes_fts ({_COLUNAS_BUSCA}) VALUES ({_sql_linha_busca('new')});
+        END
+    """
+
+def _criar_indice_busca(c):
+    """Índice FTS5 de clientes, mantido em sincronia por triggers."""
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE name='clientes_fts'").fetchone()
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(
+            nome, telefone, carro, placa, endereco,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    colunas = _COLUNAS_BUSCA
+    c.execute(_sql_gatilho_busca_ins())
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS clientes_fts_del AFTER DELETE ON clientes BEGIN
+            DELETE FROM clientes_fts WHERE rowid = old.id;
+        END
+    """)
+    # Só os campos pesquisáveis: mudar o status não mexe no índice
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS clientes_fts_upd
+        AFTER UPDATE OF nome, telefone, carro, placa, endereco ON clientes BEGIN
+            DELETE FROM clientes_fts WHERE rowid = old.id;
+            INSERT INTO clientes_fts ({colunas}) VALUES ({_sql_linha_busca('new')});
+        END
+    """)
+    if not existe:
+        c.execute(f"INSERT INTO clientes_fts ({colunas}) SELECT {_sql_linha_busca('clientes')} FROM clientes")
+
+def _criar_itens_servico(c):
+    """Itens de cada nota em linhas próprias; na criação, importa os itens_json antigos."""
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE name='servico_itens'").fetchone()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS servico_itens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_servico INTEGER NOT NULL,
+            quantidade REAL,
+            descricao TEXT,
+            valor_total_item REAL,
+            id_produto INTEGER,
+            FOREIGN KEY(id_servico) REFERENCES historico_servicos(id) ON DELETE CASCADE,
+            FOREIGN KEY(id_produto) REFERENCES produtos(id) ON DELETE SET NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_itens_servico ON servico_itens (id_servico)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_itens_produto ON servico_itens (id_produto)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_itens_descricao ON servico_itens (descricao COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos (nome COLLATE NOCASE)")
+    if not existe:
+        c.execute("""
+            INSERT INTO servico_itens (id_servico, quantidade, descricao, valor_total_item, id_produto)
+            SELECT h.id, json_extract(j.value, '$[0]'), json_extract(j.value, '$[1]'), json_extract(j.value, '$[2]'),
+                   (SELECT p.id FROM produtos p WHERE p.nome = json_extract(j.value, '$[1]') COLLATE NOCASE ORDER BY p.id LIMIT 1)
+            FROM historico_servicos h, json_each(h.itens_json) j
+            WHERE json_valid(h.itens_json)
+            ORDER BY h.id, j.key
+        """)
+
+def _criar_agregados(c):
+    """Faturamento e número de notas por dia e por mês, mantidos por triggers.
+
+    Só entram notas com data ISO: sem data ou com data que a migração 2 não
+    converteu (ver datas_invalidas) elas ficam fora, aqui e no recálculo.
+    """
+    existe = c.execute("SELECT 1 FROM sqlite_master WHERE name='faturamento_dia'").fetchone()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS faturamento_dia (
+            data TEXT PRIMARY KEY,
+            total REAL NOT NULL DEFAULT 0,
+            notas INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS faturamento_mes (
+            mes TEXT PRIMARY KEY,
+            total REAL NOT NULL DEFAULT 0,
+            notas INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    def somar(reg, sinal):
+        return f"""
+            INSERT INTO faturamento_dia (data, total, notas)
+            VALUES ({reg}.data_servico, {sinal} COALESCE({reg}.valor_total, 0), {sinal}1)
+            ON CONFLICT(data) DO UPDATE SET total = total + excluded.total, notas = notas + excluded.notas;
+            INSERT INTO faturamento_mes (mes, total, notas)
+            VALUES (substr({reg}.data_servico, 1, 7), {sinal} COALESCE({reg}.valor_total, 0), {sinal}1)
+            ON CONFLICT(mes) DO UPDATE SET total = total + excluded.total, notas = notas + excluded.notas;
+        """
+
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS faturamento_ins AFTER INSERT ON historico_servicos
+        WHEN new.data_servico {_SQL_DATA_ISO} BEGIN
+            {somar('new', '+')}
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS faturamento_del AFTER DELETE ON historico_servicos
+        WHEN old.data_servico {_SQL_DATA_ISO} BEGIN
+            {somar('old', '-')}
+        END
+    """)
+    # Uma metade para cada lado: a nota pode ganhar ou perder uma data válida
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS faturamento_upd_antigo
+        AFTER UPDATE OF data_servico, valor_total ON historico_servicos
+        WHEN old.data_servico {_SQL_DATA_ISO} BEGIN
+            {somar('old', '-')}
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS faturamento_upd_novo
+        AFTER UPDATE OF data_servico, valor_total ON historico_servicos
+        WHEN new.data_servico {_SQL_DATA_ISO} BEGIN
+            {somar('new', '+')}
+        END
+    """)
+    if not existe:
+        _recalcular_agregados(c)
+
+def _recalcular_agregados(c, historico="historico_servicos"):
+    c.execute("DELETE FROM faturamento_dia")
+    c.execute("DELETE FROM faturamento_mes")
+    c.execute(f"""
+        INSERT INTO faturamento_dia (data, total, notas)
+        SELECT data_servico, COALESCE(SUM(valor_total), 0), COUNT(*)
+        FROM {historico} WHERE data_servico {_SQL_DATA_ISO} GROUP BY data_servico
+    """)
+    c.execute("""
+        INSERT INTO faturamento_mes (mes, total, notas)
+        SELECT substr(data, 1, 7), SUM(total), SUM(notas) FROM faturamento_dia GROUP BY substr(data, 1, 7)
+    """)
+
+def _indexar_historico_por_cliente(c):
+    """Histórico do cliente em ordem de id sem varrer a tabela (paginação)."""
+    c.execute("CREATE INDEX IF NOT EXISTS idx_historico_cliente ON historico_servicos (id_cliente, id)")
+
+def _contar_usos_produtos(c):
+    """produtos.usos: em quantas linhas de nota cada peça já apareceu (ranking das sugestões)."""
+    c.execute("ALTER TABLE produtos ADD COLUMN usos INTEGER NOT NULL DEFAULT 0")
+    c.execute("""
+        UPDATE produtos SET usos = (SELECT COUNT(*) FROM servico_itens i WHERE i.id_produto = produtos.id)
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_usos_ins AFTER INSERT ON servico_itens
+        WHEN new.id_produto IS NOT NULL BEGIN
+            UPDATE produtos SET usos = usos + 1 WHERE id = new.id_produto;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_usos_del AFTER DELETE ON servico_itens
+        WHEN old.id_produto IS NOT NULL BEGIN
+            UPDATE produtos SET usos = usos - 1 WHERE id = old.id_produto;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS produtos_usos_upd AFTER UPDATE OF id_produto ON servico_itens BEGIN
+            UPDATE produtos SET usos = usos - 1 WHERE id = old.id_produto;
+            UPDATE produtos SET usos = usos + 1 WHERE id = new.id_produto;
+        END
+    """)
+
+def _sql_gatilho_placa_ins():
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS clientes_placa_ins AFTER INSERT ON clientes
+        WHEN {_sql_chave_placa('new.placa')} IS NOT NULL BEGIN
+            UPDATE clientes SET placa_chave = NULL WHERE placa_chave = {_sql_chave_placa('new.placa')};
+            UPDATE clientes SET placa_chave = {_sql_chave_placa('new.placa')} WHERE id = new.id;
+        END
+    """
+
+def _indexar_placas(c):
+    """Placa canônica única por cliente e a placa de cada nota (histórico do veículo).
+
+    clientes.placa_chave aponta o dono atual: cadastrar a mesma placa em outra
+    ficha transfere o veículo. historico_servicos.placa_chave guarda a placa
+    do dia da nota, então o histórico do carro atravessa as trocas de dono.
+    """
+    c.execute("ALTER TABLE clientes ADD COLUMN placa_chave TEXT")
+    c.execute("ALTER TABLE historico_servicos ADD COLUMN placa_chave TEXT")
+    c.execute(f"UPDATE clientes SET placa_chave = {_sql_chave_placa('placa')}")
+    c.execute("""
+        UPDATE historico_servicos
+        SET placa_chave = (SELECT c.placa_chave FROM clientes c WHERE c.id = historico_servicos.id_cliente)
+        WHERE id_cliente IS NOT NULL
+    """)
+    # Placas repetidas em bases antigas: o veículo fica com a ficha mais recente
+    c.execute("""
+        UPDATE clientes SET placa_chave = NULL
+        WHERE placa_chave IS NOT NULL
+          AND id NOT IN (SELECT MAX(id) FROM clientes WHERE placa_chave IS NOT NULL GROUP BY placa_chave)
+    """)
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_clientes_placa ON clientes (placa_chave)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_historico_placa ON historico_servicos (placa_chave, id)")
+    c.execute(_sql_gatilho_placa_ins())
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS clientes_placa_upd AFTER UPDATE OF placa ON clientes BEGIN
+            UPDATE clientes SET placa_chave = NULL
+            WHERE placa_chave = {_sql_chave_placa('new.placa')} AND id <> new.id;
+            UPDATE clientes SET placa_chave = {_sql_chave_placa('new.placa')} WHERE id = new.id;
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS historico_placa_ins AFTER INSERT ON historico_servicos
+        WHEN new.placa_chave IS NULL AND new.id_cliente IS NOT NULL BEGIN
+            UPDATE historico_servicos
+            SET placa_chave = (SELECT {_sql_chave_placa('placa')} FROM clientes WHERE id = new.id_cliente)
+            WHERE id = new.id;
+        END
+    """)
+
+# --- REGISTRO DE ALTERAÇÕES (SINCRONIZAÇÃO ENTRE FILIAIS) ---
+# Toda escrita pública grava, na mesma transação, uma linha em `alteracoes`
+# (seq crescente, só se acrescenta). As linhas são identificadas entre
+# instalações pelo `uid` (os ids locais diferem de uma filial para outra).
+_UID = "lower(hex(randomblob(16)))"
+_COLUNAS_SINCRONIZADAS = {
+    "clientes": ("nome", "telefone", "endereco", "carro", "placa", "ano", "km", "observacoes", "status"),
+    "produtos": ("nome", "valor_padrao"),
+    "fechamentos": ("tipo", "periodo", "valor", "data_registro"),
+    "historico_servicos": ("data_servico", "itens_json", "valor_total", "arquivo_path"),
+}
+
+def _sql_dados(tabela):
+    pares = [f"'{col}', {col}" for col in _COLUNAS_SINCRONIZADAS[tabela]]
+    if tabela == "historico_servicos":
+        # O dono vai pelo uid: o id do cliente é outro na outra filial
+        pares.append("'cliente', (SELECT c.uid FROM clientes c WHERE c.id = historico_servicos.id_cliente)")
+    return f"json_object({', '.join(pares)})"
+
+def _registrar(c, tabela, acao, onde, params=()):
+    """Acrescenta ao registro as linhas de `tabela` que casam com `onde`, como estão agora."""
+    c.execute(f"""
+        INSERT INTO alteracoes (origem, tabela, acao, uid, dados)
+        SELECT (SELECT valor FROM configuracao WHERE chave = 'instalacao'), ?, ?, uid, {_sql_dados(tabela)}
+        FROM {tabela} WHERE {onde} ORDER BY id
+    """, (tabela, acao, *params))
+
+def _criar_registro_alteracoes(c):
+    """uid em cada tabela sincronizada, o registro de alterações e as marcas por filial."""
+    for tabela in _COLUNAS_SINCRONIZADAS:
+        c.execute(f"ALTER TABLE {tabela} ADD COLUMN uid TEXT")
+        c.execute(f"UPDATE {tabela} SET uid = {_UID}")
+        c.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabela}_uid ON {tabela} (uid)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            origem TEXT NOT NULL,
+            tabela TEXT NOT NULL,
+            acao TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            dados TEXT,
+            registrado_em TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'))
+        )
+    """)
+    c.execute("CREATE TABLE IF NOT EXISTS configuracao (chave TEXT PRIMARY KEY, valor TEXT) WITHOUT ROWID")
+    c.execute(f"INSERT OR IGNORE INTO configuracao (chave, valor) VALUES ('instalacao', {_UID})")
+    # Até que seq de cada filial já foi aplicado aqui
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS marcas_sincronizacao (
+            par TEXT PRIMARY KEY,
+            recebido INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+def _criar_registro_arquivos(c):
+    """Anos já movidos para os bancos de arquivo (ver arquivar_ano)."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS arquivos_anuais (
+            ano INTEGER PRIMARY KEY,
+            arquivo TEXT NOT NULL,
+            notas INTEGER NOT NULL,
+            fechamentos INTEGER NOT NULL,
+            maior_nota INTEGER NOT NULL DEFAULT 0,        -- maior id de nota e de fechamento no arquivo:
+            maior_fechamento INTEGER NOT NULL DEFAULT 0,  -- as listas só anexam os anos se chegarem lá
+            arquivado_em TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'))
+        )
+    """)
+
+def _preencher_uid(c):
+    """Linhas gravadas fora da API (geradores, scripts, SQL à mão) ganham uid sozinhas.
+
+    Sem ele o registro de alterações não tem como identificá-las e qualquer
+    escrita posterior nelas falharia. O ALTER TABLE não aceita um DEFAULT
+    não constante, então é um gatilho, como historico_placa_ins.
+    """
+    for tabela in _COLUNAS_SINCRONIZADAS:
+        c.execute(f"UPDATE {tabela} SET uid = {_UID} WHERE uid IS NULL")
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_uid AFTER INSERT ON {tabela}
+            WHEN new.uid IS NULL BEGIN
+                UPDATE {tabela} SET uid = {_UID} WHERE id = new.id;
+            END
+        """)
+
+MIGRACOES = [
+    _criar_tabelas_base,              # 1
+    _migrar_datas_iso,                # 2
+    _criar_indice_busca,              # 3
+    _criar_itens_servico,             # 4
+    _criar_agregados,                 # 5
+    _indexar_historico_por_cliente,   # 6
+    _contar_usos_produtos,            # 7
+    _indexar_placas,                  # 8
+    _criar_registro_alteracoes,       # 9
+    _criar_registro_arquivos,         # 10
+    _preencher_uid,                   # 11
+]
+
+def reconstruir_agregados():
+    """Recalcula do zero as tabelas de faturamento por dia e por mês, anos arquivados inclusive."""
+    historico, _, _ = _fontes()
+    with transacao() as c:
+        _recalcular_agregados(c, historico)
+
+# --- DATAS ---
+def data_iso(data):
+    """Aceita date/datetime, 'dd/mm/YYYY' ou 'YYYY-MM-DD' e devolve 'YYYY-MM-DD'."""
+    if isinstance(data, datetime): return data.date().isoformat()
+    if isinstance(data, date): return data.isoformat()
+    if "/" in data: return datetime.strptime(data, "%d/%m/%Y").date().isoformat()
+    return date.fromisoformat(data).isoformat()
+
+def datas_invalidas():
+    """(id, id_cliente, data_servico) das notas sem data ou com data fora do ISO.
+
+    Elas ficam de fora das somas por período e do faturamento por dia/mês.
+    """
+    return _consultar(f"""
+        SELECT id, id_cliente, data_servico FROM historico_servicos
+        WHERE data_servico IS NULL OR NOT data_servico {_SQL_DATA_ISO} ORDER BY id
+    """)
+
+def periodo_do_mes(mes, ano):
+    """(primeiro dia, último dia) do mês."""
+    inicio = date(int(ano), int(mes), 1)
+    proximo = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+    return inicio, date.fromordinal(proximo.toordinal() - 1)
 
 # --- PRODUTOS (NOVO) ---
 def salvar_produto(nome, valor):
-    conn = conectar()
-    conn.cursor().execute("INSERT INTO produtos (nome, valor_padrao) VALUES (?, ?)", (nome, valor))
-    conn.commit()
-    conn.close()
+    with transacao() as c:
+        c.execute(f"INSERT INTO produtos (nome, valor_padrao, uid) VALUES (?, ?, {_UID})", (nome, valor))
+        id_produto = c.lastrowid
+        _registrar(c, "produtos", INSERIDO, "id = ?", (id_produto,))
+    _catalogo.invalidar()
+    _notificar("produtos", INSERIDO, id_produto)
+    return id_produto
+
+def inserir_produtos_em_lote(linhas):
+    """Insere (nome, valor) numa única transação; devolve quantos entraram.
+
+    Não notifica nem limpa o cache a cada lote: quem importa chama
+    concluir_importacao("produtos") no fim.
+    """
+    with transacao() as c:
+        ultimo_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM produtos").fetchone()[0]
+        c.executemany(f"INSERT INTO produtos (nome, valor_padrao, uid) VALUES (?, ?, {_UID})", linhas)
+        inseridas = c.rowcount
+        _registrar(c, "produtos", INSERIDO, "id > ?", (ultimo_id,))
+        return inseridas
+
+def nomes_produtos():
+    return [nome for nome, in _consultar("SELECT nome FROM produtos")]
+
+def obter_produto(id_produto):
+    return _consultar_um("SELECT nome, valor_padrao FROM produtos WHERE id=?", (id_produto,))
 
 def listar_produtos():
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT nome, valor_padrao FROM produtos ORDER BY nome")
-    dados = c.fetchall()
-    conn.close()
-    return dados
+    return _consultar("SELECT nome, valor_padrao FROM produtos ORDER BY nome")
+
+class CatalogoProdutos:
+    """Cópia do catálogo em memória: preço e id por nome exato."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._precos = None   # chave normalizada -> (id, valor padrão)
+
+    @staticmethod
+    def _chave(nome):
+        return nome.strip().casefold()
+
+    def invalidar(self):
+        with self._lock:
+            self._precos = None
+
+    def _indices(self):
+        with self._lock:
+            if self._precos is None:
+                precos = {}
+                for id_produto, nome, valor in _consultar("SELECT id, nome, valor_padrao FROM produtos ORDER BY id"):
+                    precos.setdefault(self._chave(nome), (id_produto, valor))
+                self._precos = precos
+            return self._precos
+
+    def preco(self, nome):
+        """Valor padrão do produto com esse nome (sem diferenciar maiúsculas) ou None."""
+        achado = self._indices().get(self._chave(nome))
+        return achado[1] if achado else None
+
+    def id_produto(self, nome):
+        achado = self._indices().get(self._chave(str(nome)))
+        return achado[0] if achado else None
+
+_catalogo = CatalogoProdutos()
+
+def preco_produto(nome):
+    return _catalogo.preco(nome)
+
+def sugerir_produtos(prefixo, limite=20):
+    """Nomes que começam com `prefixo`, os mais usados nas notas primeiro.
+
+    Busca por faixa no idx_produtos_nome (NOCASE), sem carregar o catálogo;
+    o desempate é alfabético.
+    """
+    prefixo = prefixo.strip()
+    if not prefixo: return []
+    return [nome for nome, in _consultar("""
+        SELECT nome FROM produtos
+        WHERE nome >= ? COLLATE NOCASE AND nome < ? COLLATE NOCASE
+        ORDER BY usos DESC, nome COLLATE NOCASE LIMIT ?
+    """, (prefixo, prefixo + "\U0010ffff", limite))]
 
 # --- CLIENTES ---
 def salvar_cliente(nome, telefone, endereco, carro, placa, ano, km, observacoes):
-    conn = conectar()
-    conn.cursor().execute("""
-        INSERT INTO clientes (nome, telefone, endereco, carro, placa, ano, km, observacoes, status)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'Aberto')
-    """, (nome, telefone, endereco, carro, placa, ano, km, observacoes))
-    conn.commit()
-    conn.close()
+    with transacao() as c:
+        c.execute(f"""
+            INSERT INTO clientes (nome, telefone, endereco, carro, placa, ano, km, observacoes, status, uid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'Aberto', {_UID})
+        """, (nome, telefone, endereco, carro, placa, ano, km, observacoes))
+        id_cliente = c.lastrowid
+        _registrar(c, "clientes", INSERIDO, "id = ?", (id_cliente,))
+    _notificar("clientes", INSERIDO, id_cliente)
+    return id_cliente
+
+def inserir_clientes_em_lote(linhas):
+    """Insere (nome, telefone, endereco, carro, placa, ano, km, observacoes, status) numa transação.
+
+    Os gatilhos da busca e da placa saem durante a carga: o índice FTS recebe
+    as linhas novas num único INSERT ... SELECT e a chave da placa já vai no
+    próprio INSERT, bem mais rápido que linha a linha.
+    """
+    linhas = list(linhas)
+    # Como no gatilho, placa repetida passa o veículo para a ficha mais nova
+    chaves = [chave_placa(linha[4]) for linha in linhas]
+    ultima = {chave: i for i, chave in enumerate(chaves) if chave}
+    chaves = [chave if chave and ultima[chave] == i else None for i, chave in enumerate(chaves)]
+    with transacao() as c:
+        if not c.connection.in_transaction:
+            c.execute("BEGIN")  # os DROP abaixo têm que ficar dentro da transação
+        ultimo_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM clientes").fetchone()[0]
+        c.execute("DROP TRIGGER IF EXISTS clientes_fts_ins")
+        c.execute("DROP TRIGGER IF EXISTS clientes_placa_ins")
+        c.executemany("UPDATE clientes SET placa_chave = NULL WHERE placa_chave = ?", ((ch,) for ch in ultima))
+        c.executemany(f"""
+            INSERT INTO clientes (nome, telefone, endereco, carro, placa, ano, km, observacoes, status, placa_chave, uid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {_UID})
+        """, ((*linha, chave) for linha, chave in zip(linhas, chaves)))
+        inseridas = c.rowcount
+        _registrar(c, "clientes", INSERIDO, "id > ?", (ultimo_id,))
+        c.execute(f"INSERT INTO clientes_fts ({_COLUNAS_BUSCA}) "
+                  f"SELECT {_sql_linha_busca('clientes')} FROM clientes WHERE id > ?", (ultimo_id,))
+        c.execute(_sql_gatilho_busca_ins())
+        c.execute(_sql_gatilho_placa_ins())
+        return inseridas
+
+def chaves_clientes():
+    """(nome, telefone, placa) de todos os clientes, para achar duplicados."""
+    return _consultar("SELECT nome, telefone, placa FROM clientes")
+
+def concluir_importacao(tabela):
+    """Depois de uma carga em lote: limpa caches e avisa as telas uma vez só."""
+    if tabela == "produtos":
+        _catalogo.invalidar()
+    _notificar(tabela, RECARREGADO, 0)
+
+def obter_cliente(id_cliente):
+    return _consultar_um("""
+        SELECT id, status, nome, telefone, endereco, carro, placa, ano, km, observacoes
+        FROM clientes WHERE id=?
+    """, (id_cliente,))
+
+def obter_cliente_por_placa(placa):
+    """Dono atual do veículo, com a placa em qualquer formato; mesmas colunas de obter_cliente."""
+    chave = chave_placa(placa)
+    if chave is None: return None
+    return _consultar_um("""
+        SELECT id, status, nome, telefone, endereco, carro, placa, ano, km, observacoes
+        FROM clientes WHERE placa_chave=?
+    """, (chave,))
 
 def listar_clientes():
-    conn = conectar()
     try:
-        c = conn.cursor()
-        c.execute("SELECT id, status, nome, telefone, endereco, carro, placa, ano, km, observacoes FROM clientes")
-        dados = c.fetchall()
-    except: dados = []
-    conn.close()
-    return dados
+        return _consultar("SELECT id, status, nome, telefone, endereco, carro, placa, ano, km, observacoes FROM clientes")
+    except: return []
+
+def listar_clientes_pagina(apos_id=0, limite=200):
+    """Página de clientes por chave (id > apos_id), para carregamento sob demanda."""
+    return _consultar("""
+        SELECT id, status, nome, telefone, endereco, carro, placa, ano, km, observacoes
+        FROM clientes WHERE id > ? ORDER BY id LIMIT ?
+    """, (apos_id, limite))
+
+def _expressao_busca(termo):
+    """'joão 976-12' -> '"joão"* "97612"*' (todas as palavras, por prefixo)."""
+    palavras = ["".join(ch for ch in p if ch.isalnum()) for p in termo.split()]
+    return " ".join(f'"{p}"*' for p in palavras if p)
+
+def buscar_clientes(termo, limite=50):
+    """Os `limite` clientes mais relevantes para o texto digitado (FTS5)."""
+    expr = _expressao_busca(termo)
+    if not expr: return []
+    linhas = _consultar("""
+        SELECT c.id, c.status, c.nome, c.telefone, c.endereco, c.carro, c.placa, c.ano, c.km, c.observacoes
+        FROM clientes_fts f JOIN clientes c ON c.id = f.rowid
+        WHERE clientes_fts MATCH ? ORDER BY f.rank LIMIT ?
+    """, (expr, limite))
+    # Placa completa, no formato antigo ou no Mercosul: o dono atual vem primeiro
+    if PLACA_MERCOSUL.match(chave_placa(termo) or ""):
+        dono = obter_cliente_por_placa(termo)
+        if dono:
+            linhas = [dono] + [l for l in linhas if l[0] != dono[0]][:limite - 1]
+    return linhas
 
 def atualizar_status(id_cliente, novo_status):
-    conn = conectar()
-    conn.cursor().execute("UPDATE clientes SET status=? WHERE id=?", (novo_status, id_cliente))
-    conn.commit()
-    conn.close()
+    with transacao() as c:
+        c.execute("UPDATE clientes SET status=? WHERE id=?", (novo_status, id_cliente))
+        _registrar(c, "clientes", ATUALIZADO, "id = ?", (id_cliente,))
+    _notificar("clientes", ATUALIZADO, id_cliente)
+
+def _remover_cliente(c, id_cliente):
+    # Com foreign_keys ligado, o histórico (faturamento) é preservado sem dono;
+    # nos anos arquivados também, senão as notas de lá apontariam para um id que não existe mais
+    for esquema in _esquemas():
+        c.execute(f"UPDATE {esquema}.historico_servicos SET id_cliente=NULL WHERE id_cliente=?", (id_cliente,))
+    c.execute("DELETE FROM clientes WHERE id=?", (id_cliente,))
 
 def deletar_cliente(id_cliente):
-    conn = conectar()
-    conn.cursor().execute("DELETE FROM clientes WHERE id=?", (id_cliente,))
-    conn.commit()
-    conn.close()
+    _fontes()   # anexa os anos arquivados antes da transação (ver _remover_cliente)
+    with transacao() as c:
+        _registrar(c, "clientes", REMOVIDO, "id = ?", (id_cliente,))
+        _remover_cliente(c, id_cliente)
+    _notificar("clientes", REMOVIDO, id_cliente)
 
 # --- HISTÓRICO & FINANCEIRO ---
-def salvar_historico(id_cliente, data, itens_json, total, arquivo):
-    conn = conectar()
-    conn.cursor().execute("""
-        INSERT INTO historico_servicos (id_cliente, data_servico, itens_json, valor_total, arquivo_path)
+def _itens_com_produto(itens_json):
+    try: itens = json.loads(itens_json)
+    except: itens = []
+    return [(q, d, v, _catalogo.id_produto(d)) for q, d, v in itens]
+
+def _inserir_historico(c, id_cliente, data, itens_json, total, arquivo, linhas, uid=None):
+    c.execute(f"""
+        INSERT INTO historico_servicos (id_cliente, data_servico, itens_json, valor_total, arquivo_path, uid)
+        VALUES (?, ?, ?, ?, ?, COALESCE(?, {_UID}))
+    """, (id_cliente, data_iso(data), itens_json, total, arquivo, uid))
+    id_servico = c.lastrowid
+    c.executemany("""
+        INSERT INTO servico_itens (id_servico, quantidade, descricao, valor_total_item, id_produto)
         VALUES (?, ?, ?, ?, ?)
-    """, (id_cliente, data, itens_json, total, arquivo))
-    conn.commit()
-    conn.close()
-
-def listar_historico(id_cliente):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT data_servico, itens_json, valor_total FROM historico_servicos WHERE id_cliente=? ORDER BY id DESC", (id_cliente,))
-    dados = c.fetchall()
-    conn.close()
-    return dados
+    """, [(id_servico, *linha) for linha in linhas])
+    return id_servico
 
-def calcular_total_dia(data_str):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT SUM(valor_total) FROM historico_servicos WHERE data_servico = ?", (data_str,))
-    res = c.fetchone()[0]
-    conn.close()
+def salvar_historico(id_cliente, data, itens_json, total, arquivo):
+    # Resolve os produtos antes de abrir a transação (o catálogo pode consultar o banco)
+    linhas = _itens_com_produto(itens_json)
+    with transacao() as c:
+        id_servico = _inserir_historico(c, id_cliente, data, itens_json, total, arquivo, linhas)
+        _registrar(c, "historico_servicos", INSERIDO, "id = ?", (id_servico,))
+    _notificar("historico_servicos", INSERIDO, id_servico)
+    return id_servico
+
+# Quantidade inteira volta como inteiro ("2", não "2.0")
+_SQL_QUANTIDADE = "CASE WHEN quantidade = CAST(quantidade AS INTEGER) THEN CAST(quantidade AS INTEGER) ELSE quantidade END"
+
+def listar_historico(id_cliente, arquivados=False):
+    """(data dd/mm/YYYY, resumo dos itens, valor_total) das notas do cliente.
+
+    Só o banco principal; com `arquivados`, também os anos arquivados.
+    """
+    return _consultar(f"""
+        SELECT COALESCE(strftime('%d/%m/%Y', h.data_servico), h.data_servico), h.resumo, h.valor_total
+        FROM {_notas() if arquivados else _NOTAS_PRINCIPAL} h WHERE h.id_cliente=? ORDER BY h.id DESC
+    """, (id_cliente,))
+
+def _pagina_recente(sql, params, limite, maior, principal, todas):
+    """Página do mais novo para o mais antigo, lida primeiro só do banco principal.
+
+    `sql` tem {fonte} no lugar da tabela e a primeira coluna é o id. Os anos
+    arquivados só são anexados (`todas()`) quando a página passa do que o
+    banco principal resolve sozinho: não enche, ou desce até ids que algum
+    arquivo tem (a coluna `maior` de arquivos_anuais).
+    """
+    linhas = _consultar(sql.format(fonte=principal), params)
+    maior_arquivado = _consultar_um(f"SELECT MAX({maior}) FROM arquivos_anuais")[0]
+    if maior_arquivado is None or (len(linhas) == limite and linhas[-1][0] > maior_arquivado):
+        return linhas
+    return _consultar(sql.format(fonte=todas()), params)
+
+def listar_historico_pagina(id_cliente, antes_id=None, limite=100):
+    """Página de notas do cliente, da mais nova para a mais antiga.
+
+    Linhas (id, data dd/mm/YYYY, resumo, valor_total); para a próxima página
+    passe o id da última linha em `antes_id`. Usa idx_historico_cliente.
+    """
+    return _pagina_recente("""
+        SELECT h.id, COALESCE(strftime('%d/%m/%Y', h.data_servico), h.data_servico), h.resumo, h.valor_total
+        FROM {fonte} h WHERE h.id_cliente = ? AND h.id < ? ORDER BY h.id DESC LIMIT ?
+    """, (id_cliente, antes_id if antes_id is not None else 2**63 - 1, limite), limite,
+        "maior_nota", _NOTAS_PRINCIPAL, _notas)
+
+def listar_historico_veiculo_pagina(placa, antes_id=None, limite=100):
+    """Página de notas do veículo com todos os donos que ele já teve.
+
+    Linhas (id, data dd/mm/YYYY, nome do cliente, resumo, valor_total), da
+    mais nova para a mais antiga, como listar_historico_pagina. Usa idx_historico_placa.
+    """
+    chave = chave_placa(placa)
+    if chave is None: return []
+    return _pagina_recente("""
+        SELECT h.id, COALESCE(strftime('%d/%m/%Y', h.data_servico), h.data_servico), COALESCE(c.nome, ''),
+               h.resumo, h.valor_total
+        FROM {fonte} h LEFT JOIN clientes c ON c.id = h.id_cliente
+        WHERE h.placa_chave = ? AND h.id < ? ORDER BY h.id DESC LIMIT ?
+    """, (chave, antes_id if antes_id is not None else 2**63 - 1, limite), limite,
+        "maior_nota", _NOTAS_PRINCIPAL, _notas)
+
+def listar_itens_servicos(primeiro_id, ultimo_id, inicio=None, fim=None):
+    """Itens (id_servico, qtd, descrição, valor da linha) das notas entre dois ids.
+
+    Com o período das notas (`inicio`, `fim`), os anos arquivados só entram se ele chegar neles.
+    """
+    _, itens, _ = _fontes(inicio, fim)
+    return _consultar(f"""
+        SELECT id_servico, {_SQL_QUANTIDADE}, descricao, valor_total_item FROM {itens}
+        WHERE id_servico BETWEEN ? AND ? ORDER BY id_servico, id
+    """, (primeiro_id, ultimo_id))
+
+def totais_por_item(inicio, fim, limite=50):
+    """Peças/serviços mais vendidos no período: (descrição, quantidade, valor)."""
+    historico, itens, _ = _fontes(inicio, fim)
+    # IN em vez de JOIN: com os anos arquivados, o JOIN materializaria a view de itens inteira
+    return _consultar(f"""
+        SELECT i.descricao, SUM(i.quantidade), SUM(i.valor_total_item)
+        FROM {itens} i WHERE i.id_servico IN (SELECT id FROM {historico} WHERE data_servico BETWEEN ? AND ?)
+        GROUP BY i.descricao COLLATE NOCASE ORDER BY 3 DESC LIMIT ?
+    """, (data_iso(inicio), data_iso(fim), limite))
+
+def contar_historico_periodo(inicio, fim):
+    historico, _, _ = _fontes(inicio, fim)
+    return _consultar_um(
+        f"SELECT COUNT(*) FROM {historico} WHERE data_servico BETWEEN ? AND ?",
+        (data_iso(inicio), data_iso(fim)))[0]
+
+def listar_historico_periodo_pagina(inicio, fim, apos_id=0, limite=500):
+    """(id, data dd/mm/YYYY, nome do cliente, valor_total) das notas do período com id > `apos_id`."""
+    historico, _, _ = _fontes(inicio, fim)
+    return _consultar(f"""
+        SELECT h.id, strftime('%d/%m/%Y', h.data_servico), COALESCE(c.nome, ''), h.valor_total
+        FROM {historico} h LEFT JOIN clientes c ON c.id = h.id_cliente
+        WHERE h.data_servico BETWEEN ? AND ? AND h.id > ?
+        ORDER BY h.id LIMIT ?
+    """, (data_iso(inicio), data_iso(fim), apos_id, limite))
+
+def iterar_historico_periodo(inicio, fim, lote=500):
+    """Gera (id, data dd/mm/YYYY, nome do cliente, itens, valor_total) em lotes.
+
+    Cada lote é uma consulta curta por chave (id), então a conexão compartilhada
+    não fica presa enquanto quem consome processa as linhas.
+    """
+    inicio, fim = data_iso(inicio), data_iso(fim)
+    ultimo_id = 0
+    while True:
+        linhas = listar_historico_periodo_pagina(inicio, fim, ultimo_id, lote)
+        if not linhas: return
+        itens = {}
+        for id_servico, q, d, v in listar_itens_servicos(linhas[0][0], linhas[-1][0], inicio, fim):
+            itens.setdefault(id_servico, []).append((q, d, v))
+        for id_nota, data, nome, total in linhas:
+            yield id_nota, data, nome, itens.get(id_nota, []), total
+        if len(linhas) < lote: return
+        ultimo_id = linhas[-1][0]
+
+# --- EXPORTAÇÃO PARA CONTABILIDADE ---
+# Cada função recebe uma conexão de leitura_isolada() e gera listas de até
+# `lote` linhas com fetchmany; o cabeçalho correspondente fica em COLUNAS_EXPORTACAO.
+COLUNAS_EXPORTACAO = {
+    "historico_itens": ["id_nota", "data", "id_cliente", "cliente", "placa", "item", "descricao",
+                        "quantidade", "valor_total_item", "valor_total_nota", "arquivo"],
+    "fechamentos": ["id", "tipo", "periodo", "valor", "data_registro"],
+    "clientes": ["id", "nome", "telefone", "endereco", "carro", "placa", "ano", "km", "status", "observacoes"],
+}
+
+def _em_lotes(cursor, lote):
+    while True:
+        linhas = cursor.fetchmany(lote)
+        if not linhas: return
+        yield linhas
+
+def exportar_historico_itens(conn, inicio, fim, lote=5000):
+    """Uma linha por item de nota; notas sem itens saem com os campos do item vazios."""
+    historico, itens, _ = _fontes(inicio, fim, conn)
+    cursor = conn.execute(f"""
+        SELECT h.id, h.data_servico, h.id_cliente, c.nome, c.placa,
+               i.id, i.descricao, i.quantidade, i.valor_total_item, h.valor_total, h.arquivo_path
+        FROM {historico} h
+        LEFT JOIN clientes c ON c.id = h.id_cliente
+        LEFT JOIN {itens} i ON i.id_servico = h.id
+        WHERE h.data_servico BETWEEN ? AND ?
+        ORDER BY h.data_servico, h.id, i.id
+    """, (data_iso(inicio), data_iso(fim)))
+    return _em_lotes(cursor, lote)
+
+def exportar_fechamentos(conn, inicio, fim, lote=5000):
+    """Fechamentos registrados no período (data_registro é 'dd/mm/YYYY HH:MM')."""
+    _, _, fechamentos = _fontes(inicio, fim, conn)
+    cursor = conn.execute(f"""
+        SELECT id, tipo, periodo, valor, data_registro FROM {fechamentos}
+        WHERE substr(data_registro, 7, 4) || '-' || substr(data_registro, 4, 2) || '-' || substr(data_registro, 1, 2)
+              BETWEEN ? AND ?
+        ORDER BY id
+    """, (data_iso(inicio), data_iso(fim)))
+    return _em_lotes(cursor, lote)
+
+def exportar_clientes(conn, inicio, fim, lote=5000):
+    """Clientes atendidos no período."""
+    historico, _, _ = _fontes(inicio, fim, conn)
+    cursor = conn.execute(f"""
+        SELECT id, nome, telefone, endereco, carro, placa, ano, km, status, observacoes FROM clientes
+        WHERE id IN (SELECT id_cliente FROM {historico} WHERE data_servico BETWEEN ? AND ?)
+        ORDER BY id
+    """, (data_iso(inicio), data_iso(fim)))
+    return _em_lotes(cursor, lote)
+
+def calcular_total_periodo(inicio, fim):
+    """Soma do faturamento entre duas datas (inclusive), a partir dos totais diários."""
+    res = _consultar_um(
+        "SELECT SUM(total) FROM faturamento_dia WHERE data BETWEEN ? AND ?",
+        (data_iso(inicio), data_iso(fim)))[0]
     return res if res else 0.0
 
+def resumo_dia(data_str):
+    """(faturamento, número de notas) do dia."""
+    res = _consultar_um("SELECT total, notas FROM faturamento_dia WHERE data = ?", (data_iso(data_str),))
+    return res if res else (0.0, 0)
+
+def resumo_mes(mes, ano):
+    """(faturamento, número de notas) do mês."""
+    res = _consultar_um("SELECT total, notas FROM faturamento_mes WHERE mes = ?", (f"{int(ano):04d}-{int(mes):02d}",))
+    return res if res else (0.0, 0)
+
+def calcular_total_dia(data_str):
+    return resumo_dia(data_str)[0]
+
 def calcular_total_mes(mes, ano):
-    conn = conectar()
-    c = conn.cursor()
-    termo = f"%/{mes}/{ano}"
-    c.execute("SELECT SUM(valor_total) FROM historico_servicos WHERE data_servico LIKE ?", (termo,))
-    res = c.fetchone()[0]
-    conn.close()
-    return res if res else 0.0
+    return resumo_mes(mes, ano)[0]
 
 def registrar_fechamento(tipo, periodo, valor):
-    conn = conectar()
     agora = datetime.now().strftime("%d/%m/%Y %H:%M")
-    conn.cursor().execute("INSERT INTO fechamentos (tipo, periodo, valor, data_registro) VALUES (?, ?, ?, ?)", (tipo, periodo, valor, agora))
-    conn.commit()
-    conn.close()
-
-def listar_fechamentos():
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT tipo, periodo, valor, data_registro FROM fechamentos ORDER BY id DESC")
-    dados = c.fetchall()
-    conn.close()
-    return dados
-
-criar_tabelas()
\ No newline at end of file
+    with transacao() as c:
+        c.execute(f"INSERT INTO fechamentos (tipo, periodo, valor, data_registro, uid) VALUES (?, ?, ?, ?, {_UID})",
+                  (tipo, periodo, valor, agora))
+        id_fechamento = c.lastrowid
+        _registrar(c, "fechamentos", INSERIDO, "id = ?", (id_fechamento,))
+    _notificar("fechamentos", INSERIDO, id_fechamento)
+    return id_fechamento
+
+def obter_fechamento(id_fechamento):
+    # Só os do banco principal: quem pede acabou de registrar o fechamento
+    return _consultar_um("SELECT tipo, periodo, valor, data_registro FROM fechamentos WHERE id=?", (id_fechamento,))
+
+def listar_fechamentos(arquivados=False):
+    """Fechamentos do banco principal; com `arquivados`, também os dos anos arquivados."""
+    fechamentos = _fontes()[2] if arquivados else "main.fechamentos"
+    return _consultar(f"SELECT tipo, periodo, valor, data_registro FROM {fechamentos} ORDER BY id DESC")
+
+def listar_fechamentos_pagina(antes_id=None, limite=100):
+    """Página de fechamentos (id, tipo, período, valor, data_registro), do mais novo para o mais antigo."""
+    return _pagina_recente("""
+        SELECT id, tipo, periodo, valor, data_registro FROM {fonte}
+        WHERE id < ? ORDER BY id DESC LIMIT ?
+    """, (antes_id if antes_id is not None else 2**63 - 1, limite), limite,
+        "maior_fechamento", "main.fechamentos", lambda: _fontes()[2])
+
+# --- SINCRONIZAÇÃO ENTRE FILIAIS ---
+# Ver servicos.sincronizacao. Cada filial pede à outra só o que veio depois
+# da marca (último seq já aplicado), então o custo é o tamanho das mudanças.
+def instalacao():
+    """Identificação desta base no registro de alterações."""
+    return _consultar_um("SELECT valor FROM configuracao WHERE chave = 'instalacao'")[0]
+
+def renovar_instalacao():
+    """Nova identificação, para quando a base foi copiada de outra filial."""
+    with transacao() as c:
+        c.execute(f"UPDATE configuracao SET valor = {_UID} WHERE chave = 'instalacao'")
+    return instalacao()
+
+def ultima_alteracao():
+    return _consultar_um("SELECT COALESCE(MAX(seq), 0) FROM alteracoes")[0]
+
+def alteracoes_desde(desde, limite=1000, excluir_origem=None):
+    """(até, entradas, acabou) com as alterações de seq > `desde`, no máximo `limite` lidas.
+
+    Entradas são (seq, origem, tabela, ação, uid, dados JSON). As que nasceram
+    em `excluir_origem` (o próprio par) não vão, mas `até` passa por elas:
+    é a marca a gravar do outro lado.
+    """
+    linhas = _consultar("""
+        SELECT seq, origem, tabela, acao, uid, dados FROM alteracoes
+        WHERE seq > ? ORDER BY seq LIMIT ?
+    """, (desde, limite))
+    ate = linhas[-1][0] if linhas else desde
+    return ate, [linha for linha in linhas if linha[1] != excluir_origem], len(linhas) < limite
+
+def marca_recebida(par):
+    """Último seq da filial `par` já aplicado aqui (0 se nunca sincronizou)."""
+    linha = _consultar_um("SELECT recebido FROM marcas_sincronizacao WHERE par = ?", (par,))
+    return linha[0] if linha else 0
+
+def marcas_sincronizacao():
+    return _consultar("SELECT par, recebido FROM marcas_sincronizacao ORDER BY par")
+
+def _localizar(c, tabela, uid):
+    """(esquema, id) da linha com esse uid: no banco principal ou, para notas e
+    fechamentos, num ano arquivado já anexado por _fontes(). None se não existe."""
+    esquemas = _esquemas() if tabela in _TABELAS_ARQUIVO else ["main"]
+    for esquema in esquemas:
+        linha = c.execute(f"SELECT id FROM {esquema}.{tabela} WHERE uid = ?", (uid,)).fetchone()
+        if linha: return esquema, linha[0]
+    return None
+
+def _aplicar_linha(c, tabela, acao, uid, dados):
+    colunas = _COLUNAS_SINCRONIZADAS[tabela]
+    achado = _localizar(c, tabela, uid)
+    if tabela == "historico_servicos":
+        # A nota não muda depois de emitida: o mesmo uid, aqui ou num ano arquivado, é a mesma nota
+        if achado: return
+        dono = c.execute("SELECT id FROM clientes WHERE uid = ?", (dados.get("cliente"),)).fetchone()
+        _inserir_historico(c, dono[0] if dono else None, dados["data_servico"], dados["itens_json"],
+                           dados["valor_total"], dados["arquivo_path"], _itens_com_produto(dados["itens_json"]), uid)
+    elif acao == REMOVIDO:
+        if not achado: return
+        esquema, id_linha = achado
+        if tabela == "clientes": _remover_cliente(c, id_linha)
+        else: c.execute(f"DELETE FROM {esquema}.{tabela} WHERE id = ?", (id_linha,))
+    elif achado and achado[0] != "main":
+        # Fechamento de um ano arquivado: muda lá mesmo; o INSERT abaixo o duplicaria no banco principal
+        c.execute(f"UPDATE {achado[0]}.{tabela} SET {', '.join(f'{col} = ?' for col in colunas)} WHERE id = ?",
+                  (*(dados.get(col) for col in colunas), achado[1]))
+    else:
+        # Inserção ou alteração: a linha inteira chega; a última aplicada vale
+        c.execute(f"""
+            INSERT INTO {tabela} (uid, {', '.join(colunas)}) VALUES (?{', ?' * len(colunas)})
+            ON CONFLICT(uid) DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in colunas)}
+        """, (uid, *(dados.get(col) for col in colunas)))
+
+def aplicar_alteracoes(par, entradas, ate):
+    """Aplica numa transação as entradas recebidas de `par` e grava a marca `ate`.
+
+    Repetir o mesmo lote não faz nada (entradas até a marca são puladas). As
+    aplicadas entram no registro daqui com a origem original, para seguirem
+    adiante se houver uma terceira filial. Devolve quantas foram aplicadas.
+    """
+    eu = instalacao()
+    tabelas = set()
+    aplicadas = 0
+    _fontes()   # anexa os anos arquivados antes da transação: a linha pode estar num deles
+    with transacao() as c:
+        marca = marca_recebida(par)
+        for seq, origem, tabela, acao, uid, dados in entradas:
+            if seq <= marca or origem == eu or tabela not in _COLUNAS_SINCRONIZADAS: continue
+            _aplicar_linha(c, tabela, acao, uid, json.loads(dados or "{}"))
+            c.execute("INSERT INTO alteracoes (origem, tabela, acao, uid, dados) VALUES (?, ?, ?, ?, ?)",
+                      (origem, tabela, acao, uid, dados))
+            tabelas.add(tabela)
+            aplicadas += 1
+        c.execute("""
+            INSERT INTO marcas_sincronizacao (par, recebido) VALUES (?, ?)
+            ON CONFLICT(par) DO UPDATE SET recebido = max(recebido, excluded.recebido)
+        """, (par, ate))
+    if "produtos" in tabelas:
+        _catalogo.invalidar()
+    for tabela in tabelas:
+        _notificar(tabela, RECARREGADO, 0)
+    return aplicadas
+
+# --- CÓPIA DE SEGURANÇA ---
+# Ver servicos.backup. Recebem uma conexão de leitura_isolada(): a cópia, a
+# lista de PDFs e as contagens saem todas do mesmo instante do banco.
+TABELAS_BACKUP = ("clientes", "produtos", "historico_servicos", "servico_itens", "fechamentos")
+
+def copiar_banco(conn, destino, paginas=256, progresso=None, esquema="main"):
+    """Copia o banco para o arquivo `destino` com a API de backup do SQLite.
+
+    Vai de `paginas` em `paginas`, sem travar quem usa a conexão compartilhada;
+    `progresso`, se informado, recebe (páginas copiadas, total). Com
+    `esquema`, copia um banco anexado (os anos arquivados).
+    """
+    alvo = sqlite3.connect(destino)
+    try:
+        conn.backup(alvo, pages=paginas, name=esquema,
+                    progress=(lambda _, restantes, total: progresso(total - restantes, total)) if progresso else None)
+        # A cópia herda o modo WAL; volta para um arquivo único, sem -wal
+        alvo.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        alvo.close()
+
+def arquivos_notas(conn):
+    """Caminhos dos PDFs gravados nas notas (arquivo_path), anos arquivados inclusive, sem repetição."""
+    historico, _, _ = _fontes(conn=conn)
+    return [caminho for caminho, in conn.execute(
+        f"SELECT DISTINCT arquivo_path FROM {historico} WHERE arquivo_path <> '' ORDER BY arquivo_path")]
+
+def contar_registros(conn):
+    """{tabela: linhas} das tabelas em TABELAS_BACKUP, mais a versão do esquema."""
+    contagens = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABELAS_BACKUP}
+    contagens["versao_esquema"] = conn.execute("PRAGMA user_version").fetchone()[0]
+    return contagens
+
+# --- ARQUIVO POR ANO ---
+# Anos encerrados saem do banco principal para arquivo_AAAA.db, na mesma
+# pasta. Eles só são anexados (ATTACH) quando uma consulta chega neles; aí
+# as views temporárias historico_todos, itens_todos e fechamentos_todos
+# juntam o banco principal e todos os anos. O dia a dia (notas novas,
+# resumos, faturamento_dia/mes, consultas do ano corrente) não abre nenhum.
+_TABELAS_ARQUIVO = {
+    "historico_servicos": ("historico_todos",
+                           "id, id_cliente, data_servico, itens_json, valor_total, arquivo_path, placa_chave, uid"),
+    "servico_itens": ("itens_todos", "id, id_servico, quantidade, descricao, valor_total_item, id_produto"),
+    "fechamentos": ("fechamentos_todos", "id, tipo, periodo, valor, data_registro, uid"),
+}
+MAX_ARQUIVOS = 10   # limite de bancos anexados do SQLite (SQLITE_MAX_ATTACHED)
+
+def _esquema_arquivo(ano):
+    return f"arquivo_{int(ano)}"
+
+def _caminho_arquivo(arquivo):
+    """Os arquivos ficam ao lado do banco; no registro vai só o nome."""
+    return os.path.join(os.path.dirname(os.path.abspath(_gerenciador.caminho)), arquivo)
+
+def _anexar_arquivos(conn, arquivos, somente_leitura=False):
+    """ATTACH dos anos {ano: arquivo} que faltam e views temporárias sobre todos eles."""
+    if not arquivos: return
+    anexados = {linha[1] for linha in conn.execute("PRAGMA database_list")}
+    for ano, arquivo in sorted(arquivos.items()):
+        if _esquema_arquivo(ano) in anexados: continue
+        caminho = _caminho_arquivo(arquivo)
+        if not os.path.exists(caminho):
+            # ATTACH criaria um arquivo vazio e as notas do ano sumiriam das consultas
+            raise sqlite3.OperationalError(f"arquivo do ano {ano} não encontrado: {caminho}")
+        conn.execute("ATTACH DATABASE ? AS " + _esquema_arquivo(ano),
+                     (f"file:{caminho}?mode=ro" if somente_leitura else caminho,))
+    esquemas = ["main"] + [_esquema_arquivo(ano) for ano in sorted(arquivos)]
+    for tabela, (view, colunas) in _TABELAS_ARQUIVO.items():
+        conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        conn.execute(f"CREATE TEMP VIEW {view} AS " +
+                     " UNION ALL ".join(f"SELECT {colunas} FROM {esquema}.{tabela}" for esquema in esquemas))
+    conn.execute("DROP VIEW IF EXISTS temp.notas_todas")
+    conn.execute("CREATE TEMP VIEW notas_todas AS " + " UNION ALL ".join(_sql_notas(e) for e in esquemas))
+
+def _sql_notas(esquema):
+    # O resumo sai dentro de cada banco: numa subconsulta sobre itens_todos o
+    # SQLite não leva o id_servico para dentro da UNION e varreria todos os itens
+    return f"""
+        SELECT h.id, h.id_cliente, h.data_servico, h.valor_total, h.placa_chave,
+               COALESCE((SELECT group_concat(descricao, ', ')
+                         FROM (SELECT descricao FROM {esquema}.servico_itens WHERE id_servico = h.id ORDER BY id)), '-')
+               AS resumo
+        FROM {esquema}.historico_servicos h"""
+
+def _esquemas():
+    """'main' e os anos arquivados anexados nesta conexão (chame _fontes() antes)."""
+    return ["main"] + [_esquema_arquivo(ano) for ano in sorted(_gerenciador.anexados)]
+
+_NOTAS_PRINCIPAL = f"({_sql_notas('main')})"
+
+def _notas():
+    """Notas com o resumo dos itens: (id, id_cliente, data_servico, valor_total, placa_chave, resumo)."""
+    historico, _, _ = _fontes()
+    return "notas_todas" if historico == "historico_todos" else _NOTAS_PRINCIPAL
+
+def _fontes(inicio=None, fim=None, conn=None):
+    """Nomes (histórico, itens, fechamentos) para consultar o período (None: tudo).
+
+    Se nenhum ano arquivado cai no período, são as tabelas do banco
+    principal; senão, as views que juntam os arquivos, anexados aqui na
+    primeira vez. `conn` é uma conexão de leitura_isolada(), que já abre
+    com os arquivos anexados.
+    """
+    if conn is None:
+        with _gerenciador.lock:
+            conn = _gerenciador.conexao()
+            arquivos = dict(conn.execute("SELECT ano, arquivo FROM arquivos_anuais"))
+            usar = arquivos and (inicio is None or any(
+                int(data_iso(inicio)[:4]) <= ano <= int(data_iso(fim)[:4]) for ano in arquivos))
+            if usar and _gerenciador.anexados != arquivos:
+                _anexar_arquivos(conn, arquivos)
+                _gerenciador.anexados = arquivos
+    else:
+        anos = [int(nome[len("arquivo_"):]) for _, nome, _ in conn.execute("PRAGMA database_list")
+                if nome.startswith("arquivo_")]
+        usar = anos and (inicio is None or any(
+            int(data_iso(inicio)[:4]) <= ano <= int(data_iso(fim)[:4]) for ano in anos))
+    if usar:
+        return tuple(view for view, _ in _TABELAS_ARQUIVO.values())
+    return tuple(_TABELAS_ARQUIVO)
+
+def anos_arquivados():
+    """(ano, arquivo, notas, fechamentos, arquivado_em) de cada ano já arquivado."""
+    return _consultar("SELECT ano, arquivo, notas, fechamentos, arquivado_em FROM arquivos_anuais ORDER BY ano")
+
+def anos_para_arquivar():
+    """Anos encerrados que ainda têm notas ou fechamentos no banco principal."""
+    atual = date.today().year
+    return [ano for ano, in _consultar("""
+        SELECT DISTINCT CAST(substr(data_servico, 1, 4) AS INTEGER) FROM historico_servicos WHERE data_servico < ?
+        UNION
+        SELECT DISTINCT CAST(substr(data_registro, 7, 4) AS INTEGER) FROM fechamentos
+        WHERE CAST(substr(data_registro, 7, 4) AS INTEGER) < ?
+        ORDER BY 1
+    """, (f"{atual:04d}-01-01", atual))]
+
+def _criar_tabelas_arquivo(c, esquema):
+    # Mesmas colunas e índices de consulta do banco principal, sem gatilhos nem chaves estrangeiras
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {esquema}.historico_servicos (
+            id INTEGER PRIMARY KEY, id_cliente INTEGER, data_servico TEXT, itens_json TEXT,
+            valor_total REAL, arquivo_path TEXT, placa_chave TEXT, uid TEXT
+        )
+    """)
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {esquema}.servico_itens (
+            id INTEGER PRIMARY KEY, id_servico INTEGER NOT NULL, quantidade REAL,
+            descricao TEXT, valor_total_item REAL, id_produto INTEGER
+        )
+    """)
+    c.execute(f"""
+        CREATE TABLE IF NOT EXISTS {esquema}.fechamentos (
+            id INTEGER PRIMARY KEY, tipo TEXT, periodo TEXT, valor REAL, data_registro TEXT, uid TEXT
+        )
+    """)
+    for indice, tabela, colunas in (
+            ("idx_historico_data", "historico_servicos", "data_servico, valor_total"),
+            ("idx_historico_cliente", "historico_servicos", "id_cliente, id"),
+            ("idx_historico_placa", "historico_servicos", "placa_chave, id"),
+            ("idx_historico_uid", "historico_servicos", "uid"),
+            ("idx_fechamentos_uid", "fechamentos", "uid"),
+            ("idx_itens_servico", "servico_itens", "id_servico"),
+            ("idx_itens_descricao", "servico_itens", "descricao COLLATE NOCASE")):
+        c.execute(f"CREATE INDEX IF NOT EXISTS {esquema}.{indice} ON {tabela} ({colunas})")
+
+def arquivar_ano(ano):
+    """Move as notas (com os itens) e os fechamentos de `ano` para arquivo_AAAA.db.
+
+    Só anos anteriores ao atual. Primeiro copia e grava o arquivo, depois
+    apaga do banco principal e registra o ano numa segunda transação: se
+    parar no meio, as consultas continuam vendo cada nota uma vez só, e
+    basta arquivar o mesmo ano de novo. faturamento_dia/mes e os usos das
+    peças continuam contando o que foi arquivado. O espaço liberado só
+    volta para o disco com compactar_banco().
+    Devolve {"ano", "arquivo", "notas", "fechamentos"}.
+    """
+    ano = int(ano)
+    if ano >= date.today().year:
+        raise ValueError(f"{ano} ainda não terminou; só anos encerrados podem ser arquivados")
+    esquema, arquivo = _esquema_arquivo(ano), f"arquivo_{ano}.db"
+    inicio, fim = f"{ano:04d}-01-01", f"{ano:04d}-12-31"
+    notas_do_ano = "SELECT id FROM main.historico_servicos WHERE data_servico BETWEEN ? AND ?"
+    conn = _gerenciador.conexao()
+    with _gerenciador.lock:
+        arquivos = dict(conn.execute("SELECT ano, arquivo FROM arquivos_anuais"))
+        if ano not in arquivos and len(arquivos) >= MAX_ARQUIVOS:
+            raise ValueError(f"já há {len(arquivos)} anos arquivados, o máximo que o SQLite anexa de uma vez")
+        if esquema not in {linha[1] for linha in conn.execute("PRAGMA database_list")}:
+            conn.execute(f"ATTACH DATABASE ? AS {esquema}", (_caminho_arquivo(arquivo),))
+        with transacao() as c:
+            if not c.connection.in_transaction:
+                c.execute("BEGIN")  # o DDL do arquivo vai na mesma transação das cópias
+            _criar_tabelas_arquivo(c, esquema)
+            colunas = _TABELAS_ARQUIVO["historico_servicos"][1]
+            c.execute(f"INSERT OR REPLACE INTO {esquema}.historico_servicos ({colunas}) "
+                      f"SELECT {colunas} FROM main.historico_servicos WHERE data_servico BETWEEN ? AND ?", (inicio, fim))
+            colunas = _TABELAS_ARQUIVO["servico_itens"][1]
+            c.execute(f"INSERT OR REPLACE INTO {esquema}.servico_itens ({colunas}) "
+                      f"SELECT {colunas} FROM main.servico_itens WHERE id_servico IN ({notas_do_ano})", (inicio, fim))
+            colunas = _TABELAS_ARQUIVO["fechamentos"][1]
+            c.execute(f"INSERT OR REPLACE INTO {esquema}.fechamentos ({colunas}) "
+                      f"SELECT {colunas} FROM main.fechamentos WHERE substr(data_registro, 7, 4) = ?", (f"{ano:04d}",))
+        with transacao() as c:
+            if not c.connection.in_transaction:
+                c.execute("BEGIN")
+            # Os gatilhos de faturamento e de usos descontariam o que só mudou de arquivo: guarda e devolve
+            for temporaria in ("_faturamento_dia", "_faturamento_mes", "_usos"):
+                c.execute(f"DROP TABLE IF EXISTS temp.{temporaria}")
+            c.execute("CREATE TEMP TABLE _faturamento_dia AS SELECT * FROM faturamento_dia WHERE data BETWEEN ? AND ?",
+                      (inicio, fim))
+            c.execute("CREATE TEMP TABLE _faturamento_mes AS SELECT * FROM faturamento_mes WHERE mes LIKE ?", (f"{ano:04d}-%",))
+            c.execute("CREATE TEMP TABLE _usos AS SELECT id, usos FROM produtos")
+            c.execute(f"DELETE FROM main.servico_itens WHERE id_servico IN ({notas_do_ano})", (inicio, fim))
+            c.execute("DELETE FROM main.historico_servicos WHERE data_servico BETWEEN ? AND ?", (inicio, fim))
+            c.execute("DELETE FROM main.fechamentos WHERE substr(data_registro, 7, 4) = ?", (f"{ano:04d}",))
+            c.execute("INSERT OR REPLACE INTO faturamento_dia SELECT * FROM _faturamento_dia")
+            c.execute("INSERT OR REPLACE INTO faturamento_mes SELECT * FROM _faturamento_mes")
+            c.execute("UPDATE produtos SET usos = (SELECT u.usos FROM _usos u WHERE u.id = produtos.id)")
+            notas, maior_nota = c.execute(
+                f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {esquema}.historico_servicos").fetchone()
+            fechamentos, maior_fechamento = c.execute(
+                f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {esquema}.fechamentos").fetchone()
+            c.execute("""
+                INSERT INTO arquivos_anuais (ano, arquivo, notas, fechamentos, maior_nota, maior_fechamento)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(ano) DO UPDATE SET notas = excluded.notas, fechamentos = excluded.fechamentos,
+                    maior_nota = excluded.maior_nota, maior_fechamento = excluded.maior_fechamento,
+                    arquivado_em = strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')
+            """, (ano, arquivo, notas, fechamentos, maior_nota, maior_fechamento))
+        for temporaria in ("_faturamento_dia", "_faturamento_mes", "_usos"):
+            conn.execute(f"DROP TABLE temp.{temporaria}")
+        arquivos[ano] = arquivo
+        _anexar_arquivos(conn, arquivos)
+        _gerenciador.anexados = arquivos
+    _notificar("historico_servicos", RECARREGADO, 0)
+    _notificar("fechamentos", RECARREGADO, 0)
+    return {"ano": ano, "arquivo": _caminho_arquivo(arquivo), "notas": notas, "fechamentos": fechamentos}
+
+def compactar_banco():
+    """VACUUM do banco principal: devolve ao disco o espaço das linhas arquivadas."""
+    with _gerenciador.lock:
+        conn = _gerenciador.conexao()
+        conn.execute("VACUUM main")
+        # Com WAL o arquivo só encolhe no checkpoint
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+
+def arquivos_anuais(conn):
+    """{esquema anexado: nome do arquivo} dos anos arquivados, para o backup copiar junto."""
+    return {_esquema_arquivo(ano): arquivo for ano, arquivo in conn.execute("SELECT ano, arquivo FROM arquivos_anuais")}
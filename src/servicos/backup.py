@@ -0,0 +1,229 @@
+"""Cópias de segurança com o programa aberto.
+
+Uso (a partir de src/):
+    python -m servicos.backup criar
+    python -m servicos.backup listar
+    python -m servicos.backup verificar data/backups/backup_20240315_183000.zip
+    python -m servicos.backup restaurar data/backups/backup_20240315_183000.zip restaurado.db
+
+O banco é copiado pela API de backup do SQLite, em passos de PAGINAS
+páginas, de uma conexão de leitura à parte (db.leitura_isolada): com WAL
+quem grava não espera a cópia, e ela sai de um único instante do banco.
+Cada cópia vira um .zip com o banco comprimido, os PDFs das notas
+(arquivo_path), os anos arquivados (arquivo_AAAA.db, do mesmo instante) e
+um manifesto com as contagens. Só as MANTER mais novas ficam na pasta.
+
+O programa não faz backup sozinho: com OFICINA_BACKUP_DIARIO=1 na abertura,
+ele começa um quando o último tem mais de INTERVALO.
+
+A verificação rápida extrai o banco para uma pasta temporária, roda
+PRAGMA quick_check e confere versão e contagens com o manifesto; com
+--completa também confere o CRC de todos os PDFs e usa integrity_check.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+import models.db as db
+
+PAGINAS = 256       # páginas por passo da API de backup (~1 MB)
+MANTER = 10
+INTERVALO = timedelta(days=1)
+PREFIXO = "backup_"
+MANIFESTO = "manifesto.json"
+BANCO = "banco.db"
+
+class ErroBackup(RuntimeError):
+    pass
+
+def pasta_padrao():
+    """data/backups ao lado do banco em uso."""
+    return os.path.join(os.path.dirname(os.path.abspath(db.caminho_banco())), "backups")
+
+def listar_backups(pasta=None):
+    """Caminhos dos backups da pasta, do mais novo para o mais antigo."""
+    pasta = pasta or pasta_padrao()
+    if not os.path.isdir(pasta): return []
+    nomes = sorted((n for n in os.listdir(pasta) if n.startswith(PREFIXO) and n.endswith(".zip")), reverse=True)
+    return [os.path.join(pasta, n) for n in nomes]
+
+def precisa_backup(pasta=None, intervalo=INTERVALO):
+    """True se o último backup é mais velho que `intervalo` (ou não há nenhum)."""
+    backups = listar_backups(pasta)
+    return not backups or datetime.now() - datetime.fromtimestamp(os.path.getmtime(backups[0])) > intervalo
+
+def _rodar(pasta, manter):
+    # O mais novo nunca sai, mesmo com manter=0
+    for caminho in listar_backups(pasta)[max(1, manter):]:
+        os.remove(caminho)
+
+def criar_backup(pasta=None, manter=MANTER, paginas=PAGINAS, verificar=True, progresso=None):
+    """Grava um backup novo em `pasta` e apaga os que passarem de `manter`.
+
+    `progresso`, se informado, recebe (etapa, feito, total), com etapa
+    "banco" (páginas), "notas" (PDFs) ou "verificacao".
+    Devolve {"arquivo", "bytes", "notas", "faltando", "segundos", "verificacao"}.
+    """
+    pasta = pasta or pasta_padrao()
+    os.makedirs(pasta, exist_ok=True)
+    inicio = time.perf_counter()
+    anos = {}
+    agora = datetime.now()
+    destino = os.path.join(pasta, f"{PREFIXO}{agora:%Y%m%d_%H%M%S}.zip")
+    copia = destino + ".db.tmp"
+    temporario = destino + ".tmp"
+    try:
+        with db.leitura_isolada() as conn:
+            # A primeira leitura fixa o instante; a cópia das páginas vem dele
+            contagens = db.contar_registros(conn)
+            notas = db.arquivos_notas(conn)
+            anos = db.arquivos_anuais(conn)
+            db.copiar_banco(conn, copia, paginas, (lambda feitas, total: progresso("banco", feitas, total))
+                            if progresso else None)
+            for esquema, arquivo in anos.items():
+                db.copiar_banco(conn, f"{copia}.{arquivo}", paginas, esquema=esquema)
+        manifesto = {"criado_em": agora.isoformat(timespec="seconds"), "origem": os.path.abspath(db.caminho_banco()),
+                     "contagens": contagens, "arquivos": sorted(anos.values()), "notas": {}, "faltando": []}
+        with zipfile.ZipFile(temporario, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as z:
+            z.write(copia, BANCO)
+            for arquivo in anos.values():
+                z.write(f"{copia}.{arquivo}", arquivo)
+            for i, caminho in enumerate(notas, start=1):
+                if os.path.isfile(caminho):
+                    nome = f"notas/{i:06d}_{os.path.basename(caminho)}"
+                    # PDF já é comprimido: guardar sem deflate sai bem mais rápido
+                    z.write(caminho, nome, compress_type=zipfile.ZIP_STORED)
+                    manifesto["notas"][nome] = caminho
+                else:
+                    manifesto["faltando"].append(caminho)
+                if progresso and (i % 100 == 0 or i == len(notas)): progresso("notas", i, len(notas))
+            z.writestr(MANIFESTO, json.dumps(manifesto, ensure_ascii=False, indent=1))
+        os.replace(temporario, destino)
+    finally:
+        for resto in [copia, temporario] + [f"{copia}.{arquivo}" for arquivo in anos.values()]:
+            if os.path.exists(resto): os.remove(resto)
+    verificacao = None
+    if verificar:
+        if progresso: progresso("verificacao", 0, 1)
+        verificacao = verificar_backup(destino)
+    _rodar(pasta, manter)
+    return {"arquivo": destino, "bytes": os.path.getsize(destino), "notas": len(manifesto["notas"]),
+            "faltando": manifesto["faltando"], "segundos": time.perf_counter() - inicio,
+            "verificacao": verificacao}
+
+def verificar_backup(arquivo, completa=False):
+    """Confere se o backup restaura; levanta ErroBackup se não.
+
+    Devolve {"contagens", "notas", "segundos"}.
+    """
+    inicio = time.perf_counter()
+    try:
+        z = zipfile.ZipFile(arquivo)
+    except (OSError, zipfile.BadZipFile) as e:
+        raise ErroBackup(f"{arquivo}: não é um backup legível ({e})")
+    with z, tempfile.TemporaryDirectory() as pasta:
+        try:
+            manifesto = json.loads(z.read(MANIFESTO))
+            # Extrair confere o CRC do banco
+            z.extract(BANCO, pasta)
+        except (KeyError, ValueError, zipfile.BadZipFile) as e:
+            raise ErroBackup(f"{arquivo}: backup incompleto ({e})")
+        faltando = [nome for nome in [*manifesto.get("arquivos", []), *manifesto["notas"]] if nome not in z.NameToInfo]
+        if faltando:
+            raise ErroBackup(f"{len(faltando)} arquivo(s) do manifesto fora do backup, ex.: {faltando[0]}")
+        if completa:
+            ruim = z.testzip()
+            if ruim: raise ErroBackup(f"{ruim}: conteúdo corrompido (CRC)")
+        conn = sqlite3.connect(f"file:{os.path.join(pasta, BANCO)}?mode=ro", uri=True)
+        try:
+            resultado = conn.execute("PRAGMA integrity_check" if completa else "PRAGMA quick_check").fetchone()[0]
+            if resultado != "ok":
+                raise ErroBackup(f"banco corrompido: {resultado}")
+            contagens = db.contar_registros(conn)
+        except sqlite3.DatabaseError as e:
+            raise ErroBackup(f"banco ilegível: {e}")
+        finally:
+            conn.close()
+    if contagens != manifesto["contagens"]:
+        raise ErroBackup(f"contagens diferentes do manifesto: {contagens} != {manifesto['contagens']}")
+    return {"contagens": contagens, "notas": len(manifesto["notas"]), "segundos": time.perf_counter() - inicio}
+
+def restaurar_backup(arquivo, destino, pasta_notas=None):
+    """Verifica e extrai o banco para `destino` (que não pode existir).
+
+    Os anos arquivados vão para a pasta do banco. Os PDFs voltam para os
+    caminhos originais, ou para `pasta_notas` se informada; arquivos que já
+    existem não são sobrescritos.
+    Devolve {"banco", "notas", "puladas"}.
+    """
+    if os.path.exists(destino):
+        raise ErroBackup(f"{destino} já existe; restaure para outro arquivo e troque com o programa fechado")
+    verificar_backup(arquivo)
+    restauradas = puladas = 0
+    with zipfile.ZipFile(arquivo) as z:
+        manifesto = json.loads(z.read(MANIFESTO))
+        pasta = os.path.dirname(os.path.abspath(destino))
+        os.makedirs(pasta, exist_ok=True)
+        with z.open(BANCO) as origem, open(destino + ".tmp", "wb") as f:
+            shutil.copyfileobj(origem, f)
+        os.replace(destino + ".tmp", destino)
+        for arquivo in manifesto.get("arquivos", []):
+            if os.path.exists(os.path.join(pasta, arquivo)):
+                raise ErroBackup(f"{arquivo} já existe em {pasta}")
+            z.extract(arquivo, pasta)
+        for nome, original in manifesto["notas"].items():
+            alvo = os.path.join(pasta_notas, os.path.basename(original)) if pasta_notas else original
+            if os.path.exists(alvo):
+                puladas += 1
+                continue
+            os.makedirs(os.path.dirname(os.path.abspath(alvo)), exist_ok=True)
+            with z.open(nome) as origem, open(alvo, "wb") as f:
+                shutil.copyfileobj(origem, f)
+            restauradas += 1
+    return {"banco": destino, "notas": restauradas, "puladas": puladas}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backup do banco e das notas em PDF.")
+    parser.add_argument("--pasta", help="pasta dos backups (padrão: data/backups)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("criar", help="novo backup, sem fechar o programa")
+    p.add_argument("--manter", type=int, default=MANTER, help="quantos backups guardar")
+    sub.add_parser("listar", help="backups da pasta, do mais novo para o mais antigo")
+    p = sub.add_parser("verificar", help="confere se um backup restaura")
+    p.add_argument("arquivo")
+    p.add_argument("--completa", action="store_true", help="CRC de todos os PDFs e integrity_check")
+    p = sub.add_parser("restaurar", help="extrai o banco (e os PDFs) de um backup")
+    p.add_argument("arquivo")
+    p.add_argument("destino", help="arquivo do banco restaurado (não pode existir)")
+    p.add_argument("--notas", help="pasta para os PDFs (padrão: os caminhos originais)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "criar":
+            res = criar_backup(args.pasta, args.manter, progresso=lambda etapa, feito, total: print(
+                f"\r{etapa}: {feito}/{total}", end="", flush=True))
+            print(f"\n{res['arquivo']}: {res['bytes'] / 2**20:.1f} MB, {res['notas']} PDFs "
+                  f"em {res['segundos']:.1f}s (verificado)")
+            if res["faltando"]:
+                print(f"{len(res['faltando'])} PDF(s) não encontrados, ex.: {res['faltando'][0]}")
+        elif args.comando == "listar":
+            for caminho in listar_backups(args.pasta):
+                print(f"{caminho}  {os.path.getsize(caminho) / 2**20:8.1f} MB")
+        elif args.comando == "verificar":
+            res = verificar_backup(args.arquivo, args.completa)
+            linhas = ", ".join(f"{t}: {n}" for t, n in res["contagens"].items())
+            print(f"OK ({res['segundos']:.2f}s): {linhas}, {res['notas']} PDFs")
+        else:
+            res = restaurar_backup(args.arquivo, args.destino, args.notas)
+            print(f"Banco em {res['banco']}; {res['notas']} PDFs restaurados, {res['puladas']} já existiam")
+    except ErroBackup as e:
+        parser.exit(1, f"erro: {e}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Exportação de histórico, fechamentos e clientes para a contabilidade.
+
+Uso (a partir de src/):
+    python -m servicos.contabil 03/2024 --destino contabil_marco
+    python -m servicos.contabil --inicio 2024-01-01 --fim 2024-12-31 --destino 2024 --formato parquet
+
+Gera um arquivo por tabela (historico_itens, fechamentos, clientes) em CSV
+ou Parquet. As linhas vêm do banco em lotes (fetchmany) e vão direto para
+o arquivo, então a memória não cresce com o período. Tudo é lido de um
+mesmo instante do banco (db.leitura_isolada).
+
+Parquet precisa do pyarrow, que é opcional: sem ele só o CSV fica disponível.
+"""
+import argparse
+import csv
+import os
+import time
+
+import models.db as db
+
+CSV, PARQUET = "csv", "parquet"
+# Nome da função de models.db por tabela; resolvida na hora da exportação,
+# para pegar a versão medida pelo diagnóstico ou a do servidor remoto
+TABELAS = {
+    "historico_itens": "exportar_historico_itens",
+    "fechamentos": "exportar_fechamentos",
+    "clientes": "exportar_clientes",
+}
+# Tipos das colunas no Parquet; as ausentes são texto
+_TIPOS_PARQUET = {
+    "id_nota": "int64", "id_cliente": "int64", "item": "int64", "id": "int64",
+    "quantidade": "float64", "valor_total_item": "float64", "valor_total_nota": "float64", "valor": "float64",
+}
+
+def formatos_disponiveis():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return [CSV]
+    return [CSV, PARQUET]
+
+def _gravar_csv(caminho, colunas, lotes):
+    linhas = 0
+    # utf-8-sig: o Excel abre com os acentos certos
+    with open(caminho, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(colunas)
+        for lote in lotes:
+            w.writerows(lote)
+            linhas += len(lote)
+            yield linhas
+
+def _gravar_parquet(caminho, colunas, lotes):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    esquema = pa.schema([(c, pa.type_for_alias(_TIPOS_PARQUET.get(c, "string"))) for c in colunas])
+    linhas = 0
+    # Cada lote vira um row group: só um lote por vez fica na memória
+    with pq.ParquetWriter(caminho, esquema, compression="zstd") as escritor:
+        for lote in lotes:
+            colunas_lote = [[str(v) if v is not None and tipo == pa.string() else v for v in coluna]
+                            for coluna, tipo in zip(zip(*lote), esquema.types)]
+            escritor.write_table(pa.Table.from_arrays(colunas_lote, schema=esquema))
+            linhas += len(lote)
+            yield linhas
+    if not linhas:
+        yield 0
+
+def exportar_contabil(inicio, fim, destino, formato=CSV, lote=5000, progresso=None):
+    """Grava as três tabelas do período em `destino`.
+
+    `progresso`, se informado, recebe (tabela, linhas gravadas até agora).
+    Devolve {"arquivos": {tabela: (caminho, linhas)}, "linhas": total, "segundos": ...}.
+    """
+    if formato not in formatos_disponiveis():
+        raise ValueError(f"formato indisponível: {formato} (Parquet precisa do pyarrow)")
+    os.makedirs(destino, exist_ok=True)
+    gravar = _gravar_parquet if formato == PARQUET else _gravar_csv
+    inicio_t = time.perf_counter()
+    arquivos = {}
+    with db.leitura_isolada() as conn:
+        for tabela, nome in TABELAS.items():
+            consulta = getattr(db, nome)
+            caminho = os.path.join(destino, f"{tabela}.{formato}")
+            linhas = 0
+            for linhas in gravar(caminho, db.COLUNAS_EXPORTACAO[tabela], consulta(conn, inicio, fim, lote)):
+                if progresso: progresso(tabela, linhas)
+            arquivos[tabela] = (caminho, linhas)
+    return {
+        "arquivos": arquivos,
+        "linhas": sum(n for _, n in arquivos.values()),
+        "segundos": time.perf_counter() - inicio_t,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta os dados de um período para a contabilidade.")
+    parser.add_argument("mes", nargs="?", help="mês no formato MM/YYYY")
+    parser.add_argument("--inicio", help="data inicial (dd/mm/YYYY ou YYYY-MM-DD)")
+    parser.add_argument("--fim", help="data final (dd/mm/YYYY ou YYYY-MM-DD)")
+    parser.add_argument("--destino", required=True, help="pasta onde os arquivos serão gravados")
+    parser.add_argument("--formato", choices=(CSV, PARQUET), default=CSV)
+    args = parser.parse_args(argv)
+
+    if args.mes:
+        mes, ano = args.mes.split("/")
+        inicio, fim = db.periodo_do_mes(mes, ano)
+    elif args.inicio and args.fim:
+        inicio, fim = args.inicio, args.fim
+    else:
+        parser.error("informe MM/YYYY ou --inicio e --fim")
+
+    try:
+        res = exportar_contabil(inicio, fim, args.destino, args.formato,
+                                progresso=lambda tabela, n: print(f"\r{tabela}: {n} linhas", end="", flush=True))
+    except ValueError as e:
+        parser.error(str(e))
+    print()
+    for tabela, (caminho, linhas) in res["arquivos"].items():
+        print(f"{caminho}: {linhas} linhas")
+    print(f"{res['linhas']} linhas em {res['segundos']:.1f}s")
+
+if __name__ == "__main__":
+    main()
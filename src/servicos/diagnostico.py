@@ -0,0 +1,223 @@
+"""Medição opcional de desempenho: consultas SQL, funções do banco e interface.
+
+Desligada por padrão e sem custo enquanto desligada. Ao ligar (ativar() ou
+variável de ambiente OFICINA_DIAGNOSTICO=1 na abertura do programa):
+
+- cada comando SQL é cronometrado a partir do trace callback do sqlite3,
+  do início dele até o próximo comando ou o fim da função que o executou;
+- toda função pública de models.db passa a ser cronometrada, com o número
+  de linhas devolvidas quando o resultado é uma lista;
+- trechos marcados com @medido / medir() (PDF, por exemplo) também entram;
+  na interface, o TrabalhadorBanco mede da chamada até o retorno (RESPOSTA).
+
+Cada nome acumula chamadas, tempo total, máximo, linhas e um histograma
+de latência. Os eventos mais recentes ficam guardados para exportar em
+JSON ou CSV e investigar lentidão na máquina do cliente.
+"""
+import csv
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import models.db as db
+
+SQL, BANCO, INTERFACE, RESPOSTA, PDF = "sql", "banco", "interface", "resposta", "pdf"
+FAIXAS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)  # limites superiores
+MAX_EVENTOS = 20000
+
+class Estatistica:
+    __slots__ = ("chamadas", "total_ms", "max_ms", "linhas", "histograma")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.linhas = None    # só conta quando o resultado tem linhas
+        self.histograma = [0] * (len(FAIXAS_MS) + 1)
+
+    def registrar(self, ms, linhas):
+        self.chamadas += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if linhas is not None:
+            self.linhas = (self.linhas or 0) + linhas
+        i = 0
+        while i < len(FAIXAS_MS) and ms > FAIXAS_MS[i]: i += 1
+        self.histograma[i] += 1
+
+    def percentil(self, p):
+        """Limite superior da faixa do histograma onde cai o percentil `p`."""
+        alvo = self.chamadas * p / 100
+        acumulado = 0
+        for i, n in enumerate(self.histograma):
+            acumulado += n
+            if n and acumulado >= alvo:
+                return FAIXAS_MS[i] if i < len(FAIXAS_MS) else self.max_ms
+        return 0.0
+
+    def como_dict(self):
+        return {
+            "chamadas": self.chamadas,
+            "total_ms": round(self.total_ms, 3),
+            "media_ms": round(self.total_ms / self.chamadas, 3) if self.chamadas else 0.0,
+            "p95_ms": self.percentil(95),
+            "max_ms": round(self.max_ms, 3),
+            "linhas": self.linhas,
+            "histograma": dict(zip([f"<={f}" for f in FAIXAS_MS] + [f">{FAIXAS_MS[-1]}"], self.histograma)),
+        }
+
+_ativo = False
+_lock = threading.Lock()
+_estatisticas = {}     # (tipo, nome) -> Estatistica
+_eventos = deque(maxlen=MAX_EVENTOS)
+_originais = {}        # nome da função em models.db -> função original
+_por_thread = threading.local()
+# Infraestrutura do próprio models.db, que só poluiria o relatório
+# (os context managers só montariam o gerador, sem medir a operação em si)
+_NAO_MEDIR = {"conectar", "transacao", "lote_escrita", "leitura_isolada", "inscrever", "cancelar_inscricao",
+              "definir_rastreador", "caminho_banco"}
+
+def ativo():
+    return _ativo
+
+def registrar(tipo, nome, ms, linhas=None):
+    with _lock:
+        est = _estatisticas.get((tipo, nome))
+        if est is None:
+            est = _estatisticas[(tipo, nome)] = Estatistica()
+        est.registrar(ms, linhas)
+        _eventos.append((time.time(), tipo, nome, round(ms, 3), linhas))
+
+# --- SQL (trace callback) ---
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACOS = re.compile(r"\s+")
+
+def _normalizar(sql):
+    """Troca literais por '?' para agrupar o mesmo comando com valores diferentes."""
+    return _ESPACOS.sub(" ", _LITERAIS.sub("?", sql)).strip()[:300]
+
+def _fechar_comando(agora):
+    aberto = getattr(_por_thread, "comando", None)
+    if aberto:
+        sql, inicio = aberto
+        _por_thread.comando = None
+        registrar(SQL, sql, (agora - inicio) * 1000)
+
+def _rastrear(sql):
+    agora = time.perf_counter()
+    _fechar_comando(agora)
+    if not sql.startswith("--"):  # "-- TRIGGER ..." faz parte do comando anterior
+        _por_thread.comando = (_normalizar(sql), agora)
+
+# --- FUNÇÕES DO BANCO ---
+def _envolver(nome, funcao):
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            res = funcao(*args, **kwargs)
+        finally:
+            fim = time.perf_counter()
+            _fechar_comando(fim)
+        registrar(BANCO, nome, (fim - inicio) * 1000, len(res) if isinstance(res, list) else None)
+        return res
+    return medida
+
+def _funcoes_banco():
+    for nome, obj in vars(db).items():
+        if (not nome.startswith("_") and nome not in _NAO_MEDIR and callable(obj) and not isinstance(obj, type)
+                and getattr(obj, "__module__", None) == db.__name__):
+            yield nome, obj
+
+def ativar():
+    """Liga a medição; vale para as chamadas feitas depois daqui."""
+    global _ativo
+    if _ativo: return
+    for nome, funcao in list(_funcoes_banco()):
+        _originais[nome] = funcao
+        setattr(db, nome, _envolver(nome, funcao))
+    db.definir_rastreador(_rastrear)
+    _ativo = True
+
+def desativar():
+    global _ativo
+    if not _ativo: return
+    db.definir_rastreador(None)
+    for nome, funcao in _originais.items():
+        setattr(db, nome, funcao)
+    _originais.clear()
+    _ativo = False
+
+def limpar():
+    with _lock:
+        _estatisticas.clear()
+        _eventos.clear()
+
+# --- TRECHOS MARCADOS ---
+@contextmanager
+def medir(nome, tipo=INTERFACE):
+    if not _ativo:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(tipo, nome, (time.perf_counter() - inicio) * 1000)
+
+def medido(nome, tipo=INTERFACE):
+    """Decorador: cronometra a função quando a medição está ligada."""
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if not _ativo:
+                return funcao(*args, **kwargs)
+            with medir(nome, tipo):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar
+
+# --- RELATÓRIO E EXPORTAÇÃO ---
+def resumo():
+    """Lista de dicionários (tipo, nome e estatísticas), do maior tempo total para o menor."""
+    with _lock:
+        itens = [dict(tipo=tipo, nome=nome, **est.como_dict()) for (tipo, nome), est in _estatisticas.items()]
+    return sorted(itens, key=lambda e: e["total_ms"], reverse=True)
+
+def exportar_json(caminho):
+    with _lock:
+        eventos = list(_eventos)
+    dados = {
+        "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "banco": db.caminho_banco(),
+        "resumo": resumo(),
+        "eventos": [dict(zip(("instante", "tipo", "nome", "ms", "linhas"), e)) for e in eventos],
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False)
+
+def exportar_csv(caminho):
+    """Um evento por linha; o resumo vai junto em '<caminho>_resumo.csv'."""
+    with _lock:
+        eventos = list(_eventos)
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["instante", "tipo", "nome", "ms", "linhas"])
+        for instante, tipo, nome, ms, linhas in eventos:
+            w.writerow([time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(instante)), tipo, nome, ms,
+                        "" if linhas is None else linhas])
+    base, ext = os.path.splitext(caminho)
+    with open(f"{base}_resumo{ext or '.csv'}", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        colunas = ["tipo", "nome", "chamadas", "total_ms", "media_ms", "p95_ms", "max_ms", "linhas"]
+        w.writerow(colunas)
+        for item in resumo():
+            w.writerow([item[c] for c in colunas])
+
+if os.environ.get("OFICINA_DIAGNOSTICO") == "1":
+    ativar()
@@ -0,0 +1,78 @@
+"""Reemissão em lote das notas de um período, em paralelo.
+
+Uso (a partir de src/):
+    python -m servicos.exportacao 03/2024 --destino notas_marco
+    python -m servicos.exportacao --inicio 2024-03-01 --fim 2024-03-15 --destino notas
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import time
+
+import models.db as db
+from servicos.pdf import renderizar_tarefa
+
+def _nome_arquivo(id_nota, data, nome_cliente):
+    nome = re.sub(r"[^\w-]+", "_", nome_cliente).strip("_") or "cliente"
+    return f"{db.data_iso(data)}_{id_nota:06d}_{nome}.pdf"
+
+def _tarefas(inicio, fim, destino):
+    for id_nota, data, nome, itens, total in db.iterar_historico_periodo(inicio, fim):
+        arquivo = os.path.join(destino, _nome_arquivo(id_nota, data, nome))
+        yield arquivo, {"nome": nome}, itens, total, data
+
+def exportar_periodo(inicio, fim, destino, processos=None, progresso=None):
+    """Renderiza todas as notas entre `inicio` e `fim` em `destino`.
+
+    As linhas são lidas em lotes e entregues ao pool conforme ele consome,
+    então a memória não cresce com o tamanho do período. `progresso`, se
+    informado, recebe (feitas, total) a cada nota concluída.
+    Devolve um dicionário com notas, páginas, segundos e páginas/s.
+    """
+    os.makedirs(destino, exist_ok=True)
+    total = db.contar_historico_periodo(inicio, fim)
+    processos = processos or os.cpu_count() or 1
+    feitas = paginas = 0
+    inicio_t = time.perf_counter()
+    if total:
+        lote = max(1, min(32, total // (processos * 4)))
+        with multiprocessing.Pool(processos) as pool:
+            for _, n_paginas in pool.imap_unordered(renderizar_tarefa, _tarefas(inicio, fim, destino), lote):
+                feitas += 1
+                paginas += n_paginas
+                if progresso: progresso(feitas, total)
+    segundos = time.perf_counter() - inicio_t
+    return {
+        "notas": feitas,
+        "paginas": paginas,
+        "segundos": segundos,
+        "paginas_por_segundo": paginas / segundos if segundos else 0.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reemite em PDF as notas de um período.")
+    parser.add_argument("mes", nargs="?", help="mês no formato MM/YYYY")
+    parser.add_argument("--inicio", help="data inicial (dd/mm/YYYY ou YYYY-MM-DD)")
+    parser.add_argument("--fim", help="data final (dd/mm/YYYY ou YYYY-MM-DD)")
+    parser.add_argument("--destino", required=True, help="pasta onde os PDFs serão gravados")
+    parser.add_argument("--processos", type=int, default=None, help="padrão: número de núcleos")
+    args = parser.parse_args(argv)
+
+    if args.mes:
+        mes, ano = args.mes.split("/")
+        inicio, fim = db.periodo_do_mes(mes, ano)
+    elif args.inicio and args.fim:
+        inicio, fim = args.inicio, args.fim
+    else:
+        parser.error("informe MM/YYYY ou --inicio e --fim")
+
+    def mostrar(feitas, total):
+        print(f"\r{feitas}/{total} notas", end="", flush=True)
+
+    res = exportar_periodo(inicio, fim, args.destino, args.processos, mostrar)
+    print(f"\n{res['notas']} notas, {res['paginas']} páginas em {res['segundos']:.1f}s "
+          f"({res['paginas_por_segundo']:.1f} páginas/s)")
+
+if __name__ == "__main__":
+    main()
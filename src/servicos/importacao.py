@@ -0,0 +1,199 @@
+"""Importação em lote de clientes e do catálogo de peças a partir de CSV.
+
+Uso (a partir de src/):
+    python -m servicos.importacao clientes clientes.csv
+    python -m servicos.importacao produtos pecas.csv --encoding latin-1
+
+O arquivo é lido em fluxo (nunca inteiro na memória) e gravado com
+executemany em transações grandes. Linhas inválidas ou já cadastradas são
+puladas e contadas no relatório.
+
+Cabeçalhos aceitos (sem diferença de maiúsculas/acentos):
+    clientes: nome, telefone, endereco, carro, placa, ano, km, observacoes, status
+    produtos: nome, valor
+O separador (vírgula ou ponto e vírgula) é detectado sozinho.
+"""
+import argparse
+import csv
+import os
+import re
+import time
+import unicodedata
+
+import models.db as db
+
+LOTE = 10_000
+MAX_ERROS = 200
+
+SINONIMOS = {
+    "nome": "nome", "cliente": "nome", "item": "nome", "peca": "nome", "descricao": "nome",
+    "telefone": "telefone", "fone": "telefone", "celular": "telefone", "whatsapp": "telefone",
+    "endereco": "endereco", "carro": "carro", "veiculo": "carro", "modelo": "carro",
+    "placa": "placa", "ano": "ano", "km": "km", "quilometragem": "km",
+    "observacoes": "observacoes", "obs": "observacoes", "status": "status",
+    "valor": "valor", "preco": "valor", "valor_padrao": "valor",
+}
+
+class ErroImportacao(ValueError):
+    pass
+
+# --- VALIDAÇÃO ---
+def normalizar_placa(texto):
+    """'abc-1234' -> 'ABC1234'. Vazio é aceito; formato inválido levanta ErroImportacao."""
+    placa = re.sub(r"[^A-Za-z0-9]", "", texto or "").upper()
+    if placa and not (db.PLACA_ANTIGA.match(placa) or db.PLACA_MERCOSUL.match(placa)):
+        raise ErroImportacao(f"placa inválida: {texto!r}")
+    return placa
+
+def normalizar_telefone(texto):
+    """Só dígitos, com DDD (10 ou 11), opcionalmente precedido de 55."""
+    digitos = re.sub(r"\D", "", texto or "")
+    if digitos.startswith("55") and len(digitos) in (12, 13):
+        digitos = digitos[2:]
+    if digitos and len(digitos) not in (10, 11):
+        raise ErroImportacao(f"telefone inválido: {texto!r}")
+    return digitos
+
+def normalizar_valor(texto):
+    """Aceita '25.5', '25,50' e '1.234,56'."""
+    texto = (texto or "").replace("R$", "").strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return float(texto) if texto else 0.0
+    except ValueError:
+        raise ErroImportacao(f"valor inválido: {texto!r}")
+
+def _chave(texto):
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+# --- LEITURA ---
+def _ler(caminho, encoding, progresso):
+    """Gera (número da linha, dicionário com campos canônicos) e reporta o avanço."""
+    tamanho = os.path.getsize(caminho) or 1
+    with open(caminho, newline="", encoding=encoding) as f:
+        amostra = f.read(8192)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(f, dialeto)
+        cabecalho = [SINONIMOS.get(_chave(c).replace(" ", "_")) for c in next(leitor, [])]
+        if "nome" not in cabecalho:
+            raise ErroImportacao("o arquivo precisa de uma coluna 'nome'")
+        for numero, valores in enumerate(leitor, start=2):
+            if numero % 1000 == 0 and progresso:
+                progresso(numero, min(100, f.buffer.tell() * 100 // tamanho))
+            if not any(v.strip() for v in valores):
+                continue
+            yield numero, {c: v.strip() for c, v in zip(cabecalho, valores) if c}
+
+# --- IMPORTAÇÃO ---
+def _importar(linhas_validas, inserir, lote):
+    pendentes = []
+    importadas = 0
+    for linha in linhas_validas:
+        pendentes.append(linha)
+        if len(pendentes) >= lote:
+            importadas += inserir(pendentes)
+            pendentes.clear()
+    if pendentes:
+        importadas += inserir(pendentes)
+    return importadas
+
+def _relatorio(tabela, caminho, encoding, progresso, lote, converter, chaves_existentes, inserir):
+    res = {"lidas": 0, "importadas": 0, "duplicadas": 0, "invalidas": 0, "erros": []}
+    inicio = time.perf_counter()
+    vistas = set(chaves_existentes)
+
+    def validas():
+        for numero, campos in _ler(caminho, encoding, progresso):
+            res["lidas"] += 1
+            try:
+                chaves, linha = converter(campos)
+            except ErroImportacao as e:
+                res["invalidas"] += 1
+                if len(res["erros"]) < MAX_ERROS: res["erros"].append((numero, str(e)))
+                continue
+            if any(ch in vistas for ch in chaves):
+                res["duplicadas"] += 1
+                continue
+            vistas.update(chaves)
+            yield linha
+
+    try:
+        res["importadas"] = _importar(validas(), inserir, lote)
+    finally:
+        # Mesmo se parar no meio, os lotes já gravados aparecem nas telas
+        db.concluir_importacao(tabela)
+    if progresso: progresso(res["lidas"] + 1, 100)
+    res["segundos"] = time.perf_counter() - inicio
+    return res
+
+def _chaves_cliente(nome, telefone, placa):
+    """Mesma placa (em qualquer formato), ou mesmo nome com o mesmo telefone, é o mesmo cliente."""
+    chaves = []
+    if placa: chaves.append(("placa", db.chave_placa(placa)))
+    if telefone: chaves.append(("nome_tel", _chave(nome), telefone))
+    if not placa and not telefone: chaves.append(("nome", _chave(nome)))
+    return chaves
+
+def _converter_cliente(campos):
+    nome = campos.get("nome", "")
+    if not nome:
+        raise ErroImportacao("nome vazio")
+    telefone = normalizar_telefone(campos.get("telefone"))
+    placa = normalizar_placa(campos.get("placa"))
+    linha = (nome, telefone, campos.get("endereco", ""), campos.get("carro", ""), placa,
+             campos.get("ano", ""), campos.get("km", ""), campos.get("observacoes", ""),
+             campos.get("status") or "Aberto")
+    return _chaves_cliente(nome, telefone, placa), linha
+
+def _chaves_clientes_existentes():
+    for nome, telefone, placa in db.chaves_clientes():
+        try:
+            telefone = normalizar_telefone(telefone)
+        except ErroImportacao:
+            telefone = re.sub(r"\D", "", telefone or "")
+        yield from _chaves_cliente(nome, telefone, placa)
+
+def importar_clientes(caminho, progresso=None, lote=LOTE, encoding="utf-8-sig"):
+    """Importa clientes de um CSV.
+
+    `progresso`, se informado, recebe (linha atual, porcentagem do arquivo).
+    Devolve um dicionário com lidas, importadas, duplicadas, invalidas,
+    erros (número da linha, motivo) e segundos.
+    """
+    return _relatorio("clientes", caminho, encoding, progresso, lote, _converter_cliente,
+                      _chaves_clientes_existentes(), db.inserir_clientes_em_lote)
+
+def _converter_produto(campos):
+    nome = campos.get("nome", "")
+    if not nome:
+        raise ErroImportacao("nome vazio")
+    return [_chave(nome)], (nome, normalizar_valor(campos.get("valor")))
+
+def importar_produtos(caminho, progresso=None, lote=LOTE, encoding="utf-8-sig"):
+    """Importa o catálogo de peças e serviços de um CSV; mesmo retorno de importar_clientes."""
+    return _relatorio("produtos", caminho, encoding, progresso, lote, _converter_produto,
+                      (_chave(n) for n in db.nomes_produtos()), db.inserir_produtos_em_lote)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa clientes ou peças de um arquivo CSV.")
+    parser.add_argument("tipo", choices=("clientes", "produtos"))
+    parser.add_argument("arquivo")
+    parser.add_argument("--encoding", default="utf-8-sig", help="ex.: latin-1 para planilhas antigas do Excel")
+    args = parser.parse_args(argv)
+
+    importar = importar_clientes if args.tipo == "clientes" else importar_produtos
+    res = importar(args.arquivo, progresso=lambda linha, pct: print(f"\r{pct:3d}% (linha {linha})", end=""),
+                   encoding=args.encoding)
+    print(f"\n{res['importadas']} importados, {res['duplicadas']} duplicados, "
+          f"{res['invalidas']} inválidos de {res['lidas']} linhas em {res['segundos']:.1f}s")
+    for numero, motivo in res["erros"][:20]:
+        print(f"  linha {numero}: {motivo}")
+
+if __name__ == "__main__":
+    main()
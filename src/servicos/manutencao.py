@@ -0,0 +1,70 @@
+"""Comandos de manutenção do banco.
+
+Uso (a partir de src/):
+    python -m servicos.manutencao reconstruir-agregados
+    python -m servicos.manutencao versao-esquema
+    python -m servicos.manutencao datas-invalidas
+    python -m servicos.manutencao arquivos
+    python -m servicos.manutencao arquivar 2022 --compactar
+"""
+import argparse
+import os
+
+import models.db as db
+
+def reconstruir_agregados(args):
+    db.reconstruir_agregados()
+    print("Faturamento por dia e por mês recalculado.")
+
+def versao_esquema(args):
+    print(f"Esquema na versão {db.versao_esquema()} de {len(db.MIGRACOES)}.")
+
+def datas_invalidas(args):
+    linhas = db.datas_invalidas()
+    for id_nota, id_cliente, data in linhas:
+        print(f"nota {id_nota} (cliente {id_cliente or '-'}): {data if data is not None else 'sem data'}")
+    print(f"{len(linhas)} nota(s) fora das somas por período.")
+
+def arquivos(args):
+    for ano, arquivo, notas, fechamentos, quando in db.anos_arquivados():
+        print(f"{ano}: {notas} notas e {fechamentos} fechamentos em {arquivo} (arquivado em {quando})")
+    pendentes = db.anos_para_arquivar()
+    print("Anos encerrados ainda no banco principal: " + (", ".join(map(str, pendentes)) or "nenhum"))
+
+def arquivar(args):
+    for ano in args.anos:
+        try:
+            res = db.arquivar_ano(ano)
+        except ValueError as e:
+            raise SystemExit(f"erro: {e}")
+        print(f"{ano}: {res['notas']} notas e {res['fechamentos']} fechamentos em {res['arquivo']}")
+    if args.compactar:
+        compactar(args)
+
+def compactar(args):
+    antes = os.path.getsize(db.caminho_banco())
+    db.compactar_banco()
+    print(f"Banco compactado: {antes / 2**20:.1f} MB -> {os.path.getsize(db.caminho_banco()) / 2**20:.1f} MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção do banco de dados.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reconstruir-agregados", help="recalcula faturamento_dia e faturamento_mes do zero") \
+        .set_defaults(funcao=reconstruir_agregados)
+    sub.add_parser("versao-esquema", help="mostra quantas migrações já foram aplicadas") \
+        .set_defaults(funcao=versao_esquema)
+    sub.add_parser("datas-invalidas", help="notas com data que não está em AAAA-MM-DD") \
+        .set_defaults(funcao=datas_invalidas)
+    sub.add_parser("arquivos", help="anos arquivados e anos que ainda podem ser arquivados") \
+        .set_defaults(funcao=arquivos)
+    p = sub.add_parser("arquivar", help="move notas e fechamentos de anos encerrados para arquivo_AAAA.db")
+    p.add_argument("anos", nargs="+", type=int)
+    p.add_argument("--compactar", action="store_true", help="depois, devolve o espaço ao disco (VACUUM)")
+    p.set_defaults(funcao=arquivar)
+    sub.add_parser("compactar", help="VACUUM do banco principal") \
+        .set_defaults(funcao=compactar)
+    args = parser.parse_args(argv)
+    args.funcao(args)
+
+if __name__ == "__main__":
+    main()
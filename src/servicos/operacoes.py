@@ -0,0 +1,46 @@
+"""Regras da oficina sem interface: notas, fechamentos de caixa e contato.
+
+Pode ser importado sem PyQt5; o ReportLab só é carregado quando a primeira
+nota é renderizada. A interface (main.py) e a linha de comando (cli.py)
+usam as mesmas funções.
+"""
+import json
+from datetime import datetime
+
+import models.db as db
+from servicos import diagnostico
+
+DIARIO, MENSAL = "Diário", "Mensal"
+
+def emitir_nota(arquivo, cliente, itens, total, progresso=None):
+    """Gera o PDF e só então grava o histórico. Devolve o id da nota.
+
+    `cliente` é um dicionário com 'id' e 'nome'; `itens` são (qtd, descrição, valor).
+    `progresso`, se informado, recebe mensagens de texto a cada etapa.
+    """
+    from servicos.pdf import criar_pdf
+    nome = cliente['nome']
+    if progresso: progresso(f"Gerando PDF de {nome}...")
+    with diagnostico.medir("criar_pdf", diagnostico.PDF):
+        criar_pdf(arquivo, cliente, itens, total)
+    if progresso: progresso(f"Salvando histórico de {nome}...")
+    hj = datetime.now().strftime('%Y-%m-%d')
+    return db.salvar_historico(cliente['id'], hj, json.dumps(itens), total, arquivo)
+
+def fechamento_dia(data=None):
+    """(tipo, período, valor) do caixa do dia; hoje se `data` for omitida."""
+    data = data or datetime.now().strftime("%d/%m/%Y")
+    return DIARIO, data, db.calcular_total_dia(data)
+
+def fechamento_mes(mes=None, ano=None):
+    """(tipo, período, valor) do caixa do mês; o mês atual se omitido."""
+    agora = datetime.now()
+    mes, ano = int(mes or agora.month), int(ano or agora.year)
+    return MENSAL, f"{mes:02d}/{ano}", db.calcular_total_mes(mes, ano)
+
+def link_whatsapp(telefone):
+    """URL do WhatsApp Web para o telefone; acrescenta +55 quando falta o país."""
+    # Se for só DDD + Número, assume Brasil
+    if len(telefone) <= 11:
+        telefone = "55" + telefone
+    return f"https://web.whatsapp.com/send?phone={telefone}&text=Olá, gostaria de falar sobre o serviço do seu veículo."
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+# O ReportLab só é importado na primeira nota (ver criar_pdf), para não
+# pesar na abertura do programa nem em quem só usa o banco.
+
+# --- LAYOUT DA NOTA ---
+W, H = 595.2755905511812, 841.8897637795277  # reportlab.lib.pagesizes.A4
+M = 50
+COL_QTD = M
+COL_DESC = M + 40
+COL_VAL = W - 150
+H_ROW = 20
+Y_TOPO = 800
+Y_MIN = 100
+ALTURA_RODAPE = 135
+
+def _definir_modelo(c):
+    """Define uma vez por documento as partes fixas da nota como XObjects.
+
+    Bloco da oficina, cabeçalho da tabela, moldura de cada item e textos
+    do rodapé passam a ser uma referência ao formulário (doForm); só data,
+    cliente, itens e total são escritos à parte.
+    """
+    from reportlab.lib import colors
+    # Fica na posição final da página
+    c.beginForm("oficina", lowerx=0, lowery=720, upperx=W, uppery=H)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(W/2, 800, "Auto Elétrica Diniz")
+    c.setFont("Helvetica", 11)
+    c.drawCentredString(W/2, 780, "Av Almirante Tamandaré, 700 - Piratininga")
+    c.drawCentredString(W/2, 765, "Telefone: (21) 97612-4007")
+    c.setLineWidth(1)
+    c.line(M, 725, W-M, 725)
+    c.endForm()
+
+    # Desenhados em torno de y=0 e posicionados com translate
+    c.beginForm("cab", lowerx=0, lowery=-10, upperx=W, uppery=H_ROW)
+    c.setFillColor(colors.lightgrey)
+    c.rect(COL_QTD, -5, W-(M*2), H_ROW, fill=1, stroke=1)
+    c.setFillColor(colors.black)
+    c.line(COL_DESC, -5, COL_DESC, 15)
+    c.line(COL_VAL, -5, COL_VAL, 15)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(COL_QTD+5, 0, "Qtd.")
+    c.drawString(COL_DESC+5, 0, "Descrição")
+    c.drawString(COL_VAL+5, 0, "Valor Total")
+    c.endForm()
+
+    c.beginForm("item", lowerx=0, lowery=-10, upperx=W, uppery=H_ROW)
+    c.rect(COL_QTD, -5, W-(M*2), H_ROW, fill=0, stroke=1)
+    c.line(COL_DESC, -5, COL_DESC, 15)
+    c.line(COL_VAL, -5, COL_VAL, 15)
+    c.endForm()
+
+    # Abaixo da linha do total, desenhado em torno de y=0
+    c.beginForm("rodape", lowerx=0, lowery=-ALTURA_RODAPE, upperx=W, uppery=0)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(M, -30, "Forma de Pagamento: [Dinheiro / PIX / Cartão / Transferência]")
+    c.setFont("Helvetica-Oblique", 11)
+    c.drawString(M, -80, "Observações:")
+    c.setFont("Helvetica-Oblique", 10)
+    c.drawString(M, -100, "- Garantia de 90 dias conforme o Código de Defesa do Consumidor.")
+    c.drawString(M, -115, "- Qualquer problema, favor entrar em contato imediatamente.")
+    c.endForm()
+
+def _cabecalho(c, data):
+    c.doForm("oficina")
+    c.setFont("Helvetica", 11)
+    c.drawCentredString(W/2, 745, f"Data: {data}")
+
+def _rodape(c, y, total):
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(M, y, f"Valor Total: R$ {total:,.2f}".replace('.', ','))
+    _usar(c, "rodape", y)
+
+def _usar(c, nome, y):
+    c.saveState()
+    c.translate(0, y)
+    c.doForm(nome)
+    c.restoreState()
+
+def criar_pdf(arquivo, cliente, itens, total, data=None):
+    """Gera a nota em PDF e devolve o número de páginas.
+
+    `data` ('dd/mm/YYYY') permite reemitir notas antigas com a data original.
+    """
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(arquivo, pagesize=(W, H), pageCompression=1)
+    _definir_modelo(c)
+
+    _cabecalho(c, data or datetime.now().strftime('%d/%m/%Y'))
+
+    y = 685
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(M, y, f"Cliente: {cliente['nome']}")
+
+    y -= 30
+    _usar(c, "cab", y)
+    y -= H_ROW
+    c.setFont("Helvetica", 11)
+
+    for q, d, v in itens:
+        _usar(c, "item", y)
+        c.drawString(COL_QTD+5, y, str(q))
+        c.drawString(COL_DESC+5, y, d)
+        c.drawString(COL_VAL+5, y, f"R$ {v:,.2f}".replace('.', ','))
+        y -= H_ROW
+
+        if y < Y_MIN:
+            # Nova página repete o cabeçalho da tabela
+            c.showPage()
+            y = Y_TOPO
+            _usar(c, "cab", y)
+            y -= H_ROW
+            c.setFont("Helvetica", 11)
+
+    y -= 20
+    if y - ALTURA_RODAPE < M:
+        c.showPage()
+        y = Y_TOPO
+    _rodape(c, y, total)
+
+    paginas = c.getPageNumber()
+    c.save()
+    return paginas
+
+def renderizar_tarefa(tarefa):
+    """Ponto de entrada dos processos de exportação em lote: (arquivo, cliente, itens, total, data)."""
+    arquivo, cliente, itens, total, data = tarefa
+    return arquivo, criar_pdf(arquivo, cliente, itens, total, data)
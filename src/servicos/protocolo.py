@@ -0,0 +1,21 @@
+"""O que os terminais podem pedir ao servidor (servicos.servidor e servicos.remoto).
+
+Fica à parte para o terminal conhecer as listas sem importar o servidor,
+que traz o asyncio junto.
+"""
+PORTA = 8765
+
+LEITURAS = {
+    "versao_esquema", "nomes_produtos", "obter_produto", "listar_produtos", "preco_produto", "sugerir_produtos",
+    "chaves_clientes", "obter_cliente", "obter_cliente_por_placa", "listar_clientes", "listar_clientes_pagina",
+    "buscar_clientes", "listar_historico", "listar_historico_pagina", "listar_historico_veiculo_pagina",
+    "listar_historico_periodo_pagina", "listar_itens_servicos", "totais_por_item", "contar_historico_periodo",
+    "calcular_total_periodo", "resumo_dia", "resumo_mes", "calcular_total_dia", "calcular_total_mes",
+    "obter_fechamento", "listar_fechamentos", "listar_fechamentos_pagina", "anos_arquivados", "anos_para_arquivar",
+    "instalacao", "ultima_alteracao", "alteracoes_desde", "marca_recebida", "marcas_sincronizacao",
+}
+ESCRITAS = {
+    "salvar_produto", "inserir_produtos_em_lote", "salvar_cliente", "inserir_clientes_em_lote",
+    "concluir_importacao", "atualizar_status", "deletar_cliente", "salvar_historico",
+    "registrar_fechamento", "reconstruir_agregados", "aplicar_alteracoes",
+}
@@ -0,0 +1,182 @@
+"""Modo terminal: as funções de models.db passam a chamar o servidor (servicos.servidor).
+
+    from servicos import remoto
+    remoto.conectar_servidor("192.168.0.10:8765", token="segredo")
+
+Depois disso db.listar_clientes(), db.salvar_historico(...) etc. viram
+pedidos HTTP, e o arquivo local do banco nunca é aberto. Os avisos de
+alteração (db.inscrever) continuam chegando: os da própria escrita junto
+com a resposta, os dos outros terminais por uma thread que acompanha
+/eventos. Funções puras (data_iso, chave_placa...) continuam locais;
+iterar_historico_periodo também, porque só chama funções já remotas.
+"""
+import builtins
+import functools
+import http.client
+import json
+import sqlite3
+import threading
+from collections import deque
+from datetime import date
+from urllib.parse import urlsplit
+
+import models.db as db
+from servicos import diagnostico
+from servicos.protocolo import ESCRITAS, LEITURAS, PORTA
+
+# Só existem no computador do servidor (precisam do arquivo)
+_SO_NO_SERVIDOR = ("conectar", "transacao", "leitura_isolada", "lote_escrita", "criar_tabelas",
+                   "renovar_instalacao", "arquivar_ano", "compactar_banco")
+_TABELAS = ("clientes", "produtos", "historico_servicos", "fechamentos")
+TEMPO_LIMITE = 60
+MAX_VISTOS = 1000
+
+class ErroServidor(RuntimeError):
+    pass
+
+def _json(valor):
+    if isinstance(valor, date): return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} não vai em JSON")
+
+def _erro(dados):
+    """Recria a exceção do servidor (sqlite3.IntegrityError, ValueError...) quando possível."""
+    tipo, mensagem = dados.get("tipo", ""), dados.get("mensagem", "")
+    classe = getattr(sqlite3, tipo, None) or getattr(builtins, tipo, None)
+    if isinstance(classe, type) and issubclass(classe, Exception):
+        return classe(mensagem)
+    return ErroServidor(f"{tipo}: {mensagem}")
+
+class Cliente:
+    def __init__(self, endereco, token=None, repassar_avisos=True):
+        if "//" not in endereco: endereco = "http://" + endereco
+        url = urlsplit(endereco)
+        self.host, self.porta = url.hostname, url.port or PORTA
+        self.endereco = f"{self.host}:{self.porta}"
+        self.token = token
+        # False quando o servidor é outra base (sincronização): os avisos de lá não são daqui
+        self.repassar_avisos = repassar_avisos
+        self._local = threading.local()    # uma conexão HTTP persistente por thread
+        self._vistos = deque(maxlen=MAX_VISTOS)
+        self._vistos_lock = threading.Lock()
+        self.seq = 0
+        self._parar = threading.Event()
+
+    # --- HTTP ---
+    def _pedir(self, metodo, caminho, corpo=None, tempo=TEMPO_LIMITE, repetir=True):
+        conexao = getattr(self._local, "conexao", None)
+        nova = conexao is None
+        if nova:
+            conexao = self._local.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=tempo)
+        conexao.timeout = tempo
+        cabecalhos = {"Content-Type": "application/json"}
+        if self.token: cabecalhos["X-Oficina-Token"] = self.token
+        try:
+            conexao.request(metodo, caminho, body=corpo, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            status, dados = resposta.status, resposta.read()
+        except (http.client.HTTPException, OSError):
+            conexao.close()
+            self._local.conexao = None
+            # Conexão reaproveitada que o servidor já fechou: tenta de novo uma vez
+            if repetir and not nova:
+                return self._pedir(metodo, caminho, corpo, tempo, repetir=False)
+            raise
+        resposta = json.loads(dados)
+        if "erro" in resposta:
+            if status in (200, 500): raise _erro(resposta["erro"])
+            raise ErroServidor(f"{status}: {resposta['erro'].get('mensagem')}")
+        return resposta
+
+    def chamar(self, nome, *args, **kwargs):
+        corpo = json.dumps({"funcao": nome, "args": args, "kwargs": kwargs}, default=_json).encode()
+        # Escrita não é repetida sozinha: o servidor pode ter gravado antes de cair
+        resposta = self._pedir("POST", "/chamar", corpo, repetir=nome not in ESCRITAS)
+        self._emitir(resposta["eventos"])
+        resultado = resposta["resultado"]
+        if resposta["tupla"]:
+            return tuple(resultado)
+        if isinstance(resultado, list):
+            return [tuple(r) if isinstance(r, list) else r for r in resultado]
+        return resultado
+
+    # --- AVISOS ---
+    def _emitir(self, eventos):
+        if not self.repassar_avisos: return
+        for seq, tabela, acao, id_registro in eventos:
+            # O mesmo aviso chega pela resposta e por /eventos: repassa uma vez só
+            with self._vistos_lock:
+                if seq in self._vistos: continue
+                self._vistos.append(seq)
+            db._notificar(tabela, acao, id_registro)
+
+    def _acompanhar(self):
+        while not self._parar.is_set():
+            try:
+                resposta = self._pedir("GET", f"/eventos?desde={self.seq}", tempo=TEMPO_LIMITE)
+            except Exception:
+                self._parar.wait(2)
+                continue
+            if resposta.get("reiniciar"):
+                # Servidor reiniciado ou avisos perdidos: as telas releem tudo
+                with self._vistos_lock:
+                    self._vistos.clear()
+                for tabela in _TABELAS:
+                    db._notificar(tabela, db.RECARREGADO, 0)
+            self._emitir(resposta["eventos"])
+            self.seq = resposta["seq"]
+
+    def iniciar(self):
+        self.seq = self._pedir("GET", "/saude")["seq"]
+        threading.Thread(target=self._acompanhar, name="eventos", daemon=True).start()
+
+_cliente = None
+_originais = {}
+
+def _proxy(nome, funcao):
+    @functools.wraps(funcao)
+    def remota(*args, **kwargs):
+        return _cliente.chamar(nome, *args, **kwargs)
+    return remota
+
+def _indisponivel(nome, funcao):
+    @functools.wraps(funcao)
+    def indisponivel(*args, **kwargs):
+        raise ErroServidor(f"{nome}() só roda no computador do servidor ({_cliente.endereco})")
+    return indisponivel
+
+def conectar_servidor(endereco, token=None):
+    """Troca as funções de models.db por chamadas ao servidor; confere a conexão antes."""
+    global _cliente
+    if _cliente is not None: desconectar()
+    cliente = Cliente(endereco, token)
+    cliente.iniciar()
+    _cliente = cliente
+    # A medição envolve as funções do banco: volta por cima das remotas
+    medindo = diagnostico.ativo()
+    diagnostico.desativar()
+    for nome in LEITURAS | ESCRITAS:
+        _originais[nome] = getattr(db, nome)
+        setattr(db, nome, _proxy(nome, _originais[nome]))
+    for nome in _SO_NO_SERVIDOR:
+        _originais[nome] = getattr(db, nome)
+        setattr(db, nome, _indisponivel(nome, _originais[nome]))
+    _originais["caminho_banco"] = db.caminho_banco
+    db.caminho_banco = lambda: f"http://{cliente.endereco}"
+    if medindo: diagnostico.ativar()
+    return cliente
+
+def desconectar():
+    """Volta ao banco local."""
+    global _cliente
+    if _cliente is None: return
+    _cliente._parar.set()
+    medindo = diagnostico.ativo()
+    diagnostico.desativar()
+    for nome, funcao in _originais.items():
+        setattr(db, nome, funcao)
+    _originais.clear()
+    _cliente = None
+    if medindo: diagnostico.ativar()
+
+def conectado():
+    return _cliente is not None
@@ -0,0 +1,265 @@
+"""Servidor local da oficina: um só processo abre o banco e os terminais falam com ele.
+
+Uso (a partir de src/), no computador que guarda o banco:
+    python -m servicos.servidor                          (só esta máquina, porta 8765)
+    python -m servicos.servidor --host 0.0.0.0 --token segredo
+
+E em cada terminal (veja servicos.remoto), inclusive na mesma máquina:
+    OFICINA_TOKEN=segredo python main.py --servidor 192.168.0.10:8765
+
+HTTP/1.1 com JSON, só com a biblioteca padrão (asyncio):
+    POST /chamar   {"funcao": "listar_clientes_pagina", "args": [0], "kwargs": {"limite": 200}}
+                   -> {"resultado": ..., "tupla": false, "eventos": [[seq, tabela, acao, id], ...]}
+    GET  /eventos?desde=N   espera até ESPERA_EVENTOS s por avisos com seq > N
+    GET  /saude             -> {"versao_esquema": ..., "seq": ...}
+
+Todas as funções de models.db usam a mesma conexão (e a mesma trava), então
+um pool de leitores só poria threads esperando umas pelas outras: as
+leituras rodam numa única thread, fora do laço de eventos, e se revezam com
+a de escrita. O ganho está nas escritas, que entram numa fila única: o
+escritor pega tudo o que estiver esperando (até LOTE_MAX) e grava numa só
+transação (db.lote_escrita), um commit para o lote inteiro; as
+administrativas (FORA_DO_LOTE) passam pela mesma fila, mas sozinhas. Os
+avisos de alteração (db.inscrever) ganham um número de sequência e só saem
+depois do commit.
+"""
+import argparse
+import asyncio
+import functools
+import hmac
+import ipaddress
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+import models.db as db
+from servicos.protocolo import ESCRITAS, LEITURAS, PORTA
+
+LOTE_MAX = 200
+ESPERA_EVENTOS = 25       # segundos de long polling em /eventos
+MAX_EVENTOS = 10000       # avisos guardados para terminais que ficaram para trás
+LIMITE_CORPO = 64 * 1024 * 1024
+# Abrem as próprias transações e podem anexar os anos arquivados (ATTACH não
+# roda dentro de transação): vão sozinhas, fora do lote, na thread de escrita
+FORA_DO_LOTE = {"reconstruir_agregados", "aplicar_alteracoes", "deletar_cliente"}
+
+_MOTIVOS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+class _Requisicao(Exception):
+    """Erro do pedido em si (não da função chamada): vira o status HTTP."""
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+def _json(valor):
+    if isinstance(valor, date): return valor.isoformat()
+    raise TypeError(f"{type(valor).__name__} não vai em JSON")
+
+class Servidor:
+    def __init__(self, host="127.0.0.1", porta=PORTA, token=None, lote_max=LOTE_MAX):
+        self.host, self.porta, self.token, self.lote_max = host, porta, token, lote_max
+        self.seq = 0
+        self.eventos = deque(maxlen=MAX_EVENTOS)
+        self.lotes = self.escritas = 0
+        self._leitura = ThreadPoolExecutor(1, thread_name_prefix="leitura")
+        self._escrita = ThreadPoolExecutor(1, thread_name_prefix="escrita")
+        self._capturados = None
+        self._servidor = None
+
+    # --- AVISOS DE ALTERAÇÃO ---
+    def _ao_notificar(self, tabela, acao, id_registro):
+        # Só a thread de escrita gera avisos; ficam guardados até o commit
+        if self._capturados is not None:
+            self._capturados.append((tabela, acao, id_registro))
+
+    def _publicar(self, avisos):
+        numerados = []
+        for tabela, acao, id_registro in avisos:
+            self.seq += 1
+            numerados.append([self.seq, tabela, acao, id_registro])
+        self.eventos.extend(numerados)
+        if numerados:
+            self._novos.set()
+            self._novos = asyncio.Event()
+        return numerados
+
+    # --- ESCRITAS EM LOTE ---
+    def _gravar(self, pedidos):
+        """Roda na thread de escrita: aplica o lote numa transação e devolve (ok, valor, avisos)."""
+        resultados = []
+        try:
+            with nullcontext() if pedidos[0][1] in FORA_DO_LOTE else db.lote_escrita():
+                for _, _, chamada in pedidos:
+                    self._capturados = avisos = []
+                    try:
+                        resultados.append((True, chamada(), avisos))
+                    except Exception as e:
+                        resultados.append((False, e, []))
+        except Exception as e:
+            # O commit falhou: nada do lote foi gravado
+            return [(False, e, []) for _ in pedidos]
+        finally:
+            self._capturados = None
+        return resultados
+
+    async def _escritor(self):
+        loop = asyncio.get_running_loop()
+        adiado = None
+        while True:
+            pedidos = [adiado or await self._fila.get()]
+            adiado = None
+            while pedidos[0][1] not in FORA_DO_LOTE and len(pedidos) < self.lote_max and not self._fila.empty():
+                pedido = self._fila.get_nowait()
+                if pedido[1] in FORA_DO_LOTE:
+                    adiado = pedido   # vai sozinha, logo depois deste lote
+                    break
+                pedidos.append(pedido)
+            resultados = await loop.run_in_executor(self._escrita, self._gravar, pedidos)
+            self.lotes += 1
+            self.escritas += len(pedidos)
+            for (futuro, _, _), (ok, valor, avisos) in zip(pedidos, resultados):
+                if futuro.done(): continue
+                if ok: futuro.set_result((valor, self._publicar(avisos)))
+                else: futuro.set_exception(valor)
+
+    # --- ROTAS ---
+    async def _chamar(self, corpo):
+        try:
+            pedido = json.loads(corpo or b"{}")
+            nome, args, kwargs = pedido["funcao"], list(pedido.get("args", [])), dict(pedido.get("kwargs", {}))
+        except (ValueError, KeyError, TypeError):
+            raise _Requisicao(400, "esperado {\"funcao\": ..., \"args\": [...], \"kwargs\": {...}}")
+        if nome not in LEITURAS and nome not in ESCRITAS:
+            raise _Requisicao(404, f"função desconhecida: {nome}")
+        funcao = getattr(db, nome)
+        try:
+            if nome in ESCRITAS:
+                futuro = asyncio.get_running_loop().create_future()
+                await self._fila.put((futuro, nome, functools.partial(funcao, *args, **kwargs)))
+                resultado, eventos = await futuro
+            else:
+                resultado = await asyncio.get_running_loop().run_in_executor(
+                    self._leitura, functools.partial(funcao, *args, **kwargs))
+                eventos = []
+        except Exception as e:
+            return 500, {"erro": {"tipo": type(e).__name__, "mensagem": str(e)}}
+        return 200, {"resultado": resultado, "tupla": isinstance(resultado, tuple), "eventos": eventos}
+
+    async def _aguardar_eventos(self, desde):
+        if desde > self.seq or (self.eventos and desde < self.eventos[0][0] - 1):
+            # Servidor reiniciado ou terminal muito atrasado: melhor reler tudo
+            return {"seq": self.seq, "eventos": [], "reiniciar": True}
+        if desde == self.seq:
+            try:
+                await asyncio.wait_for(self._novos.wait(), ESPERA_EVENTOS)
+            except asyncio.TimeoutError:
+                pass
+        return {"seq": self.seq, "eventos": [e for e in self.eventos if e[0] > desde]}
+
+    async def _rotear(self, metodo, alvo, cabecalhos, corpo):
+        if self.token and not hmac.compare_digest(cabecalhos.get("x-oficina-token", "").encode(), self.token.encode()):
+            raise _Requisicao(401, "token inválido")
+        url = urlsplit(alvo)
+        if metodo == "POST" and url.path == "/chamar":
+            return await self._chamar(corpo)
+        if metodo == "GET" and url.path == "/eventos":
+            try: desde = int(parse_qs(url.query).get("desde", ["0"])[0])
+            except ValueError: raise _Requisicao(400, "desde precisa ser um número")
+            return 200, await self._aguardar_eventos(desde)
+        if metodo == "GET" and url.path == "/saude":
+            versao = await asyncio.get_running_loop().run_in_executor(self._leitura, db.versao_esquema)
+            return 200, {"versao_esquema": versao, "seq": self.seq, "lotes": self.lotes, "escritas": self.escritas}
+        raise _Requisicao(404, f"rota desconhecida: {metodo} {url.path}")
+
+    # --- HTTP ---
+    async def _atender(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha.strip(): break
+                metodo, alvo, _ = linha.decode("latin-1").split(" ", 2)
+                cabecalhos = {}
+                while (linha := await leitor.readline()) not in (b"\r\n", b"\n", b""):
+                    nome, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get("content-length") or 0)
+                try:
+                    if tamanho > LIMITE_CORPO:
+                        raise _Requisicao(413, "pedido grande demais")
+                    corpo = await leitor.readexactly(tamanho)
+                    status, resposta = await self._rotear(metodo.upper(), alvo, cabecalhos, corpo)
+                except _Requisicao as e:
+                    status, resposta = e.status, {"erro": {"tipo": "Requisicao", "mensagem": str(e)}}
+                dados = json.dumps(resposta, ensure_ascii=False, default=_json).encode()
+                escritor.write(f"HTTP/1.1 {status} {_MOTIVOS[status]}\r\n"
+                               "Content-Type: application/json; charset=utf-8\r\n"
+                               f"Content-Length: {len(dados)}\r\n\r\n".encode() + dados)
+                await escritor.drain()
+                if status == 413 or cabecalhos.get("connection", "").lower() == "close": break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # servidor encerrando com o terminal ainda conectado
+        finally:
+            escritor.close()
+
+    async def iniciar(self):
+        """Abre o banco e passa a aceitar conexões; devolve a porta (útil com porta=0)."""
+        await asyncio.get_running_loop().run_in_executor(self._escrita, db.conectar)
+        db.inscrever(self._ao_notificar)
+        self._fila = asyncio.Queue()
+        self._novos = asyncio.Event()
+        self._tarefa_escritor = asyncio.create_task(self._escritor())
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        return self.porta
+
+    async def parar(self):
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        self._tarefa_escritor.cancel()
+        db.cancelar_inscricao(self._ao_notificar)
+        self._leitura.shutdown()
+        self._escrita.shutdown()
+
+    async def servir(self):
+        await self.iniciar()
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+def _so_esta_maquina(host):
+    if host == "localhost": return True
+    try: return ipaddress.ip_address(host).is_loopback
+    except ValueError: return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve o banco da oficina para os outros terminais.")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 para aceitar a rede local (exige --token)")
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--banco", help="arquivo do banco (padrão: data/banco.db)")
+    parser.add_argument("--token", help="senha exigida dos terminais (cabeçalho X-Oficina-Token)")
+    args = parser.parse_args(argv)
+    if not args.token and not _so_esta_maquina(args.host):
+        # Sem token, qualquer um na rede leria e apagaria os dados da oficina
+        parser.error(f"--token é obrigatório para aceitar conexões de outras máquinas (--host {args.host})")
+
+    if args.banco:
+        db.configurar(args.banco)
+    servidor = Servidor(args.host, args.porta, args.token)
+    print(f"Servindo {db.caminho_banco()} em http://{args.host}:{args.porta} (Ctrl+C para sair)")
+    inicio = time.perf_counter()
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.fechar_conexao()
+    print(f"{servidor.escritas} escritas em {servidor.lotes} lotes, {time.perf_counter() - inicio:.0f}s no ar")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Sincronização incremental entre filiais pelo registro de alterações.
+
+Uso (a partir de src/):
+    python -m servicos.sincronizacao com 192.168.1.20:8765        (a outra filial roda servicos.servidor)
+    python -m servicos.sincronizacao exportar lote.jsonl.gz --desde 1520
+    python -m servicos.sincronizacao importar lote.jsonl.gz
+    python -m servicos.sincronizacao estado
+
+Cada base guarda, por filial, o último seq dela já aplicado (a marca). A
+sincronização pede só o que veio depois da marca, nos dois sentidos, em
+lotes; o tráfego é o tamanho das mudanças, não o do banco. Aplicar o mesmo
+lote duas vezes não duplica nada.
+
+Sem rede entre as filiais, exportar/importar faz o mesmo por arquivo: quem
+recebe mostra a marca da outra em "estado" e quem envia exporta a partir dela.
+
+O registro começa quando a migração 9 roda; o que já existia antes não é
+enviado. Uma base copiada de outra filial precisa de "nova-identidade".
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+
+import models.db as db
+
+LOTE = 1000
+
+class ErroSincronizacao(RuntimeError):
+    pass
+
+def _receber(buscar, par, lote, progresso):
+    """Puxa de `buscar(desde, limite)` tudo depois da marca de `par` e aplica aqui."""
+    desde, total = db.marca_recebida(par), 0
+    while True:
+        ate, entradas, acabou = buscar(desde, lote)
+        total += db.aplicar_alteracoes(par, entradas, ate)
+        desde = ate
+        if progresso: progresso("recebidas", total)
+        if acabou: return total
+
+def sincronizar(endereco, token=None, lote=LOTE, progresso=None):
+    """Troca as alterações com a filial que serve em `endereco` (servicos.servidor).
+
+    `progresso`, se informado, recebe ("recebidas" | "enviadas", quantidade).
+    Devolve {"par": id da outra filial, "recebidas": n, "enviadas": n, "segundos": ...}.
+    """
+    from servicos.remoto import Cliente
+    inicio = time.perf_counter()
+    outra = Cliente(endereco, token, repassar_avisos=False)
+    eu, par = db.instalacao(), outra.chamar("instalacao")
+    if par == eu:
+        raise ErroSincronizacao("as duas bases têm a mesma identificação (uma é cópia da outra): "
+                                "rode 'nova-identidade' numa delas")
+    recebidas = _receber(lambda desde, limite: outra.chamar("alteracoes_desde", desde, limite, eu),
+                         par, lote, progresso)
+    # Agora o sentido contrário, a partir da marca que a outra filial tem de nós
+    desde, enviadas = outra.chamar("marca_recebida", eu), 0
+    while True:
+        ate, entradas, acabou = db.alteracoes_desde(desde, lote, par)
+        enviadas += outra.chamar("aplicar_alteracoes", eu, entradas, ate)
+        desde = ate
+        if progresso: progresso("enviadas", enviadas)
+        if acabou: break
+    return {"par": par, "recebidas": recebidas, "enviadas": enviadas, "segundos": time.perf_counter() - inicio}
+
+def exportar(caminho, desde=0, par=None, lote=LOTE):
+    """Grava em `caminho` (.jsonl.gz) as alterações com seq > `desde`; devolve quantas.
+
+    A primeira linha identifica a origem, a última traz a marca final; no
+    meio, uma alteração por linha, gravadas à medida que saem do banco. Com
+    `par`, as alterações que vieram dele ficam de fora.
+    """
+    total, ate, acabou = 0, desde, False
+    temporario = caminho + ".tmp"
+    with gzip.open(temporario, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"origem": db.instalacao(), "desde": desde}) + "\n")
+        while not acabou:
+            ate, entradas, acabou = db.alteracoes_desde(ate, lote, par)
+            f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entradas)
+            total += len(entradas)
+        f.write(json.dumps({"ate": ate}) + "\n")
+    os.replace(temporario, caminho)
+    return total
+
+def importar(caminho, lote=LOTE):
+    """Aplica um arquivo de exportar(); devolve {"par", "recebidas", "marca"}."""
+    with gzip.open(caminho, "rt", encoding="utf-8") as f:
+        cabecalho = json.loads(f.readline())
+        par = cabecalho["origem"]
+        if par == db.instalacao():
+            raise ErroSincronizacao("o arquivo foi exportado por esta mesma base")
+        marca = db.marca_recebida(par)
+        if cabecalho["desde"] > marca:
+            raise ErroSincronizacao(f"faltam alterações: o arquivo começa em {cabecalho['desde']}, "
+                                    f"mas esta base só tem até {marca}; exporte com --desde {marca}")
+        recebidas, pendentes = 0, []
+        for linha in f:
+            registro = json.loads(linha)
+            if isinstance(registro, dict):
+                # Fim do arquivo: a marca avança mesmo se o final era de outra filial
+                recebidas += db.aplicar_alteracoes(par, pendentes, registro["ate"])
+                pendentes = []
+                break
+            pendentes.append(registro)
+            if len(pendentes) >= lote:
+                recebidas += db.aplicar_alteracoes(par, pendentes, pendentes[-1][0])
+                pendentes = []
+        if pendentes:
+            # Arquivo cortado: aplica o que chegou inteiro
+            recebidas += db.aplicar_alteracoes(par, pendentes, pendentes[-1][0])
+    return {"par": par, "recebidas": recebidas, "marca": db.marca_recebida(par)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sincroniza as alterações entre filiais.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("com", help="troca as alterações com uma filial que roda servicos.servidor")
+    p.add_argument("endereco", help="HOST:PORTA (token em OFICINA_TOKEN)")
+    p = sub.add_parser("exportar", help="grava as alterações num arquivo .jsonl.gz")
+    p.add_argument("arquivo")
+    p.add_argument("--desde", type=int, default=0, help="marca desta base na outra filial (veja 'estado' lá)")
+    p.add_argument("--para", help="identificação da outra filial; o que veio dela fica de fora")
+    p = sub.add_parser("importar", help="aplica um arquivo gerado por 'exportar'")
+    p.add_argument("arquivo")
+    sub.add_parser("estado", help="identificação, último seq e marcas das outras filiais")
+    sub.add_parser("nova-identidade", help="para uma base copiada de outra filial")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.comando == "com":
+            res = sincronizar(args.endereco, os.environ.get("OFICINA_TOKEN"),
+                              progresso=lambda sentido, n: print(f"\r{sentido}: {n}", end="", flush=True))
+            print(f"\n{res['recebidas']} recebidas e {res['enviadas']} enviadas ({res['par']}) "
+                  f"em {res['segundos']:.1f}s")
+        elif args.comando == "exportar":
+            print(f"{exportar(args.arquivo, args.desde, args.para)} alterações em {args.arquivo}")
+        elif args.comando == "importar":
+            res = importar(args.arquivo)
+            print(f"{res['recebidas']} alterações aplicadas de {res['par']} (marca {res['marca']})")
+        elif args.comando == "estado":
+            print(f"instalação {db.instalacao()}, última alteração {db.ultima_alteracao()}")
+            for par, recebido in db.marcas_sincronizacao():
+                print(f"  {par}: recebido até {recebido}")
+        else:
+            print(f"nova identificação: {db.renovar_instalacao()}")
+    except ErroSincronizacao as e:
+        parser.exit(1, f"erro: {e}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Fixtures dos testes. Cada teste usa um banco novo numa pasta temporária.
+
+Uso (a partir de src/):  python -m pytest -q tests
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models.db as db  # noqa: E402
+
+@pytest.fixture
+def banco(tmp_path):
+    """Aponta models.db para tmp_path/banco.db, já migrado; devolve o caminho."""
+    caminho = str(tmp_path / "banco.db")
+    db.configurar(caminho)
+    db._catalogo.invalidar()   # o catálogo em cache é do processo, não do arquivo
+    db.conectar()
+    yield caminho
+    db.fechar_conexao()
+    db._catalogo.invalidar()
+
+# --- INTERFACE ---
+# Os testes de tela rodam sem janela (QT_QPA_PLATFORM=offscreen) e pulam se o PyQt5 não estiver instalado.
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication do processo; no fim, encerra a thread do TrabalhadorBanco."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    import main
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    yield app
+    if main._banco is not None:
+        main._banco.encerrar()
+        main._banco = None
+
+@pytest.fixture
+def esperar(qapp):
+    """esperar(condição): processa eventos até a condição valer (falha depois de `limite` segundos)."""
+    def esperar(condicao, limite=5.0):
+        fim = time.monotonic() + limite
+        while not condicao():
+            assert time.monotonic() < fim, "a interface não chegou ao estado esperado"
+            qapp.processEvents()
+            time.sleep(0.005)
+    return esperar
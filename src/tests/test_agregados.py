@@ -0,0 +1,85 @@
+import json
+import random
+
+import models.db as db
+
+def _agregados():
+    conn = db.conectar()
+    return (conn.execute("SELECT data, round(total, 2), notas FROM faturamento_dia WHERE notas <> 0 ORDER BY data").fetchall(),
+            conn.execute("SELECT mes, round(total, 2), notas FROM faturamento_mes WHERE notas <> 0 ORDER BY mes").fetchall())
+
+def _sql(comando, params=()):
+    with db.transacao() as c:
+        c.execute(comando, params)
+        return c.lastrowid
+
+def test_resumos_leem_so_os_agregados(banco):
+    db.salvar_historico(None, "2024-05-10", "[]", 120.0, "")
+    db.salvar_historico(None, "2024-05-10", "[]", 30.0, "")
+    db.salvar_historico(None, "2024-05-31", "[]", 50.0, "")
+    assert db.resumo_dia("10/05/2024") == (150.0, 2)
+    assert db.calcular_total_dia("2024-05-31") == 50.0
+    assert db.resumo_mes(5, 2024) == (200.0, 3)
+    assert db.calcular_total_mes(6, 2024) == 0.0
+    assert db.calcular_total_periodo("2024-05-10", "2024-05-30") == 150.0
+
+def test_nota_sem_data_fica_fora_e_pode_ganhar_ou_perder_a_data(banco):
+    id_nota = _sql("INSERT INTO historico_servicos (data_servico, valor_total) VALUES (NULL, 80)")
+    assert _agregados() == ([], [])
+    _sql("UPDATE historico_servicos SET valor_total = 90 WHERE id = ?", (id_nota,))
+    _sql("UPDATE historico_servicos SET data_servico = '2024-03-05' WHERE id = ?", (id_nota,))
+    assert db.resumo_dia("2024-03-05") == (90.0, 1)
+    _sql("UPDATE historico_servicos SET data_servico = NULL WHERE id = ?", (id_nota,))
+    assert _agregados() == ([], [])
+    _sql("DELETE FROM historico_servicos WHERE id = ?", (id_nota,))
+    assert _agregados() == ([], [])
+
+def test_data_fora_do_iso_nao_vira_mes_inventado(banco):
+    id_nota = _sql("INSERT INTO historico_servicos (data_servico, valor_total) VALUES ('5/3/2023', 70)")
+    db.salvar_historico(None, "2023-03-05", "[]", 30.0, "")
+    assert _agregados() == ([("2023-03-05", 30.0, 1)], [("2023-03", 30.0, 1)])
+    assert db.datas_invalidas() == [(id_nota, None, "5/3/2023")]
+    _sql("UPDATE historico_servicos SET data_servico = '2023-03-05' WHERE id = ?", (id_nota,))
+    assert _agregados() == ([("2023-03-05", 100.0, 2)], [("2023-03", 100.0, 2)])
+    assert db.datas_invalidas() == []
+
+def test_gatilhos_e_recalculo_chegam_ao_mesmo_resultado(banco):
+    sorteio = random.Random(10)
+    datas = ["2024-01-31", "2024-02-01", "2024-02-29", "2024-03-15", None, "15/03/2024", "ontem"]
+    ids = []
+    for _ in range(300):
+        acao = sorteio.random()
+        if acao < 0.5 or not ids:
+            ids.append(_sql("INSERT INTO historico_servicos (data_servico, valor_total) VALUES (?, ?)",
+                            (sorteio.choice(datas), sorteio.choice([None, 10.5, 99.9, 250.0]))))
+        elif acao < 0.8:
+            _sql("UPDATE historico_servicos SET data_servico = ?, valor_total = ? WHERE id = ?",
+                 (sorteio.choice(datas), sorteio.uniform(1, 500), sorteio.choice(ids)))
+        else:
+            _sql("DELETE FROM historico_servicos WHERE id = ?", (ids.pop(sorteio.randrange(len(ids))),))
+    pelos_gatilhos = _agregados()
+    db.reconstruir_agregados()
+    assert _agregados() == pelos_gatilhos
+
+def test_agregados_de_uma_base_antiga_com_datas_ruins(tmp_path):
+    import sqlite3
+    caminho = str(tmp_path / "antigo.db")
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE historico_servicos (id INTEGER PRIMARY KEY AUTOINCREMENT, id_cliente INTEGER, "
+                 "data_servico TEXT, itens_json TEXT, valor_total REAL, arquivo_path TEXT)")
+    conn.executemany("INSERT INTO historico_servicos (data_servico, itens_json, valor_total) VALUES (?, ?, ?)",
+                     [("5/3/2023", json.dumps([]), 10.0), ("05/03/2023", "[]", 20.0),
+                      (None, "[]", 40.0), ("sem data", "[]", 80.0)])
+    conn.commit()
+    conn.close()
+    db.configurar(caminho)
+    try:
+        assert _agregados() == ([("2023-03-05", 30.0, 2)], [("2023-03", 30.0, 2)])
+        # Apagar e corrigir as notas antigas não quebra os gatilhos
+        _sql("UPDATE historico_servicos SET valor_total = 50 WHERE data_servico IS NULL")
+        _sql("UPDATE historico_servicos SET data_servico = '2023-04-01' WHERE data_servico = 'sem data'")
+        _sql("DELETE FROM historico_servicos WHERE data_servico IS NULL")
+        assert _agregados() == ([("2023-03-05", 30.0, 2), ("2023-04-01", 80.0, 1)],
+                                [("2023-03", 30.0, 2), ("2023-04", 80.0, 1)])
+    finally:
+        db.fechar_conexao()
@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import zipfile
+from datetime import date
+
+import pytest
+
+import models.db as db
+from servicos import backup
+
+ATUAL = date.today().year
+ANTIGO = ATUAL - 2
+
+def _nota(pasta, nome, data, itens=((1, "Revisão", 100.0),)):
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "wb") as f:
+        f.write(b"%PDF-1.4 " + nome.encode())
+    id_cliente = db.salvar_cliente(nome, "", "", "", "", "", "", "")
+    db.salvar_historico(id_cliente, data, json.dumps(list(itens)), sum(v for _, _, v in itens), caminho)
+    return id_cliente
+
+def test_backup_leva_pdfs_e_bancos_dos_anos_arquivados(banco, tmp_path):
+    _nota(str(tmp_path), "n1.pdf", f"{ANTIGO}-03-10")
+    _nota(str(tmp_path), "n2.pdf", date.today().isoformat())
+    db.arquivar_ano(ANTIGO)
+
+    res = backup.criar_backup(str(tmp_path / "backups"))
+
+    with zipfile.ZipFile(res["arquivo"]) as z:
+        nomes = z.namelist()
+        manifesto = json.loads(z.read(backup.MANIFESTO))
+    assert f"arquivo_{ANTIGO}.db" in nomes
+    assert sorted(os.path.basename(p) for p in manifesto["notas"].values()) == ["n1.pdf", "n2.pdf"]
+    assert res["notas"] == 2 and res["faltando"] == []
+
+def test_backup_aponta_pdf_de_ano_arquivado_que_sumiu(banco, tmp_path):
+    _nota(str(tmp_path), "n1.pdf", f"{ANTIGO}-03-10")
+    db.arquivar_ano(ANTIGO)
+    os.remove(tmp_path / "n1.pdf")
+
+    res = backup.criar_backup(str(tmp_path / "backups"))
+
+    assert res["faltando"] == [str(tmp_path / "n1.pdf")]
+
+# --- ARQUIVAR E CONSULTAR ---
+def _movimento(pasta):
+    """Notas em dois anos antigos e no atual, com fechamento e peças do catálogo.
+
+    Devolve o cliente da primeira nota de ANTIGO.
+    """
+    db.salvar_produto("Filtro de óleo", 30.0)
+    clientes = {}
+    for ano in (ANTIGO - 1, ANTIGO, ATUAL):
+        for mes in (2, 7):
+            id_cliente = _nota(pasta, f"n{ano}_{mes}.pdf", f"{ano}-{mes:02d}-10",
+                               ((2, "Filtro de óleo", 60.0), (1, f"Mão de obra {ano}", 100.0 + mes)))
+            clientes.setdefault(ano, id_cliente)
+    with db.transacao() as c:
+        c.execute("INSERT INTO fechamentos (tipo, periodo, valor, data_registro) VALUES ('Mensal', ?, 1, ?)",
+                  (f"07/{ANTIGO}", f"31/07/{ANTIGO} 18:00"))
+    return clientes[ANTIGO]
+
+def _consultas(id_cliente):
+    return {
+        "historico": db.listar_historico(id_cliente, arquivados=True),
+        "pagina": db.listar_historico_pagina(id_cliente),
+        "totais": db.totais_por_item(f"{ANTIGO - 1}-01-01", f"{ATUAL}-12-31"),
+        "contagem": db.contar_historico_periodo(f"{ANTIGO - 1}-01-01", f"{ATUAL}-12-31"),
+        "periodo": db.listar_historico_periodo_pagina(f"{ANTIGO}-01-01", f"{ANTIGO}-12-31"),
+        "iterar": list(db.iterar_historico_periodo(f"{ANTIGO - 1}-01-01", f"{ATUAL}-12-31")),
+        "mes": db.resumo_mes(7, ANTIGO),
+        "faturamento": db.calcular_total_periodo(f"{ANTIGO - 1}-01-01", f"{ATUAL}-12-31"),
+        "sugestoes": db.sugerir_produtos("filtro"),
+        "usos": db.conectar().execute("SELECT usos FROM produtos").fetchall(),
+        "fechamentos": db.listar_fechamentos_pagina(),
+    }
+
+def test_consultas_iguais_antes_e_depois_de_arquivar(banco, tmp_path):
+    id_cliente = _movimento(str(tmp_path))
+    antes = _consultas(id_cliente)
+
+    res = db.arquivar_ano(ANTIGO)
+    db.arquivar_ano(ANTIGO - 1)
+
+    assert (res["notas"], res["fechamentos"]) == (2, 1)
+    assert os.path.exists(res["arquivo"])
+    assert db.conectar().execute("SELECT COUNT(*) FROM main.historico_servicos").fetchone()[0] == 2
+    assert [linha[0] for linha in db.anos_arquivados()] == [ANTIGO - 1, ANTIGO]
+    assert db.anos_para_arquivar() == []
+    assert _consultas(id_cliente) == antes
+
+    # Reabrindo: o ano corrente não anexa nada; o período antigo anexa
+    db.configurar(banco)
+    db.resumo_dia(date.today())
+    db.contar_historico_periodo(f"{ATUAL}-01-01", f"{ATUAL}-12-31")
+    assert db._gerenciador.anexados == {}
+    assert _consultas(id_cliente) == antes
+    assert db._gerenciador.anexados == {ANTIGO - 1: f"arquivo_{ANTIGO - 1}.db", ANTIGO: f"arquivo_{ANTIGO}.db"}
+
+    db.reconstruir_agregados()
+    assert _consultas(id_cliente) == antes
+
+    with db.leitura_isolada() as conn:
+        linhas = [linha for lote in db.exportar_historico_itens(conn, f"{ANTIGO}-01-01", f"{ANTIGO}-12-31")
+                  for linha in lote]
+    assert len(linhas) == 4
+
+def test_arquivar_de_novo_nao_duplica(banco, tmp_path):
+    id_cliente = _movimento(str(tmp_path))
+    db.arquivar_ano(ANTIGO)
+    antes = _consultas(id_cliente)
+    assert db.arquivar_ano(ANTIGO)["notas"] == 2
+    assert _consultas(id_cliente) == antes
+
+def test_arquivar_interrompido_continua_consistente(banco, tmp_path, monkeypatch):
+    id_cliente = _movimento(str(tmp_path))
+    antes = _consultas(id_cliente)
+    original, vezes = db.transacao, []
+
+    def transacao():
+        vezes.append(1)
+        if len(vezes) == 2:
+            raise RuntimeError("queda de energia")
+        return original()
+    monkeypatch.setattr(db, "transacao", transacao)
+    with pytest.raises(RuntimeError):
+        db.arquivar_ano(ANTIGO)
+    monkeypatch.setattr(db, "transacao", original)
+
+    # Copiado mas não registrado: as consultas ainda leem só o banco principal
+    assert db.anos_arquivados() == []
+    assert _consultas(id_cliente) == antes
+    assert db.arquivar_ano(ANTIGO)["notas"] == 2
+    assert _consultas(id_cliente) == antes
+
+def test_anos_que_nao_podem_ser_arquivados(banco, monkeypatch):
+    with pytest.raises(ValueError, match="não terminou"):
+        db.arquivar_ano(ATUAL)
+    monkeypatch.setattr(db, "MAX_ARQUIVOS", 1)
+    db.arquivar_ano(ANTIGO)
+    with pytest.raises(ValueError, match="máximo"):
+        db.arquivar_ano(ANTIGO - 1)
+
+def test_arquivo_sumido_da_erro_claro(banco, tmp_path):
+    _movimento(str(tmp_path))
+    res = db.arquivar_ano(ANTIGO)
+    db.fechar_conexao()
+    os.remove(res["arquivo"])
+    db.configurar(banco)
+    assert db.contar_historico_periodo(f"{ATUAL}-01-01", f"{ATUAL}-12-31") == 2
+    with pytest.raises(sqlite3.OperationalError, match="não encontrado"):
+        db.contar_historico_periodo(f"{ANTIGO}-01-01", f"{ANTIGO}-12-31")
+
+def test_backup_restaurado_le_os_anos_arquivados(banco, tmp_path):
+    _movimento(str(tmp_path))
+    db.arquivar_ano(ANTIGO)
+    antes = db.contar_historico_periodo(f"{ANTIGO - 1}-01-01", f"{ATUAL}-12-31")
+    res = backup.criar_backup(str(tmp_path / "backups"))
+    destino = tmp_path / "restaurado" / "banco.db"
+    backup.restaurar_backup(res["arquivo"], str(destino), str(tmp_path / "pdfs"))
+    assert (tmp_path / "restaurado" / f"arquivo_{ANTIGO}.db").exists()
+    db.configurar(str(destino))
+    assert db.contar_historico_periodo(f"{ANTIGO - 1}-01-01", f"{ATUAL}-12-31") == antes
+
+def test_compactar_devolve_o_espaco(banco, tmp_path):
+    _movimento(str(tmp_path))
+    with db.transacao() as c:
+        c.executemany("INSERT INTO historico_servicos (data_servico, itens_json, valor_total) VALUES (?, ?, 0)",
+                      [(f"{ANTIGO}-01-01", "x" * 2000)] * 500)
+    db.arquivar_ano(ANTIGO)
+    db.conectar().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    tamanho = os.path.getsize(banco)
+    db.compactar_banco()
+    assert os.path.getsize(banco) < tamanho / 2
+
+# --- SINCRONIZAÇÃO COM ANOS ARQUIVADOS ---
+def test_alteracoes_de_linhas_arquivadas_nao_duplicam(banco):
+    itens = json.dumps([[1, "Revisão", 150.0]])
+    db.salvar_historico(None, f"{ANTIGO}-05-10", itens, 150.0, "")
+    with db.transacao() as c:
+        c.execute("INSERT INTO fechamentos (tipo, periodo, valor, data_registro) VALUES ('Diário', ?, 150, ?)",
+                  (f"10/05/{ANTIGO}", f"10/05/{ANTIGO} 18:00"))
+    conn = db.conectar()
+    uid_nota = conn.execute("SELECT uid FROM historico_servicos").fetchone()[0]
+    uid_fechamento = conn.execute("SELECT uid FROM fechamentos").fetchone()[0]
+    db.arquivar_ano(ANTIGO)
+    db.configurar(banco)   # reabre sem nada anexado
+
+    nota = {"cliente": None, "data_servico": f"{ANTIGO}-05-10", "itens_json": itens, "valor_total": 150.0,
+            "arquivo_path": ""}
+    fechamento = {"tipo": "Diário", "periodo": f"10/05/{ANTIGO}", "valor": 175.0,
+                  "data_registro": f"10/05/{ANTIGO} 18:30"}
+    assert db.aplicar_alteracoes("outra", [
+        [1, "outra", "historico_servicos", db.INSERIDO, uid_nota, json.dumps(nota)],
+        [2, "outra", "fechamentos", db.ATUALIZADO, uid_fechamento, json.dumps(fechamento)],
+    ], 2) == 2
+
+    conn = db.conectar()
+    assert conn.execute("SELECT COUNT(*) FROM main.historico_servicos").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM main.fechamentos").fetchone()[0] == 0
+    assert db.contar_historico_periodo(f"{ANTIGO}-01-01", f"{ANTIGO}-12-31") == 1
+    assert db.resumo_mes(5, ANTIGO) == (150.0, 1)
+    # O fechamento mudou no próprio arquivo do ano
+    assert conn.execute(f"SELECT valor, data_registro FROM arquivo_{ANTIGO}.fechamentos").fetchall() == \
+        [(175.0, f"10/05/{ANTIGO} 18:30")]
+
+def test_cliente_apagado_some_tambem_dos_anos_arquivados(banco, tmp_path):
+    id_cliente = _nota(str(tmp_path), "n1.pdf", f"{ANTIGO}-03-10")
+    db.salvar_historico(id_cliente, date.today().isoformat(), "[]", 10.0, "")
+    db.arquivar_ano(ANTIGO)
+    db.configurar(banco)
+    db.deletar_cliente(id_cliente)
+    conn = db.conectar()
+    assert conn.execute("SELECT id_cliente FROM main.historico_servicos").fetchall() == [(None,)]
+    assert conn.execute(f"SELECT id_cliente FROM arquivo_{ANTIGO}.historico_servicos").fetchall() == [(None,)]
+    with db.leitura_isolada() as leitura:
+        linhas = [l for lote in db.exportar_historico_itens(leitura, f"{ANTIGO}-01-01", f"{ANTIGO}-12-31") for l in lote]
+    assert [(l[2], l[3]) for l in linhas] == [(None, None)]
+
+# --- LISTAS SEM ANEXAR À TOA ---
+def test_pagina_recente_nao_anexa_os_anos_arquivados(banco):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    db.salvar_historico(id_cliente, f"{ANTIGO}-03-10", "[]", 5.0, "")
+    for dia in range(1, 4):
+        db.salvar_historico(id_cliente, f"{ATUAL}-01-{dia:02d}", "[]", 10.0, "")
+    db.arquivar_ano(ANTIGO)
+    db.configurar(banco)
+
+    primeira = db.listar_historico_pagina(id_cliente, limite=2)
+    assert [l[1] for l in primeira] == [f"03/01/{ATUAL}", f"02/01/{ATUAL}"]
+    assert len(db.listar_historico(id_cliente)) == 3
+    assert db._gerenciador.anexados == {}
+    # A página que desce até o ano arquivado anexa e traz a nota antiga
+    segunda = db.listar_historico_pagina(id_cliente, antes_id=primeira[-1][0], limite=2)
+    assert [l[1] for l in segunda] == [f"01/01/{ATUAL}", f"10/03/{ANTIGO}"]
+    assert ANTIGO in db._gerenciador.anexados
+    assert len(db.listar_historico(id_cliente, arquivados=True)) == 4
+
+def test_nota_antiga_sincronizada_depois_mantem_a_ordem(banco):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    for dia in range(1, 3):
+        db.salvar_historico(id_cliente, f"{ATUAL}-01-{dia:02d}", "[]", 10.0, "")
+    # Chegou atrasada: ano antigo, mas id maior que as notas atuais
+    db.salvar_historico(id_cliente, f"{ANTIGO}-03-10", "[]", 5.0, "")
+    db.arquivar_ano(ANTIGO)
+    db.configurar(banco)
+    assert [l[1] for l in db.listar_historico_pagina(id_cliente, limite=2)] == [f"10/03/{ANTIGO}", f"02/01/{ATUAL}"]
+
+def test_fechamentos_so_anexam_ao_chegar_no_ano_arquivado(banco):
+    with db.transacao() as c:
+        c.executemany("INSERT INTO fechamentos (tipo, periodo, valor, data_registro) VALUES ('Diário', ?, 1, ?)",
+                      [(f"10/05/{ANTIGO}", f"10/05/{ANTIGO} 18:00")] +
+                      [(f"{dia:02d}/01/{ATUAL}", f"{dia:02d}/01/{ATUAL} 18:00") for dia in range(1, 4)])
+    db.arquivar_ano(ANTIGO)
+    db.configurar(banco)
+    primeira = db.listar_fechamentos_pagina(limite=3)
+    assert [l[2] for l in primeira] == [f"{dia:02d}/01/{ATUAL}" for dia in (3, 2, 1)]
+    assert len(db.listar_fechamentos()) == 3 and db._gerenciador.anexados == {}
+    assert [l[2] for l in db.listar_fechamentos_pagina(antes_id=primeira[-1][0])] == [f"10/05/{ANTIGO}"]
+    assert len(db.listar_fechamentos(arquivados=True)) == 4
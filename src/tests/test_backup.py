@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+import models.db as db
+from servicos import backup
+
+@pytest.fixture
+def com_notas(banco, tmp_path):
+    """Dois clientes, três notas com PDF no disco e um fechamento."""
+    pasta = tmp_path / "notas"
+    pasta.mkdir()
+    for i, nome in enumerate(("Ana", "Bruno")):
+        id_cliente = db.salvar_cliente(nome, "", "", "", "", "", "", "")
+        for j in range(1 + i):
+            pdf = pasta / f"nota_{nome}_{j}.pdf"
+            pdf.write_bytes(b"%PDF-1.4 " + pdf.name.encode())
+            db.salvar_historico(id_cliente, "2025-02-10", json.dumps([[1, "Revisão", 100.0]]), 100.0, str(pdf))
+    db.registrar_fechamento("Diário", "10/02/2025", 300.0)
+    return pasta
+
+def test_criar_verificar_e_restaurar(com_notas, tmp_path):
+    res = backup.criar_backup(str(tmp_path / "backups"))
+    assert res["notas"] == 3 and res["faltando"] == []
+    assert res["verificacao"]["contagens"] == {"clientes": 2, "produtos": 0, "historico_servicos": 3,
+                                                "servico_itens": 3, "fechamentos": 1,
+                                                "versao_esquema": len(db.MIGRACOES)}
+    assert backup.verificar_backup(res["arquivo"], completa=True)["notas"] == 3
+
+    destino = tmp_path / "restaurado" / "banco.db"
+    restaurado = backup.restaurar_backup(res["arquivo"], str(destino), str(tmp_path / "pdfs"))
+    assert restaurado["notas"] == 3 and restaurado["puladas"] == 0
+    assert sorted(os.listdir(tmp_path / "pdfs")) == sorted(os.listdir(com_notas))
+    conn = sqlite3.connect(destino)
+    assert conn.execute("SELECT COUNT(*) FROM historico_servicos").fetchone()[0] == 3
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conn.close()
+
+    with pytest.raises(backup.ErroBackup, match="já existe"):
+        backup.restaurar_backup(res["arquivo"], str(destino))
+
+def test_pdf_que_sumiu_vai_para_o_manifesto(com_notas, tmp_path):
+    perdido = com_notas / "nota_Ana_0.pdf"
+    perdido.unlink()
+    res = backup.criar_backup(str(tmp_path / "backups"))
+    assert res["notas"] == 2 and res["faltando"] == [str(perdido)]
+
+def test_so_os_mais_novos_ficam(com_notas, tmp_path):
+    pasta = tmp_path / "backups"
+    pasta.mkdir()
+    for antigo in ("backup_20200101_000000.zip", "backup_20210101_000000.zip", "backup_20220101_000000.zip"):
+        (pasta / antigo).write_bytes(b"")
+    assert not backup.precisa_backup(str(pasta), backup.INTERVALO)
+    res = backup.criar_backup(str(pasta), manter=2)
+    assert backup.listar_backups(str(pasta)) == [res["arquivo"], str(pasta / "backup_20220101_000000.zip")]
+
+def test_precisa_backup_sem_nenhum(tmp_path):
+    assert backup.precisa_backup(str(tmp_path / "vazia"))
+
+def _trocar_no_zip(arquivo, nome, dados):
+    """Regrava o zip com a entrada `nome` substituída (None: removida)."""
+    with zipfile.ZipFile(arquivo) as z:
+        entradas = [(info, z.read(info)) for info in z.infolist()]
+    with zipfile.ZipFile(arquivo, "w") as z:
+        for info, conteudo in entradas:
+            if info.filename != nome: z.writestr(info, conteudo)
+            elif dados is not None: z.writestr(info, dados)
+
+def test_verificar_recusa_backup_estragado(com_notas, tmp_path):
+    res = backup.criar_backup(str(tmp_path / "backups"), verificar=False)
+    with zipfile.ZipFile(res["arquivo"]) as z:
+        manifesto = json.loads(z.read(backup.MANIFESTO))
+        banco = z.read(backup.BANCO)
+    pdf = next(iter(manifesto["notas"]))
+
+    _trocar_no_zip(res["arquivo"], pdf, None)
+    with pytest.raises(backup.ErroBackup, match="fora do backup"):
+        backup.verificar_backup(res["arquivo"])
+
+    manifesto["contagens"]["clientes"] = 99
+    _trocar_no_zip(res["arquivo"], backup.MANIFESTO, json.dumps(manifesto))
+    manifesto["notas"].pop(pdf)
+    _trocar_no_zip(res["arquivo"], backup.MANIFESTO, json.dumps(manifesto))
+    with pytest.raises(backup.ErroBackup, match="contagens"):
+        backup.verificar_backup(res["arquivo"])
+
+    _trocar_no_zip(res["arquivo"], backup.BANCO, banco[:len(banco) // 2])
+    with pytest.raises(backup.ErroBackup):
+        backup.verificar_backup(res["arquivo"], completa=True)
+
+    (tmp_path / "nao_e_zip.zip").write_bytes(b"lixo")
+    with pytest.raises(backup.ErroBackup, match="não é um backup"):
+        backup.verificar_backup(str(tmp_path / "nao_e_zip.zip"))
+
+def test_copia_e_de_um_instante_so(com_notas, tmp_path):
+    """Escritas durante a cópia não entram pela metade: contagens e banco copiado batem."""
+    def escrever(etapa, feito, total):
+        if etapa == "banco":
+            db.salvar_cliente(f"Durante {feito}", "", "", "", "", "", "", "")
+    res = backup.criar_backup(str(tmp_path / "backups"), paginas=1, progresso=escrever)
+    assert res["verificacao"]["contagens"]["clientes"] == 2
+    assert len(db.listar_clientes()) > 2
+
+@pytest.mark.parametrize("variavel, backups", [(None, 0), ("0", 0), ("1", 1)])
+def test_backup_ao_abrir_so_quando_pedido(banco, qapp, monkeypatch, variavel, backups):
+    import main
+    feitos = []
+    monkeypatch.setattr(main.MenuPrincipal, "fazer_backup", lambda self: feitos.append(1))
+    monkeypatch.setattr(backup, "precisa_backup", lambda *a: True)
+    if variavel is None: monkeypatch.delenv("OFICINA_BACKUP_DIARIO", raising=False)
+    else: monkeypatch.setenv("OFICINA_BACKUP_DIARIO", variavel)
+    janela = main.MenuPrincipal()
+    assert len(feitos) == backups
+    janela.deleteLater()
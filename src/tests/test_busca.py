@@ -0,0 +1,61 @@
+import models.db as db
+
+def _cliente(nome, telefone="", carro="", placa="", endereco=""):
+    return db.salvar_cliente(nome, telefone, endereco, carro, placa, "", "", "")
+
+def _nomes(termo, limite=50):
+    return [linha[2] for linha in db.buscar_clientes(termo, limite)]
+
+def test_expressao_busca_usa_prefixo_em_todas_as_palavras():
+    assert db._expressao_busca("joão 976-12") == '"joão"* "97612"*'
+    assert db._expressao_busca('  "a" OR b* ') == '"a"* "OR"* "b"*'
+    assert db._expressao_busca(" - () ") == ""
+
+def test_busca_por_prefixo_sem_acento_e_sem_maiusculas(banco):
+    _cliente("João Conceição")
+    _cliente("Joaquim Souza")
+    _cliente("Maria Joana")
+    assert sorted(_nomes("jo")) == ["Joaquim Souza", "João Conceição", "Maria Joana"]
+    assert _nomes("JOAO conc") == ["João Conceição"]
+    assert _nomes("concei") == ["João Conceição"]
+    assert _nomes("jo souza") == ["Joaquim Souza"]
+
+def test_telefone_e_placa_casam_do_jeito_que_forem_digitados(banco):
+    _cliente("Ana", telefone="(21) 97612-4007", placa="abc-1d23")
+    _cliente("Bia", telefone="2133334444", carro="Fiat Uno")
+    assert _nomes("2197612") == ["Ana"]
+    assert _nomes("97612") == ["Ana"]
+    assert _nomes("213333") == ["Bia"]
+    assert _nomes("abc1") == ["Ana"]
+    assert _nomes("uno") == ["Bia"]
+
+def test_vazio_ou_so_pontuacao_nao_consulta(banco):
+    _cliente("Ana")
+    assert db.buscar_clientes("") == [] and db.buscar_clientes(" -- ") == []
+
+def test_aspas_e_operadores_nao_quebram_a_consulta(banco):
+    _cliente("Oficina NOT Ltda")
+    assert _nomes('not "') == ["Oficina NOT Ltda"]
+    assert _nomes("ltda OR") == []
+
+def test_limite_de_resultados(banco):
+    for i in range(30):
+        _cliente(f"Silva {i}")
+    assert len(db.buscar_clientes("silva", 10)) == 10
+
+def test_indice_acompanha_carga_em_lote(banco):
+    db.inserir_clientes_em_lote([("Carga Lote", "21 91234-5678", "", "Gol", "", "", "", "", "Aberto")])
+    assert _nomes("21912345") == ["Carga Lote"]
+    assert db.conectar().execute("SELECT COUNT(*) FROM clientes_fts").fetchone()[0] == 1
+
+def test_campo_busca_espera_parar_de_digitar(qapp, esperar):
+    import main
+    campo = main.CampoBusca()
+    recebidos = []
+    campo.buscar.connect(recebidos.append)
+    for texto in ("s", "si", "sil"):
+        campo.setText(texto)
+    esperar(lambda: recebidos)
+    campo.setText("silv")
+    esperar(lambda: len(recebidos) == 2)
+    assert recebidos == ["sil", "silv"]
@@ -0,0 +1,35 @@
+import models.db as db
+
+def test_preco_por_nome_sem_diferenciar_maiusculas(banco):
+    id_filtro = db.salvar_produto("Filtro de Óleo", 30.0)
+    assert db.preco_produto("filtro de óleo") == 30.0
+    assert db.preco_produto("  FILTRO DE ÓLEO ") == 30.0
+    assert db._catalogo.id_produto("Filtro de óleo") == id_filtro
+    assert db.preco_produto("Filtro") is None
+
+def test_nome_repetido_fica_com_o_primeiro(banco):
+    primeiro = db.salvar_produto("Vela", 20.0)
+    db.salvar_produto("VELA", 25.0)
+    assert db.preco_produto("vela") == 20.0
+    assert db._catalogo.id_produto("vela") == primeiro
+
+def test_consultas_repetidas_nao_vao_ao_banco(banco):
+    db.salvar_produto("Vela", 20.0)
+    db.preco_produto("vela")
+    comandos = []
+    db.definir_rastreador(comandos.append)
+    try:
+        for _ in range(100):
+            db.preco_produto("vela")
+            db.preco_produto("outra")
+    finally:
+        db.definir_rastreador(None)
+    assert comandos == []
+
+def test_cache_limpo_ao_salvar_e_ao_importar(banco):
+    assert db.preco_produto("Correia") is None
+    db.salvar_produto("Correia", 90.0)
+    assert db.preco_produto("correia") == 90.0
+    db.inserir_produtos_em_lote([("Pastilha", 120.0)])
+    db.concluir_importacao("produtos")
+    assert db.preco_produto("pastilha") == 120.0
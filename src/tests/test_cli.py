@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+import models.db as db
+from servicos import operacoes
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _modulos_apos(codigo):
+    """Módulos carregados por um Python novo depois de rodar `codigo` em src/."""
+    saida = subprocess.run([sys.executable, "-c", codigo + "; import sys; print(' '.join(sys.modules))"],
+                           cwd=SRC, capture_output=True, text=True, check=True).stdout
+    return set(saida.split())
+
+@pytest.mark.parametrize("codigo", ["import models.db", "import servicos.operacoes", "import cli"])
+def test_nucleo_nao_carrega_interface_nem_pdf(codigo):
+    modulos = _modulos_apos(codigo)
+    assert not {m for m in modulos if m.split(".")[0] in ("PyQt5", "reportlab")}
+
+def test_conexao_so_abre_no_primeiro_uso():
+    codigo = "import models.db as db, cli; print(db._gerenciador._conn is None)"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=SRC, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == "True"
+
+def test_nota_pelo_terminal_com_preco_do_catalogo(banco, tmp_path, capsys):
+    db.salvar_produto("Filtro de óleo", 30.0)
+    id_cliente = db.salvar_cliente("Ana", "", "", "Gol", "ABC1234", "", "", "")
+    saida = str(tmp_path / "nota.pdf")
+    cli.main(["nota", str(id_cliente), "--item", "2", "filtro de óleo", "-", "--item", "1", "Mão de obra", "80,50",
+              "--saida", saida])
+    assert "(R$ 140.50)" in capsys.readouterr().out
+    assert os.path.exists(saida)
+
+    cli.main(["historico", str(id_cliente)])
+    assert "filtro de óleo, Mão de obra" in capsys.readouterr().out
+    cli.main(["veiculo", "abc-1234"])
+    assert "Placa ABC1234: Gol de Ana" in capsys.readouterr().out
+
+def test_item_fora_do_catalogo_sem_valor(banco, tmp_path):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    with pytest.raises(SystemExit, match="não está no catálogo"):
+        cli.main(["nota", str(id_cliente), "--item", "1", "Peça nova", "-", "--saida", str(tmp_path / "n.pdf")])
+
+def test_resumo_e_fechamento(banco, capsys):
+    db.salvar_historico(None, "2024-03-10", "[]", 100.0, "")
+    cli.main(["resumo", "--mes", "03/2024"])
+    assert "03/2024: R$ 100.00 em 1 nota(s)" in capsys.readouterr().out
+    cli.main(["fechar", "mes", "--mes", "03/2024"])
+    assert db.listar_fechamentos_pagina() == []
+    cli.main(["fechar", "mes", "--mes", "03/2024", "--sim"])
+    assert db.listar_fechamentos_pagina()[0][1:4] == (operacoes.MENSAL, "03/2024", 100.0)
+    with pytest.raises(SystemExit, match="Não há faturamento"):
+        cli.main(["fechar", "dia", "--dia", "11/03/2024"])
+
+def test_link_whatsapp():
+    assert operacoes.link_whatsapp("21976124007").startswith("https://web.whatsapp.com/send?phone=5521976124007&")
+    assert "phone=5521976124007&" in operacoes.link_whatsapp("5521976124007")
@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+
+import pytest
+
+import models.db as db
+
+def test_uma_conexao_para_o_processo(banco):
+    a, b = db.conectar(), db.conectar()
+    assert a._conn is b._conn
+    a.close()   # chamadores antigos fecham; a conexão continua aberta
+    assert b.execute("SELECT 1").fetchone() == (1,)
+
+def test_ajustes_aplicados_na_abertura(banco):
+    conn = db.conectar()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == db.PRAGMAS["busy_timeout"]
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1   # NORMAL
+
+def test_fechar_faz_checkpoint_e_reabre_sob_demanda(banco):
+    db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    db.fechar_conexao()
+    assert db._gerenciador._conn is None
+    # Depois do checkpoint(TRUNCATE) o -wal fica vazio e outra conexão vê tudo
+    outra = sqlite3.connect(banco)
+    assert outra.execute("SELECT nome FROM clientes").fetchall() == [("Ana",)]
+    outra.close()
+    assert db.listar_clientes()[0][2] == "Ana"
+
+def test_transacao_desfaz_tudo_no_erro(banco):
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transacao() as c:
+            c.execute("INSERT INTO produtos (nome, valor_padrao) VALUES ('Vela', 20)")
+            c.execute("INSERT INTO servico_itens (id_servico, descricao) VALUES (999, 'sem nota')")
+    assert db.listar_produtos() == []
+
+def test_varias_threads_na_mesma_conexao(banco):
+    erros = []
+
+    def gravar(n):
+        try:
+            for i in range(20):
+                db.salvar_produto(f"Peça {n}-{i}", float(i))
+        except Exception as e:
+            erros.append(e)
+    threads = [threading.Thread(target=gravar, args=(n,)) for n in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert erros == []
+    assert len(db.listar_produtos()) == 80
@@ -0,0 +1,103 @@
+import csv
+import json
+
+import pytest
+
+import models.db as db
+from servicos import contabil, diagnostico
+
+def _movimento():
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "ABC1D23", "", "", "")
+    for dia in range(1, 8):
+        db.salvar_historico(id_cliente, f"2024-03-{dia:02d}",
+                            json.dumps([[2, "Filtro de óleo", 60.0], [1, "Mão de obra", 80.0]]), 140.0, "")
+    db.salvar_historico(id_cliente, "2024-04-01", json.dumps([[1, "Revisão", 90.0]]), 90.0, "")
+
+def _ler(caminho):
+    with open(caminho, newline="", encoding="utf-8-sig") as f:
+        return list(csv.reader(f))
+
+def test_exporta_o_periodo_em_lotes(banco, tmp_path):
+    _movimento()
+    progresso = []
+    res = contabil.exportar_contabil("01/03/2024", "31/03/2024", str(tmp_path), lote=4,
+                                     progresso=lambda tabela, n: progresso.append((tabela, n)))
+    linhas = _ler(res["arquivos"]["historico_itens"][0])
+    assert linhas[0] == db.COLUNAS_EXPORTACAO["historico_itens"]
+    assert len(linhas) == 15 and {linha[1] for linha in linhas[1:]} == {f"2024-03-{d:02d}" for d in range(1, 8)}
+    assert [n for tabela, n in progresso if tabela == "historico_itens"] == [4, 8, 12, 14]
+    assert res["arquivos"]["clientes"][1] == 1
+
+def test_funcoes_resolvidas_na_hora_da_exportacao(banco, tmp_path, monkeypatch):
+    _movimento()
+    chamadas = []
+    original = db.exportar_clientes
+
+    def substituta(*args):
+        chamadas.append(args[1:])
+        return original(*args)
+    monkeypatch.setattr(db, "exportar_clientes", substituta)
+    contabil.exportar_contabil("2024-03-01", "2024-03-31", str(tmp_path))
+    assert chamadas == [("2024-03-01", "2024-03-31", 5000)]
+
+def test_exportacao_entra_no_diagnostico(banco, tmp_path):
+    _movimento()
+    diagnostico.limpar()
+    diagnostico.ativar()
+    try:
+        contabil.exportar_contabil("2024-03-01", "2024-03-31", str(tmp_path))
+    finally:
+        diagnostico.desativar()
+    nomes = {e["nome"] for e in diagnostico.resumo() if e["tipo"] == diagnostico.BANCO}
+    assert {"exportar_historico_itens", "exportar_fechamentos", "exportar_clientes"} <= nomes
+
+def test_parquet_sem_pyarrow_e_recusado(banco, tmp_path, monkeypatch):
+    monkeypatch.setattr(contabil, "formatos_disponiveis", lambda: [contabil.CSV])
+    with pytest.raises(ValueError, match="pyarrow"):
+        contabil.exportar_contabil("2024-03-01", "2024-03-31", str(tmp_path), contabil.PARQUET)
+
+def test_linhas_achatadas_e_filtradas_pelo_periodo(banco, tmp_path):
+    _movimento()
+    outro = db.salvar_cliente("Bia", "", "", "", "", "", "", "")
+    db.salvar_historico(outro, "2024-03-15", "[]", 0.0, "vazia.pdf")
+    db.salvar_cliente("Sem notas", "", "", "", "", "", "", "")
+    with db.transacao() as c:
+        c.executemany("INSERT INTO fechamentos (tipo, periodo, valor, data_registro) VALUES ('Diário', ?, ?, ?)",
+                      [("29/02/2024", 10, "29/02/2024 18:00"), ("15/03/2024", 20, "15/03/2024 18:00")])
+    with db.leitura_isolada() as conn:
+        itens = [l for lote in db.exportar_historico_itens(conn, "2024-03-01", "2024-03-31") for l in lote]
+        fechamentos = [l for lote in db.exportar_fechamentos(conn, "2024-03-01", "2024-03-31") for l in lote]
+        clientes = [l for lote in db.exportar_clientes(conn, "2024-03-01", "2024-03-31") for l in lote]
+    assert itens[0][:2] == (1, "2024-03-01") and itens[0][6:9] == ("Filtro de óleo", 2.0, 60.0)
+    # Nota sem itens sai uma vez, com os campos do item vazios
+    assert [l[5:9] for l in itens if l[0] == 9] == [(None, None, None, None)]
+    assert [f[2] for f in fechamentos] == ["15/03/2024"]
+    assert [c[1] for c in clientes] == ["Ana", "Bia"]
+
+def test_exportacao_le_um_instante_so(banco):
+    _movimento()
+    with db.leitura_isolada() as conn:
+        lotes = db.exportar_historico_itens(conn, "2024-03-01", "2024-03-31", lote=2)
+        primeiro = next(lotes)
+        # Gravações durante a exportação não esperam por ela nem aparecem nela
+        db.salvar_historico(None, "2024-03-02", "[]", 10.0, "")
+        resto = [l for lote in lotes for l in lote]
+    assert len(primeiro) + len(resto) == 14
+    assert db.contar_historico_periodo("2024-03-01", "2024-03-31") == 8
+
+def test_parquet_com_tipos(banco, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _movimento()
+    res = contabil.exportar_contabil("2024-03-01", "2024-03-31", str(tmp_path), contabil.PARQUET, lote=5)
+    tabela = pq.read_table(res["arquivos"]["historico_itens"][0])
+    assert tabela.num_rows == 14 and pq.ParquetFile(res["arquivos"]["historico_itens"][0]).num_row_groups == 3
+    assert str(tabela.schema.field("valor_total_item").type) == "double"
+    assert str(tabela.schema.field("placa").type) == "string"
+    # Tabela vazia ainda gera o arquivo com o cabeçalho
+    assert pq.read_table(res["arquivos"]["fechamentos"][0]).column_names == db.COLUNAS_EXPORTACAO["fechamentos"]
+
+def test_linha_de_comando(banco, tmp_path, capsys):
+    _movimento()
+    contabil.main(["03/2024", "--destino", str(tmp_path)])
+    saida = capsys.readouterr().out
+    assert "historico_itens.csv: 14 linhas" in saida and "clientes.csv: 1 linhas" in saida
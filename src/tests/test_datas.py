@@ -0,0 +1,61 @@
+import json
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import models.db as db
+from servicos import manutencao
+
+def test_data_iso_aceita_os_formatos_da_interface():
+    assert db.data_iso("05/03/2023") == "2023-03-05"
+    assert db.data_iso("5/3/2023") == "2023-03-05"
+    assert db.data_iso("2023-03-05") == "2023-03-05"
+    assert db.data_iso(date(2023, 3, 5)) == "2023-03-05"
+    assert db.data_iso(datetime(2023, 3, 5, 14, 30)) == "2023-03-05"
+    with pytest.raises(ValueError):
+        db.data_iso("31/02/2023")
+
+def test_periodo_do_mes():
+    assert db.periodo_do_mes(2, 2024) == (date(2024, 2, 1), date(2024, 2, 29))
+    assert db.periodo_do_mes("12", "2023") == (date(2023, 12, 1), date(2023, 12, 31))
+
+def test_notas_gravadas_em_iso_e_somadas_por_faixa(banco):
+    for data, valor in (("31/01/2024", 10.0), ("01/02/2024", 20.0), ("29/02/2024", 30.0), ("01/03/2024", 40.0)):
+        db.salvar_historico(None, data, "[]", valor, "")
+    conn = db.conectar()
+    assert conn.execute("SELECT MIN(data_servico) FROM historico_servicos").fetchone()[0] == "2024-01-31"
+    assert db.calcular_total_periodo(*db.periodo_do_mes(2, 2024)) == 50.0
+    assert db.contar_historico_periodo("01/01/2024", "2024-12-31") == 4
+    plano = " ".join(str(linha) for linha in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT SUM(valor_total) FROM historico_servicos WHERE data_servico BETWEEN ? AND ?",
+        ("2024-02-01", "2024-02-29")))
+    assert "idx_historico_data" in plano
+
+def _base_antiga(caminho, datas):
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE historico_servicos (id INTEGER PRIMARY KEY AUTOINCREMENT, id_cliente INTEGER, "
+                 "data_servico TEXT, itens_json TEXT, valor_total REAL, arquivo_path TEXT)")
+    conn.executemany("INSERT INTO historico_servicos (data_servico, itens_json, valor_total) VALUES (?, ?, 10)",
+                     [(d, json.dumps([[1, "Revisão", 10.0]])) for d in datas])
+    conn.commit()
+    conn.close()
+
+def test_migracao_converte_datas_sem_zeros_e_aponta_as_invalidas(tmp_path, capsys):
+    caminho = str(tmp_path / "antigo.db")
+    _base_antiga(caminho, ["15/03/2023", "5/3/2023", "05/3/2023", " 9/12/2022", "31/02/2023", "ontem", None])
+    db.configurar(caminho)
+    try:
+        conn = db.conectar()
+        assert "3 nota(s)" in capsys.readouterr().out
+        assert [d for d, in conn.execute("SELECT data_servico FROM historico_servicos ORDER BY id")] == \
+            ["2023-03-15", "2023-03-05", "2023-03-05", "2022-12-09", "31/02/2023", "ontem", None]
+        assert db.datas_invalidas() == [(5, None, "31/02/2023"), (6, None, "ontem"), (7, None, None)]
+        assert db.resumo_mes(3, 2023) == (30.0, 3)
+        assert db.calcular_total_periodo("01/03/2023", "31/03/2023") == 30.0
+
+        manutencao.main(["datas-invalidas"])
+        saida = capsys.readouterr().out
+        assert "nota 5 (cliente -): 31/02/2023" in saida and "nota 7 (cliente -): sem data" in saida
+    finally:
+        db.fechar_conexao()
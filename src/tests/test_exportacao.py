@@ -0,0 +1,39 @@
+import json
+import os
+
+import models.db as db
+from servicos import exportacao
+
+def _notas(quantas, data="2024-03-10"):
+    id_cliente = db.salvar_cliente("José da Silva / Filho", "", "", "", "", "", "", "")
+    for i in range(quantas):
+        db.salvar_historico(id_cliente, data, json.dumps([[1, f"Serviço {i}", 50.0]]), 50.0, "")
+
+def test_reemite_so_o_periodo_em_paralelo(banco, tmp_path):
+    _notas(12)
+    _notas(3, "2024-04-01")
+    progresso = []
+    res = exportacao.exportar_periodo("01/03/2024", "31/03/2024", str(tmp_path / "pdfs"), processos=2,
+                                      progresso=lambda feitas, total: progresso.append((feitas, total)))
+    assert res["notas"] == 12 and res["paginas"] == 12
+    assert progresso[-1] == (12, 12) and len(progresso) == 12
+    nomes = sorted(os.listdir(tmp_path / "pdfs"))
+    assert nomes[0] == "2024-03-10_000001_José_da_Silva_Filho.pdf"
+    assert len(nomes) == 12
+    assert all(open(tmp_path / "pdfs" / nome, "rb").read(5) == b"%PDF-" for nome in nomes)
+
+def test_periodo_vazio_nao_abre_processos(banco, tmp_path):
+    res = exportacao.exportar_periodo("2024-01-01", "2024-01-31", str(tmp_path / "pdfs"))
+    assert res["notas"] == 0 and os.listdir(tmp_path / "pdfs") == []
+
+def test_lotes_de_leitura_trazem_os_itens_de_cada_nota(banco):
+    _notas(7)
+    notas = list(db.iterar_historico_periodo("2024-03-01", "2024-03-31", lote=3))
+    assert [n[0] for n in notas] == list(range(1, 8))
+    assert notas[6][1] == "10/03/2024"
+    assert notas[6][3] == [(1, "Serviço 6", 50.0)]
+
+def test_linha_de_comando(banco, tmp_path, capsys):
+    _notas(2)
+    exportacao.main(["03/2024", "--destino", str(tmp_path / "pdfs"), "--processos", "1"])
+    assert "2 notas, 2 páginas" in capsys.readouterr().out
@@ -0,0 +1,77 @@
+import sqlite3
+
+import models.db as db
+from benchmarks import gerar_dados
+
+def test_base_gerada_aceita_escritas(tmp_path):
+    caminho = str(tmp_path / "gerada.db")
+    gerar_dados.gerar(caminho, clientes=50, notas=200, produtos=20)
+    conn = sqlite3.connect(caminho)
+    for tabela in ("clientes", "produtos", "historico_servicos"):
+        assert conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE uid IS NULL").fetchone()[0] == 0
+    conn.close()
+
+    db.configurar(caminho)
+    try:
+        antes = db.ultima_alteracao()
+        db.atualizar_status(1, "Entregue")
+        db.deletar_cliente(2)
+        assert db.ultima_alteracao() == antes + 2
+    finally:
+        db.fechar_conexao()
+
+def test_linha_inserida_fora_da_api_ganha_uid(banco):
+    with db.transacao() as c:
+        c.execute("INSERT INTO clientes (nome, placa) VALUES ('Sem uid', 'XYZ9876')")
+        id_cliente = c.lastrowid
+    uid = db.conectar().execute("SELECT uid FROM clientes WHERE id = ?", (id_cliente,)).fetchone()[0]
+    assert uid and len(uid) == 32
+    db.atualizar_status(id_cliente, "Entregue")
+    _, entradas, _ = db.alteracoes_desde(0)
+    assert entradas[-1][4] == uid
+
+def _conteudo(caminho):
+    conn = sqlite3.connect(caminho)
+    try:
+        return (conn.execute("SELECT nome, telefone, placa, status FROM clientes ORDER BY id").fetchall(),
+                conn.execute("SELECT id_cliente, data_servico, itens_json, valor_total FROM historico_servicos "
+                             "ORDER BY id").fetchall())
+    finally:
+        conn.close()
+
+def test_mesma_semente_mesma_base(tmp_path):
+    a, b, c = (str(tmp_path / nome) for nome in ("a.db", "b.db", "c.db"))
+    gerar_dados.gerar(a, clientes=30, notas=100, produtos=10)
+    gerar_dados.gerar(b, clientes=30, notas=100, produtos=10)
+    gerar_dados.gerar(c, clientes=30, notas=100, produtos=10, semente=7)
+    assert _conteudo(a) == _conteudo(b)
+    assert _conteudo(a) != _conteudo(c)
+
+def test_base_gerada_e_coerente(tmp_path):
+    caminho = str(tmp_path / "gerada.db")
+    gerar_dados.gerar(caminho, clientes=40, notas=300, produtos=15, anos=2)
+    db.configurar(caminho)
+    try:
+        conn = db.conectar()
+        # Itens somam o total da nota e os agregados batem com o recálculo
+        assert conn.execute("""
+            SELECT COUNT(*) FROM historico_servicos h
+            WHERE abs(h.valor_total - (SELECT SUM(valor_total_item) FROM servico_itens WHERE id_servico = h.id)) > 0.01
+        """).fetchone()[0] == 0
+        agregados = conn.execute("SELECT * FROM faturamento_mes ORDER BY mes").fetchall()
+        db.reconstruir_agregados()
+        assert [(m, round(t, 2), n) for m, t, n in conn.execute("SELECT * FROM faturamento_mes ORDER BY mes")] == \
+            [(m, round(t, 2), n) for m, t, n in agregados]
+        assert conn.execute("SELECT SUM(usos) FROM produtos").fetchone()[0] == \
+            conn.execute("SELECT COUNT(*) FROM servico_itens WHERE id_produto IS NOT NULL").fetchone()[0]
+    finally:
+        db.fechar_conexao()
+
+def test_comparacao_aponta_so_as_regressoes():
+    from benchmarks import suite
+    antes = {"resultados": {"a": {"mediana_ms": 10.0}, "b": {"mediana_ms": 10.0}, "c": {"mediana_ms": 0.0}}}
+    depois = {"resultados": {"a": {"mediana_ms": 11.0}, "b": {"mediana_ms": 30.0}, "c": {"mediana_ms": 5.0},
+                             "novo": {"mediana_ms": 99.0}}}
+    assert suite.comparar(antes, depois) == [("b", 10.0, 30.0, 3.0)]
+    medida = suite._medir(lambda: None, 20)
+    assert medida["repeticoes"] == 20 and medida["min_ms"] <= medida["mediana_ms"] <= medida["p95_ms"] <= medida["max_ms"]
@@ -0,0 +1,75 @@
+import pytest
+
+import models.db as db
+from servicos import importacao
+
+def _csv(tmp_path, texto, nome="dados.csv", encoding="utf-8"):
+    caminho = tmp_path / nome
+    caminho.write_text(texto, encoding=encoding)
+    return str(caminho)
+
+def test_normalizacao_de_placa_telefone_e_valor():
+    assert importacao.normalizar_placa("abc-1234") == "ABC1234"
+    assert importacao.normalizar_placa(" abc 1d23 ") == "ABC1D23"
+    assert importacao.normalizar_placa("") == ""
+    with pytest.raises(importacao.ErroImportacao):
+        importacao.normalizar_placa("AB12345")
+    assert importacao.normalizar_telefone("+55 (21) 97612-4007") == "21976124007"
+    assert importacao.normalizar_telefone("(21) 3333-4444") == "2133334444"
+    with pytest.raises(importacao.ErroImportacao):
+        importacao.normalizar_telefone("97612-4007")
+    assert importacao.normalizar_valor("R$ 1.234,56") == 1234.56
+    assert importacao.normalizar_valor("25.5") == 25.5
+    assert importacao.normalizar_valor("") == 0.0
+
+def test_clientes_repetidos_no_arquivo_e_no_banco(banco, tmp_path):
+    db.salvar_cliente("João Diniz", "(21) 97612-4007", "", "", "abc-1234", "", "", "")
+    db.salvar_cliente("Maria", "", "", "", "", "", "", "")
+    caminho = _csv(tmp_path, "\n".join([
+        "Cliente;Celular;Veículo;Placa;Obs",
+        "Outro nome;;Gol;ABC1C34;mesma placa no formato Mercosul",
+        "joao diniz;+55 21 97612-4007;;;mesmo nome e telefone",
+        "MARIA;;;;mesmo nome, sem placa nem telefone",
+        "Pedro;21 98888-7777;Uno;XYZ-9876;",
+        "Pedro;21 98888-7777;;;repetido no próprio arquivo",
+        ";21 91111-2222;;;sem nome",
+        "Paulo;123;;;telefone curto",
+        "Lia;;;QQ12;placa inválida",
+        ";;;;",
+        "Ana;(21) 3333-4444;Onix;DEF4G56;",
+    ]))
+    res = importacao.importar_clientes(caminho, lote=1)
+    assert (res["lidas"], res["importadas"], res["duplicadas"], res["invalidas"]) == (9, 2, 4, 3)   # a linha vazia nem conta
+    assert [numero for numero, _ in res["erros"]] == [7, 8, 9]
+    pedro = db.obter_cliente_por_placa("XYZ9876")
+    assert pedro[2:7] == ("Pedro", "21988887777", "", "Uno", "XYZ9876")
+    assert [c[2] for c in db.buscar_clientes("onix")] == ["Ana"]
+    assert len(db.listar_clientes()) == 4
+
+def test_catalogo_sem_repetir_nomes(banco, tmp_path):
+    db.salvar_produto("Filtro de Óleo", 30.0)
+    caminho = _csv(tmp_path, "Peça,Preço\nfiltro de oleo,\"35,00\"\nVela,\"1.200,50\"\nvela ,10\nCorreia,abc\n",
+                   encoding="latin-1")
+    avisos = []
+
+    def ouvir(tabela, acao, id_registro):
+        avisos.append((tabela, acao))
+    db.inscrever(ouvir)
+    try:
+        res = importacao.importar_produtos(caminho, encoding="latin-1")
+    finally:
+        db.cancelar_inscricao(ouvir)
+    assert (res["importadas"], res["duplicadas"], res["invalidas"]) == (1, 2, 1)
+    assert db.preco_produto("vela") == 1200.5
+    # Uma notificação só, no fim da carga
+    assert avisos == [("produtos", db.RECARREGADO)]
+
+def test_arquivo_sem_coluna_nome(banco, tmp_path):
+    with pytest.raises(importacao.ErroImportacao, match="nome"):
+        importacao.importar_clientes(_csv(tmp_path, "telefone,placa\n21999990000,ABC1234\n"))
+
+def test_linha_de_comando(banco, tmp_path, capsys):
+    importacao.main(["clientes", _csv(tmp_path, "nome,placa\nAna,ABC1234\nBia,ABC-1234\nCid,X\n")])
+    saida = capsys.readouterr().out
+    assert "1 importados, 1 duplicados, 1 inválidos de 3 linhas" in saida
+    assert "linha 4: placa inválida" in saida
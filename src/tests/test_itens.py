@@ -0,0 +1,40 @@
+import json
+
+import models.db as db
+
+def _nota(id_cliente, itens, data="2024-05-10"):
+    return db.salvar_historico(id_cliente, data, json.dumps(itens), sum(v for _, _, v in itens), "")
+
+def test_itens_em_linhas_com_o_produto_do_catalogo(banco):
+    id_filtro = db.salvar_produto("Filtro de óleo", 30.0)
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    id_nota = _nota(id_cliente, [[2, "filtro de óleo", 60.0], [1.5, "Mão de obra", 120.0]])
+    assert db.listar_itens_servicos(id_nota, id_nota) == [(id_nota, 2, "filtro de óleo", 60.0),
+                                                          (id_nota, 1.5, "Mão de obra", 120.0)]
+    conn = db.conectar()
+    assert conn.execute("SELECT id_produto FROM servico_itens ORDER BY id").fetchall() == [(id_filtro,), (None,)]
+    assert db.listar_historico(id_cliente) == [("10/05/2024", "filtro de óleo, Mão de obra", 180.0)]
+
+def test_valor_do_item_e_o_total_da_linha(banco):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    _nota(id_cliente, [[4, "Vela", 100.0]])
+    _nota(id_cliente, [[2, "vela", 50.0], [1, "Revisão", 200.0]])
+    assert db.totais_por_item("2024-05-01", "2024-05-31") == [("Revisão", 1.0, 200.0), ("Vela", 6.0, 150.0)]
+    colunas = [linha[1] for linha in db.conectar().execute("PRAGMA table_info(servico_itens)")]
+    assert "valor_total_item" in colunas and "valor_unitario" not in colunas
+
+def test_itens_seguem_a_nota_e_o_produto(banco):
+    id_vela = db.salvar_produto("Vela", 25.0)
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    id_nota = _nota(id_cliente, [[1, "Vela", 25.0]])
+    _nota(id_cliente, [[1, "Vela", 25.0]])
+    with db.transacao() as c:
+        c.execute("DELETE FROM produtos WHERE id = ?", (id_vela,))
+        c.execute("DELETE FROM historico_servicos WHERE id = ?", (id_nota,))
+    conn = db.conectar()
+    assert conn.execute("SELECT id_servico, id_produto FROM servico_itens").fetchall() == [(id_nota + 1, None)]
+
+def test_nota_sem_itens_tem_resumo_vazio(banco):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    db.salvar_historico(id_cliente, "2024-05-10", "[]", 0.0, "")
+    assert db.listar_historico(id_cliente) == [("10/05/2024", "-", 0.0)]
@@ -0,0 +1,133 @@
+import json
+import sqlite3
+
+import pytest
+
+import models.db as db
+
+def _base_antiga(caminho):
+    """Arquivo como o da primeira versão do programa: sem user_version, datas dd/mm/YYYY, itens só em JSON."""
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE clientes (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT, telefone TEXT, endereco TEXT,
+                               carro TEXT, placa TEXT, ano TEXT, km TEXT, observacoes TEXT);
+        CREATE TABLE historico_servicos (id INTEGER PRIMARY KEY AUTOINCREMENT, id_cliente INTEGER, data_servico TEXT,
+                                         itens_json TEXT, valor_total REAL, arquivo_path TEXT,
+                                         FOREIGN KEY(id_cliente) REFERENCES clientes(id));
+        CREATE TABLE fechamentos (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, periodo TEXT, valor REAL,
+                                  data_registro TEXT);
+        CREATE TABLE produtos (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT, valor_padrao REAL);
+        INSERT INTO clientes (nome, telefone, placa) VALUES ('João Diniz', '(21) 97612-4007', 'abc-1234');
+        INSERT INTO clientes (nome, telefone, placa) VALUES ('Maria', '', '');
+        INSERT INTO produtos (nome, valor_padrao) VALUES ('Filtro de óleo', 30.0);
+    """)
+    conn.executemany("INSERT INTO historico_servicos (id_cliente, data_servico, itens_json, valor_total, arquivo_path) "
+                     "VALUES (?, ?, ?, ?, ?)", [
+        (1, "15/03/2024", json.dumps([[2, "Filtro de óleo", 60.0], [1, "Mão de obra", 80.0]]), 140.0, "a.pdf"),
+        (2, "15/03/2024", json.dumps([[1, "Revisão", 200.0]]), 200.0, "b.pdf"),
+        (1, "02/04/2024", "não é json", 50.0, "c.pdf"),
+    ])
+    conn.commit()
+    conn.close()
+
+def test_banco_novo_fica_na_ultima_versao(banco):
+    assert db.versao_esquema() == len(db.MIGRACOES)
+
+def test_migracoes_sao_idempotentes(banco):
+    db.criar_tabelas()
+    db.fechar_conexao()
+    db.configurar(banco)
+    assert db.versao_esquema() == len(db.MIGRACOES)
+
+def test_base_antiga_migra_sem_perder_dados(tmp_path):
+    caminho = str(tmp_path / "antigo.db")
+    _base_antiga(caminho)
+    db.configurar(caminho)
+    try:
+        assert db.versao_esquema() == len(db.MIGRACOES)
+        conn = db.conectar()
+        assert [d for d, in conn.execute("SELECT data_servico FROM historico_servicos ORDER BY id")] == \
+            ["2024-03-15", "2024-03-15", "2024-04-02"]
+        # Itens saem do JSON; o inválido fica sem itens
+        assert db.listar_itens_servicos(1, 3) == [(1, 2, "Filtro de óleo", 60.0), (1, 1, "Mão de obra", 80.0),
+                                                  (2, 1, "Revisão", 200.0)]
+        assert db.resumo_dia("15/03/2024") == (340.0, 2)
+        assert db.resumo_mes(4, 2024) == (50.0, 1)
+        assert db.sugerir_produtos("filtro") == ["Filtro de óleo"]
+        assert conn.execute("SELECT usos FROM produtos").fetchone()[0] == 1
+        assert db.obter_cliente_por_placa("ABC1C34")[2] == "João Diniz"
+        assert [c[2] for c in db.buscar_clientes("2197612")] == ["João Diniz"]
+        assert conn.execute("SELECT COUNT(*) FROM clientes WHERE uid IS NULL").fetchone()[0] == 0
+        assert db.listar_historico_veiculo_pagina("ABC1234")[0][3] == "-"
+    finally:
+        db.fechar_conexao()
+
+def test_migracao_com_erro_nao_deixa_meio_esquema(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "antigo.db")
+    _base_antiga(caminho)
+
+    def quebrar(c):
+        c.execute("CREATE TABLE nao_deveria_ficar (x)")
+        raise sqlite3.OperationalError("falhou no meio")
+    monkeypatch.setattr(db, "MIGRACOES", db.MIGRACOES[:3] + [quebrar])
+    db.configurar(caminho)
+    with pytest.raises(sqlite3.OperationalError):
+        db.conectar()
+    db.configurar(caminho)
+    conn = sqlite3.connect(caminho)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 3
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'nao_deveria_ficar'").fetchone() is None
+    conn.close()
+
+# --- GATILHOS ---
+def _cliente(nome="Fulano", placa="ABC1D23", telefone="21999990000"):
+    return db.salvar_cliente(nome, telefone, "Rua A, 1", "Gol", placa, "2015", "80000", "")
+
+def test_faturamento_acompanha_notas(banco):
+    id_cliente = _cliente()
+    id_nota = db.salvar_historico(id_cliente, "2024-05-10", json.dumps([[1, "Revisão", 120.0]]), 120.0, "")
+    db.salvar_historico(id_cliente, "2024-05-20", json.dumps([[1, "Revisão", 80.0]]), 80.0, "")
+    assert db.resumo_dia("10/05/2024") == (120.0, 1)
+    assert db.resumo_mes(5, 2024) == (200.0, 2)
+
+    with db.transacao() as c:
+        c.execute("UPDATE historico_servicos SET valor_total = 150, data_servico = '2024-06-01' WHERE id = ?",
+                  (id_nota,))
+    assert db.resumo_dia("10/05/2024")[0] == 0
+    assert db.resumo_mes(5, 2024) == (80.0, 1)
+    assert db.resumo_mes(6, 2024) == (150.0, 1)
+
+    with db.transacao() as c:
+        c.execute("DELETE FROM historico_servicos WHERE id = ?", (id_nota,))
+    assert db.resumo_mes(6, 2024)[0] == 0
+    db.reconstruir_agregados()
+    assert db.resumo_mes(5, 2024) == (80.0, 1)
+
+def test_usos_dos_produtos_seguem_os_itens(banco):
+    db.salvar_produto("Vela de ignição", 25.0)
+    db.salvar_produto("Velocímetro", 300.0)
+    id_cliente = _cliente()
+    for _ in range(2):
+        db.salvar_historico(id_cliente, "2024-05-10", json.dumps([[4, "vela de ignição", 100.0]]), 100.0, "")
+    assert db.sugerir_produtos("vel") == ["Vela de ignição", "Velocímetro"]
+    with db.transacao() as c:
+        c.execute("DELETE FROM servico_itens")
+    assert db.conectar().execute("SELECT SUM(usos) FROM produtos").fetchone()[0] == 0
+
+def test_busca_acompanha_alteracoes_do_cliente(banco):
+    id_cliente = _cliente("Carlos Souza")
+    assert [c[0] for c in db.buscar_clientes("souz")] == [id_cliente]
+    with db.transacao() as c:
+        c.execute("UPDATE clientes SET nome = 'Carlos Lima' WHERE id = ?", (id_cliente,))
+    assert db.buscar_clientes("souz") == []
+    assert [c[0] for c in db.buscar_clientes("lima")] == [id_cliente]
+    db.deletar_cliente(id_cliente)
+    assert db.buscar_clientes("lima") == []
+
+def test_placa_repetida_passa_o_veiculo_para_a_ficha_nova(banco):
+    antigo = _cliente("Dono antigo", "ABC1234")
+    db.salvar_historico(antigo, "2024-01-10", json.dumps([[1, "Revisão", 90.0]]), 90.0, "")
+    novo = _cliente("Dono novo", "abc1c34")
+    assert db.obter_cliente_por_placa("ABC-1234")[0] == novo
+    # O histórico do veículo atravessa a troca de dono
+    assert [linha[2] for linha in db.listar_historico_veiculo_pagina("ABC1C34")] == ["Dono antigo"]
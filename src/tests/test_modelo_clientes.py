@@ -0,0 +1,60 @@
+import pytest
+
+import models.db as db
+
+@pytest.fixture
+def modelo(banco, qapp, esperar):
+    import main
+    m = main.ModeloClientes()
+    yield m
+    esperar(lambda: main.banco().pendentes() == 0)
+    m.deleteLater()
+
+def _cadastrar(n):
+    db.inserir_clientes_em_lote([(f"Cliente {i:03d}", None, None, "Gol", None, "", "", None, "Aberto")
+                                 for i in range(n)])
+
+def _celulas(modelo, linha):
+    return [modelo.data(modelo.index(linha, coluna)) for coluna in range(modelo.columnCount())]
+
+def test_paginas_chegam_conforme_a_tabela_pede(modelo, esperar):
+    _cadastrar(modelo.TAMANHO_PAGINA + 50)
+    modelo.recarregar()
+    esperar(lambda: modelo.rowCount() == modelo.TAMANHO_PAGINA)
+    assert modelo.canFetchMore()
+    modelo.fetchMore()
+    esperar(lambda: modelo.rowCount() == modelo.TAMANHO_PAGINA + 50)
+    assert not modelo.canFetchMore()
+    assert modelo.data(modelo.index(modelo.rowCount() - 1, 1)) == f"Cliente {modelo.TAMANHO_PAGINA + 49:03d}"
+
+def test_campos_vazios_nao_aparecem_como_none(modelo, esperar):
+    _cadastrar(1)
+    modelo.recarregar()
+    esperar(lambda: modelo.rowCount() == 1)
+    assert _celulas(modelo, 0) == ["Aberto", "Cliente 000", "", "", "Gol", "", "", "", ""]
+    id_cli, status, dados = modelo.cliente(0)
+    assert status == "Aberto" and dados == ["Cliente 000", "", "", "Gol", "", "", "", ""]
+    assert "None" not in dados
+
+def test_busca_troca_as_linhas_e_volta(modelo, esperar):
+    _cadastrar(5)
+    db.salvar_cliente("Joana Prado", "21 98888-1111", "", "Uno", "XYZ9A87", "", "", "")
+    modelo.filtrar("prad")
+    esperar(lambda: modelo.rowCount() == 1)
+    assert modelo.data(modelo.index(0, 1)) == "Joana Prado"
+    modelo.filtrar("")
+    esperar(lambda: modelo.rowCount() == 6)
+
+def test_alteracoes_mexem_so_na_linha(modelo, esperar):
+    _cadastrar(3)
+    modelo.recarregar()
+    esperar(lambda: modelo.rowCount() == 3 and not modelo.canFetchMore())
+    id_cli = modelo.cliente(1)[0]
+    db.atualizar_status(id_cli, "Finalizado")
+    esperar(lambda: modelo.data(modelo.index(1, 0)) == "Finalizado")
+    novo = db.salvar_cliente("Novo", "", "", "", "", "", "", "")
+    esperar(lambda: modelo.rowCount() == 4)
+    assert modelo.cliente(3)[0] == novo
+    db.deletar_cliente(id_cli)
+    esperar(lambda: modelo.rowCount() == 3)
+    assert id_cli not in [modelo.cliente(i)[0] for i in range(3)]
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+import models.db as db
+from servicos import operacoes
+
+ITENS = [(2, "Filtro de óleo", 60.0), (1, "Mão de obra", 80.0)]
+
+def test_pdf_antes_do_historico(banco, tmp_path):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    arquivo = str(tmp_path / "nota.pdf")
+    etapas = []
+    id_nota = operacoes.emitir_nota(arquivo, {"id": id_cliente, "nome": "Ana"}, ITENS, 140.0, etapas.append)
+    assert open(arquivo, "rb").read(5) == b"%PDF-"
+    assert etapas == ["Gerando PDF de Ana...", "Salvando histórico de Ana..."]
+    assert db.listar_historico_pagina(id_cliente)[0][0] == id_nota
+    assert db.listar_itens_servicos(id_nota, id_nota) == [(id_nota, q, d, v) for q, d, v in ITENS]
+
+def test_pdf_que_falha_nao_grava_historico(banco, tmp_path):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    with pytest.raises(OSError):
+        operacoes.emitir_nota(str(tmp_path / "nao_existe" / "nota.pdf"), {"id": id_cliente, "nome": "Ana"},
+                              ITENS, 140.0)
+    assert db.listar_historico_pagina(id_cliente) == []
+
+def test_tarefa_roda_fora_da_thread_da_interface(banco, tmp_path, qapp, esperar, monkeypatch):
+    import main
+    from PyQt5.QtCore import QThreadPool
+    threads = []
+    original = operacoes.emitir_nota
+
+    def emitir(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return original(*args, **kwargs)
+    monkeypatch.setattr(operacoes, "emitir_nota", emitir)
+
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    ok, erros = [], []
+    for arquivo in (str(tmp_path / "nota.pdf"), str(tmp_path / "nao_existe" / "nota.pdf")):
+        tarefa = main.TarefaNota(arquivo, {"id": id_cliente, "nome": "Ana"}, ITENS, 140.0)
+        tarefa.sinais.concluida.connect(ok.append)
+        tarefa.sinais.falhou.connect(erros.append)
+        QThreadPool.globalInstance().start(tarefa)
+    esperar(lambda: len(ok) + len(erros) == 2)
+    assert ok == [str(tmp_path / "nota.pdf")]
+    assert len(erros) == 1 and erros[0].startswith("Ana: ")
+    assert threading.main_thread() not in threads
+    assert len(db.listar_historico_pagina(id_cliente)) == 1
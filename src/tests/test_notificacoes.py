@@ -0,0 +1,94 @@
+import json
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import models.db as db
+
+@pytest.fixture
+def avisos(banco):
+    recebidos = []
+
+    def ouvir(*aviso):
+        recebidos.append(aviso)
+    db.inscrever(ouvir)
+    yield recebidos
+    db.cancelar_inscricao(ouvir)
+
+def test_cada_escrita_avisa_a_linha_afetada(avisos):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    db.atualizar_status(id_cliente, "Finalizado")
+    id_nota = db.salvar_historico(id_cliente, "2024-05-10", "[]", 10.0, "")
+    id_fechamento = db.registrar_fechamento("Diário", "10/05/2024", 10.0)
+    db.deletar_cliente(id_cliente)
+    assert avisos == [("clientes", db.INSERIDO, id_cliente), ("clientes", db.ATUALIZADO, id_cliente),
+                      ("historico_servicos", db.INSERIDO, id_nota), ("fechamentos", db.INSERIDO, id_fechamento),
+                      ("clientes", db.REMOVIDO, id_cliente)]
+
+def test_escrita_desfeita_nao_avisa(avisos):
+    with pytest.raises(sqlite3.IntegrityError):
+        db.salvar_historico(999, "2024-05-10", "[]", 10.0, "")
+    assert avisos == []
+
+def test_carga_em_lote_avisa_uma_vez(avisos):
+    db.inserir_produtos_em_lote([(f"Peça {i}", 1.0) for i in range(50)])
+    db.concluir_importacao("produtos")
+    assert avisos == [("produtos", db.RECARREGADO, 0)]
+
+def test_ouvinte_com_erro_nao_impede_os_outros(avisos, capsys):
+    def quebrado(*aviso):
+        raise RuntimeError("tela fechada")
+    db._ouvintes.insert(0, quebrado)
+    try:
+        db.salvar_produto("Vela", 20.0)
+    finally:
+        db.cancelar_inscricao(quebrado)
+    assert avisos == [("produtos", db.INSERIDO, 1)]
+    assert "tela fechada" in capsys.readouterr().out
+
+# --- PAINEL FINANCEIRO ---
+def _entradas_de_outra_filial():
+    """Uma nota de hoje e um fechamento, como chegam de outra base na sincronização."""
+    hoje = date.today()
+    return [
+        (1, "outra", "historico_servicos", db.INSERIDO, "nota-1",
+         json.dumps({"data_servico": hoje.isoformat(), "itens_json": "[]", "valor_total": 150.0,
+                     "arquivo_path": "", "cliente": None})),
+        (2, "outra", "fechamentos", db.INSERIDO, "fechamento-1",
+         json.dumps({"tipo": "Diário", "periodo": hoje.strftime("%d/%m/%Y"), "valor": 150.0,
+                     "data_registro": datetime.now().strftime("%d/%m/%Y %H:%M")})),
+    ]
+
+def test_painel_financeiro_relido_depois_de_sincronizar(banco, qapp, esperar):
+    import main
+    dialogo = main.DialogoFinanceiro()
+    try:
+        esperar(lambda: main.banco().pendentes() == 0)
+        assert dialogo.tabela.rowCount() == 0
+        assert dialogo.card_dia.lbl_valor.text() == "R$ 0.00"
+
+        db.aplicar_alteracoes("outra", _entradas_de_outra_filial(), 2)
+        esperar(lambda: dialogo.tabela.rowCount() == 1 and main.banco().pendentes() == 0)
+        assert dialogo.card_dia.lbl_valor.text() == "R$ 150.00"
+        assert dialogo.card_mes.lbl_notas.text() == "1 nota(s)"
+        assert dialogo.tabela.item(0, 1).text() == date.today().strftime("%d/%m/%Y")
+
+        # Registro feito aqui entra no topo, sem reler a tabela
+        db.registrar_fechamento("Mensal", date.today().strftime("%m/%Y"), 150.0)
+        esperar(lambda: dialogo.tabela.rowCount() == 2)
+        assert dialogo.tabela.item(0, 0).text() == "Mensal"
+    finally:
+        dialogo.deleteLater()
+
+def test_painel_financeiro_relido_quando_o_servidor_reinicia(banco, qapp, esperar):
+    import main
+    dialogo = main.DialogoFinanceiro()
+    try:
+        esperar(lambda: main.banco().pendentes() == 0)
+        with db.transacao() as c:
+            c.execute("INSERT INTO fechamentos (tipo, periodo, valor, data_registro) VALUES ('Diário', '-', 1, '-')")
+        db._notificar("clientes", db.RECARREGADO, 0)
+        esperar(lambda: dialogo.tabela.rowCount() == 1)
+    finally:
+        dialogo.deleteLater()
@@ -0,0 +1,85 @@
+import json
+
+import models.db as db
+
+def _notas(id_cliente, quantas):
+    for i in range(quantas):
+        db.salvar_historico(id_cliente, f"2024-03-{i % 28 + 1:02d}", json.dumps([[1, f"Item {i}", 10.0]]), 10.0, "")
+
+def _todas(funcao, *args, limite):
+    paginas, cursor = [], None
+    while True:
+        pagina = funcao(*args, cursor, limite)
+        paginas.append(pagina)
+        if len(pagina) < limite: return paginas
+        cursor = pagina[-1][0]
+
+def test_paginas_do_cliente_sem_repetir_nem_pular(banco):
+    ana = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    bia = db.salvar_cliente("Bia", "", "", "", "", "", "", "")
+    _notas(ana, 25)
+    _notas(bia, 5)
+    paginas = _todas(db.listar_historico_pagina, ana, limite=10)
+    assert [len(p) for p in paginas] == [10, 10, 5]
+    ids = [linha[0] for pagina in paginas for linha in pagina]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 25
+    assert paginas[0][0][1:] == ("25/03/2024", "Item 24", 10.0)
+    assert db.listar_historico(ana) == [l[1:] for p in paginas for l in p]
+
+def test_pagina_usa_o_indice_do_cliente(banco):
+    plano = " ".join(str(linha) for linha in db.conectar().execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM historico_servicos WHERE id_cliente = ? AND id < ? ORDER BY id DESC LIMIT 100",
+        (1, 2**63 - 1)))
+    assert "idx_historico_cliente" in plano and "TEMP B-TREE" not in plano
+
+def test_paginas_de_fechamentos(banco):
+    for dia in range(1, 8):
+        db.registrar_fechamento("Diário", f"{dia:02d}/03/2024", dia * 10.0)
+    paginas = _todas(db.listar_fechamentos_pagina, limite=3)
+    assert [[linha[2] for linha in p] for p in paginas] == [
+        ["07/03/2024", "06/03/2024", "05/03/2024"], ["04/03/2024", "03/03/2024", "02/03/2024"], ["01/03/2024"]]
+    assert [f[:3] for f in db.listar_fechamentos()] == [l[1:4] for p in paginas for l in p]
+
+# --- ROLAGEM NA INTERFACE ---
+def _paginacao(qapp, linhas_por_id, tamanho):
+    import main
+    from PyQt5.QtWidgets import QTableWidget
+    tabela = QTableWidget(0, 1)
+    tabela.resize(300, 200)
+    pedidos, recebidas = [], []
+
+    def funcao(antes_id, limite):
+        pedidos.append(antes_id)
+        ids = [i for i in linhas_por_id if antes_id is None or i < antes_id][:limite]
+        return [(i,) for i in ids]
+
+    def preencher(linhas):
+        recebidas.extend(linhas)
+        inicio = tabela.rowCount()
+        tabela.setRowCount(inicio + len(linhas))
+    return main.PaginacaoRolagem(tabela, funcao, ao_receber=preencher, tamanho=tamanho), tabela, pedidos, recebidas
+
+def test_rolagem_pede_a_proxima_pagina(qapp, esperar):
+    paginas, tabela, pedidos, recebidas = _paginacao(qapp, list(range(500, 0, -1)), 50)
+    tabela.show()
+    paginas.reiniciar()
+    esperar(lambda: len(recebidas) >= 50)
+    # A primeira página já enche a tabela: nada mais é pedido sem rolar
+    qapp.processEvents()
+    assert pedidos == [None] and len(recebidas) == 50
+    tabela.verticalScrollBar().setValue(tabela.verticalScrollBar().maximum())
+    esperar(lambda: len(recebidas) == 100)
+    assert pedidos == [None, 451]
+    tabela.close()
+
+def test_reiniciar_descarta_pagina_atrasada(qapp, esperar):
+    paginas, tabela, pedidos, recebidas = _paginacao(qapp, [3, 2, 1], 10)
+    paginas.reiniciar()
+    paginas.reiniciar()
+    esperar(lambda: len(pedidos) == 2 and len(recebidas) >= 3)
+    qapp.processEvents()
+    # Só a resposta do último reiniciar() chega à tela; a lista curta encerra a paginação
+    assert recebidas == [(3,), (2,), (1,)]
+    paginas.proxima()
+    qapp.processEvents()
+    assert len(pedidos) == 2
@@ -0,0 +1,42 @@
+import base64
+import re
+import zlib
+
+from servicos import pdf
+
+CLIENTE = {"nome": "Ana Souza"}
+
+def _streams(caminho):
+    """(é formulário, conteúdo decodificado) de cada stream do PDF."""
+    bruto = open(caminho, "rb").read()
+    for dicionario, dados in re.findall(rb"<<(.*?)>>\s*stream\r?\n(.*?)endstream", bruto, re.S):
+        dados = zlib.decompress(base64.a85decode(dados.strip().removesuffix(b"~>")))
+        yield b"/Subtype /Form" in dicionario, dados
+
+def test_partes_fixas_sao_formularios_definidos_uma_vez(tmp_path):
+    caminho = str(tmp_path / "nota.pdf")
+    paginas = pdf.criar_pdf(caminho, CLIENTE, [(1, f"Item {i}", 10.0) for i in range(90)], 900.0, "05/03/2024")
+    assert paginas == 3
+    formularios = [dados for forma, dados in _streams(caminho) if forma]
+    conteudo = b"".join(dados for forma, dados in _streams(caminho) if not forma)
+    assert len(formularios) == 4
+    # Textos fixos só dentro dos formulários; cada página só chama (Do)
+    for fixo in (b"Auto El", b"Telefone:", b"Descri", b"Forma de Pagamento", b"Garantia"):
+        assert sum(fixo in f for f in formularios) == 1
+        assert fixo not in conteudo
+    # Bloco da oficina, rodapé, cabeçalho da tabela (uma vez por página) e a moldura de cada item
+    assert conteudo.count(b" Do") == 1 + 1 + 3 + 90
+    assert b"(Data: 05/03/2024)" in conteudo and b"(Cliente: Ana Souza)" in conteudo
+    assert b"(Item 89)" in conteudo and b"Valor Total: R$ 900,00" in conteudo
+
+def test_tamanho_cresce_pouco_por_item(tmp_path):
+    def tamanho(n):
+        caminho = tmp_path / f"nota_{n}.pdf"
+        pdf.criar_pdf(str(caminho), CLIENTE, [(1, "Filtro", 10.0)] * n, 10.0 * n, "05/03/2024")
+        return caminho.stat().st_size
+    assert tamanho(25) - tamanho(1) < 24 * 60
+
+def test_reemissao_em_lote_usa_a_data_original(tmp_path):
+    caminho = str(tmp_path / "nota.pdf")
+    assert pdf.renderizar_tarefa((caminho, CLIENTE, [(1, "Filtro", 10.0)], 10.0, "01/02/2020")) == (caminho, 1)
+    assert any(b"(Data: 01/02/2020)" in dados for _, dados in _streams(caminho))
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import models.db as db
+
+@pytest.mark.parametrize("digitada, chave", [
+    ("ABC1234", "ABC1C34"), ("abc-1234", "ABC1C34"), ("ABC 1C34", "ABC1C34"), ("abc.1c34", "ABC1C34"),
+    ("XYZ0000", "XYZ0A00"), ("XYZ9999", "XYZ9J99"), ("(RIO) 2A19", "RIO2A19"),
+    ("", None), (None, None), (" - ", None),
+    ("AB1234", "AB1234"),   # fora dos dois formatos: só sem separadores e em maiúsculas
+])
+def test_chave_da_placa(digitada, chave):
+    assert db.chave_placa(digitada) == chave
+
+def test_chave_no_sql_igual_a_do_python(banco):
+    placas = ["ABC1234", "abc-1234", "ABC1C34", "xyz 0000", "XYZ9999", "", None, " - ", "AB1234", "abc1d23", "1234567"]
+    conn = db.conectar()
+    conn.execute("CREATE TEMP TABLE placas (placa TEXT)")
+    conn.executemany("INSERT INTO placas VALUES (?)", [(p,) for p in placas])
+    no_sql = [chave for chave, in conn.execute(f"SELECT {db._sql_chave_placa('placa')} FROM placas ORDER BY rowid")]
+    assert no_sql == [db.chave_placa(p) for p in placas]
+
+def _cliente(nome, placa):
+    return db.salvar_cliente(nome, "", "", "Gol", placa, "", "", "")
+
+def test_placa_acha_o_dono_em_qualquer_formato(banco):
+    ana = _cliente("Ana", "abc-1234")
+    _cliente("Bia", "")
+    _cliente("Cid", "")
+    assert db.obter_cliente_por_placa("ABC1C34")[0] == ana
+    assert db.obter_cliente_por_placa("abc 1234")[0] == ana
+    assert db.obter_cliente_por_placa("") is None and db.obter_cliente_por_placa("DEF1234") is None
+    plano = " ".join(str(linha) for linha in db.conectar().execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM clientes WHERE placa_chave = ?", ("ABC1C34",)))
+    assert "idx_clientes_placa" in plano
+
+def test_busca_pela_placa_poe_o_dono_primeiro(banco):
+    # Fichas com a placa no nome também aparecem, mas depois do dono
+    for i in range(5):
+        db.salvar_cliente(f"ABC1C34 Peças {i}", "", "", "", "", "", "", "")
+    dono = _cliente("Zé", "ABC-1234")
+    achados = db.buscar_clientes("abc1c34")
+    assert achados[0][0] == dono and len(achados) == 6
+    assert db.buscar_clientes("ABC-1234")[0][0] == dono
+    assert [c[0] for c in db.buscar_clientes("abc1c34", limite=3)][:1] == [dono]
+    assert len(db.buscar_clientes("abc1c34", limite=3)) == 3
+
+def test_troca_de_dono_e_historico_do_veiculo(banco):
+    antigo = _cliente("Dono antigo", "ABC1234")
+    db.salvar_historico(antigo, "2024-01-10", json.dumps([[1, "Revisão", 90.0]]), 90.0, "")
+    novo = _cliente("Dono novo", "ABC1C34")
+    db.salvar_historico(novo, "2024-06-10", json.dumps([[1, "Freios", 150.0]]), 150.0, "")
+    # Outra placa na ficha antiga não entra no histórico deste carro
+    db.salvar_historico(antigo, "2024-07-01", "[]", 10.0, "")
+    with db.transacao() as c:
+        c.execute("UPDATE clientes SET placa = 'DEF5G67' WHERE id = ?", (antigo,))
+    db.salvar_historico(antigo, "2024-08-01", "[]", 20.0, "")
+
+    assert db.obter_cliente_por_placa("ABC1234")[0] == novo
+    assert db.obter_cliente_por_placa("DEF5G67")[0] == antigo
+    linhas = db.listar_historico_veiculo_pagina("abc-1234")
+    assert [(l[1], l[2], l[3]) for l in linhas] == [("01/07/2024", "Dono antigo", "-"), ("10/06/2024", "Dono novo", "Freios"),
+                                                     ("10/01/2024", "Dono antigo", "Revisão")]
+    assert [l[0] for l in db.listar_historico_veiculo_pagina("ABC1C34", antes_id=linhas[0][0], limite=1)] == [linhas[1][0]]
+    assert db.listar_historico_veiculo_pagina("") == []
+
+def test_carga_em_lote_transfere_a_placa_como_o_cadastro(banco):
+    antigo = _cliente("Dono antigo", "ABC1234")
+    db.inserir_clientes_em_lote([
+        ("Primeiro", "", "", "", "ABC1C34", "", "", "", "Aberto"),
+        ("Segundo", "", "", "", "abc-1234", "", "", "", "Aberto"),
+        ("Outro", "", "", "", "XYZ9876", "", "", "", "Aberto"),
+    ])
+    assert db.obter_cliente_por_placa("ABC1234")[2] == "Segundo"
+    assert db.obter_cliente_por_placa("XYZ9876")[2] == "Outro"
+    chaves = db.conectar().execute("SELECT id, placa_chave FROM clientes ORDER BY id").fetchall()
+    assert chaves[0] == (antigo, None) and [ch for _, ch in chaves[1:]] == [None, "ABC1C34", "XYZ9I76"]
+    # Os gatilhos voltam depois da carga
+    _cliente("Depois", "XYZ-9876")
+    assert db.obter_cliente_por_placa("XYZ9876")[2] == "Depois"
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import models.db as db
+import servicos.servidor
+from servicos.remoto import Cliente, ErroServidor
+from servicos.servidor import Servidor
+
+TOKEN = "segredo"
+
+@pytest.fixture
+def servidor(banco):
+    """Servidor numa thread própria, porta livre qualquer."""
+    srv = Servidor(porta=0, token=TOKEN)
+    loop = asyncio.new_event_loop()
+    pronto = threading.Event()
+
+    def rodar():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(srv.iniciar())
+        pronto.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    assert pronto.wait(5)
+    yield srv
+
+    async def encerrar():
+        await srv.parar()
+        # Conexões dos terminais ainda abertas (keep-alive)
+        tarefas = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for tarefa in tarefas: tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(encerrar(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+def _cliente(srv, token=TOKEN):
+    return Cliente(f"127.0.0.1:{srv.porta}", token, repassar_avisos=False)
+
+def _em_paralelo(chamadas):
+    """Roda cada chamada numa thread; devolve as threads e os resultados (ou exceções), na ordem."""
+    resultados = [None] * len(chamadas)
+    def rodar(i, chamada):
+        try: resultados[i] = chamada()
+        except Exception as e: resultados[i] = e
+    threads = [threading.Thread(target=rodar, args=item) for item in enumerate(chamadas)]
+    for t in threads: t.start()
+    return threads, resultados
+
+def _esperar(condicao):
+    fim = time.time() + 5
+    while not condicao():
+        assert time.time() < fim, "tempo esgotado"
+        time.sleep(0.01)
+
+def _num_lote(srv, cliente, chamadas):
+    """Roda as chamadas com o escritor parado num lote anterior: todas entram no lote seguinte.
+
+    Devolve (resultados, tamanho de cada lote gravado).
+    """
+    tamanhos, liberar = [], threading.Event()
+    original = srv._gravar
+    def gravar(pedidos):
+        tamanhos.append(len(pedidos))
+        liberar.wait(5)
+        return original(pedidos)
+    srv._gravar = gravar
+    try:
+        parado, _ = _em_paralelo([lambda: cliente.chamar("salvar_produto", "Trava", 0.0)])
+        _esperar(lambda: tamanhos)
+        threads, resultados = _em_paralelo(chamadas)
+        _esperar(lambda: srv._fila.qsize() == len(chamadas))
+        liberar.set()
+        for t in parado + threads: t.join(10)
+    finally:
+        srv._gravar = original
+    return resultados, tamanhos
+
+def test_escritas_simultaneas_saem_num_lote(servidor):
+    cliente = _cliente(servidor)
+    ids, tamanhos = _num_lote(servidor, cliente, [
+        (lambda i=i: cliente.chamar("salvar_cliente", f"Cliente {i}", "", "", "", "", "", "", ""))
+        for i in range(20)])
+    assert tamanhos == [1, 20]
+    assert sorted(ids) == list(range(1, 21))
+    assert (servidor.escritas, servidor.lotes) == (21, 2)
+    assert len(cliente.chamar("listar_clientes")) == 20
+
+def test_erro_de_uma_escrita_nao_desfaz_o_lote(servidor):
+    cliente = _cliente(servidor)
+    resultados, tamanhos = _num_lote(servidor, cliente, [
+        lambda: cliente.chamar("salvar_cliente", "Antes", "", "", "", "", "", "", ""),
+        # Cliente inexistente: a chave estrangeira recusa a nota
+        lambda: cliente.chamar("salvar_historico", 999, "2024-05-10", "[]", 10.0, ""),
+        lambda: cliente.chamar("salvar_cliente", "Depois", "", "", "", "", "", "", "")])
+    assert tamanhos == [1, 3]
+    assert isinstance(resultados[1], sqlite3.IntegrityError)
+    assert sorted(c[2] for c in cliente.chamar("listar_clientes")) == ["Antes", "Depois"]
+    assert cliente.chamar("contar_historico_periodo", "2024-01-01", "2024-12-31") == 0
+    # O registro de alterações ficou só com as escritas que valeram
+    assert [e[2] for e in cliente.chamar("alteracoes_desde", 0)[1]] == ["produtos", "clientes", "clientes"]
+
+def test_avisos_saem_depois_do_commit_com_sequencia(servidor):
+    cliente = _cliente(servidor)
+    id_cliente = cliente.chamar("salvar_cliente", "Ana", "", "", "", "", "", "", "")
+    cliente.chamar("atualizar_status", id_cliente, "Entregue")
+    resposta = cliente._pedir("GET", "/eventos?desde=0")
+    assert resposta["seq"] == 2
+    assert resposta["eventos"] == [[1, "clientes", db.INSERIDO, id_cliente], [2, "clientes", db.ATUALIZADO, id_cliente]]
+    assert cliente._pedir("GET", "/eventos?desde=99")["reiniciar"] is True
+
+def test_pedidos_recusados(servidor):
+    with pytest.raises(ErroServidor, match="401"):
+        _cliente(servidor, token="errado").chamar("listar_clientes")
+    with pytest.raises(ErroServidor, match="desconhecida"):
+        _cliente(servidor).chamar("arquivar_ano", 2020)
+    with pytest.raises(TypeError):
+        _cliente(servidor).chamar("salvar_cliente", "faltam argumentos")
+
+def test_terminal_nao_carrega_o_servidor():
+    codigo = "import servicos.remoto, sys; print('asyncio' in sys.modules, 'servicos.servidor' in sys.modules)"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=os.path.dirname(os.path.dirname(__file__)),
+                           capture_output=True, text=True, check=True)
+    assert saida.stdout.split() == ["False", "False"]
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "192.168.0.10", "::", "oficina.local"])
+def test_rede_sem_token_e_recusada(host, capsys, monkeypatch):
+    monkeypatch.setattr(Servidor, "servir", lambda self: pytest.fail("não deveria servir"))
+    with pytest.raises(SystemExit):
+        servicos.servidor.main(["--host", host])
+    assert "--token" in capsys.readouterr().err
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "127.0.0.2", "::1", "localhost"])
+def test_so_esta_maquina_dispensa_token(host):
+    assert servicos.servidor._so_esta_maquina(host)
+
+def test_administrativas_rodam_fora_do_lote(servidor):
+    cliente = _cliente(servidor)
+    antigo = date.today().year - 2
+    sai = cliente.chamar("salvar_cliente", "Sai", "", "", "", "", "", "", "")
+    cliente.chamar("salvar_historico", sai, f"{antigo}-03-10", "[]", 50.0, "")
+    db.arquivar_ano(antigo)
+    db.fechar_conexao()   # reabre sem os anos arquivados anexados
+    resultados, tamanhos = _num_lote(servidor, cliente, [
+        lambda: cliente.chamar("salvar_cliente", "Antes", "", "", "", "", "", "", ""),
+        # Anexa o ano arquivado: não pode estar dentro da transação do lote
+        lambda: cliente.chamar("reconstruir_agregados"),
+        lambda: cliente.chamar("deletar_cliente", sai),
+        lambda: cliente.chamar("salvar_cliente", "Depois", "", "", "", "", "", "", "")])
+    assert not [r for r in resultados if isinstance(r, Exception)]
+    assert sum(tamanhos) == 5 and len(tamanhos) >= 4
+    assert cliente.chamar("resumo_mes", 3, antigo) == (50.0, 1)
+    assert sorted(c[2] for c in cliente.chamar("listar_clientes")) == ["Antes", "Depois"]
+
+def test_leituras_numa_thread_so(servidor, monkeypatch):
+    threads = set()
+    original = db.resumo_dia
+
+    def resumo_dia(data):
+        threads.add(threading.current_thread().name)
+        return original(data)
+    monkeypatch.setattr(db, "resumo_dia", resumo_dia)
+    cliente = _cliente(servidor)
+    chamadas, resultados = _em_paralelo([lambda: cliente.chamar("resumo_dia", "2024-05-10")] * 8)
+    for t in chamadas: t.join(5)
+    assert resultados == [(0.0, 0)] * 8
+    assert len(threads) == 1 and threads.pop().startswith("leitura")
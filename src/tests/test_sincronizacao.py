@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+import models.db as db
+from servicos import sincronizacao
+
+def _abrir(caminho):
+    db.configurar(str(caminho))
+    db._catalogo.invalidar()
+    return db.instalacao()
+
+def _clientes():
+    return {uid: (nome, status) for uid, nome, status in
+            db.conectar().execute("SELECT uid, nome, status FROM clientes")}
+
+@pytest.fixture
+def filiais(tmp_path):
+    """Dois bancos: a matriz já com um cliente, uma nota e um fechamento."""
+    a, b = tmp_path / "matriz.db", tmp_path / "filial.db"
+    _abrir(a)
+    id_cliente = db.salvar_cliente("Ana", "21999990000", "", "Gol", "ABC1D23", "", "", "")
+    db.salvar_historico(id_cliente, "2024-05-10", json.dumps([[1, "Revisão", 150.0]]), 150.0, "n1.pdf")
+    db.registrar_fechamento("Diário", "10/05/2024", 150.0)
+    db.atualizar_status(id_cliente, "Entregue")
+    yield a, b, tmp_path
+    db.fechar_conexao()
+
+def test_toda_escrita_entra_no_registro(banco):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    db.atualizar_status(id_cliente, "Entregue")
+    db.deletar_cliente(id_cliente)
+    _, entradas, acabou = db.alteracoes_desde(0)
+    assert acabou
+    assert [(tabela, acao) for _, _, tabela, acao, _, _ in entradas] == [
+        ("clientes", db.INSERIDO), ("clientes", db.ATUALIZADO), ("clientes", db.REMOVIDO)]
+    assert json.loads(entradas[1][5])["status"] == "Entregue"
+    assert {origem for _, origem, *_ in entradas} == {db.instalacao()}
+
+def test_alteracoes_desde_pagina_e_pula_o_proprio_par(banco):
+    for i in range(5):
+        db.salvar_produto(f"Peça {i}", i)
+    ate, entradas, acabou = db.alteracoes_desde(0, limite=3)
+    assert (ate, len(entradas), acabou) == (3, 3, False)
+    ate, entradas, acabou = db.alteracoes_desde(ate, limite=3, excluir_origem=db.instalacao())
+    # A marca avança mesmo sem entradas para enviar
+    assert (ate, entradas, acabou) == (5, [], True)
+
+def test_exportar_e_importar_entre_filiais(filiais):
+    a, b, pasta = filiais
+    matriz = _abrir(a)
+    esperado = _clientes()
+    assert sincronizacao.exportar(str(pasta / "lote.jsonl.gz")) == 4
+    ultima = db.ultima_alteracao()
+
+    _abrir(b)
+    res = sincronizacao.importar(str(pasta / "lote.jsonl.gz"))
+    assert (res["par"], res["recebidas"], res["marca"]) == (matriz, 4, ultima)
+    assert _clientes() == esperado
+    (id_cliente,) = [c[0] for c in db.listar_clientes()]
+    assert [linha[3] for linha in db.listar_historico_pagina(id_cliente)] == [150.0]
+    assert db.resumo_dia("10/05/2024") == (150.0, 1)
+    assert [f[:3] for f in db.listar_fechamentos()] == [("Diário", "10/05/2024", 150.0)]
+
+    # Aplicar o mesmo arquivo de novo não duplica nada
+    assert sincronizacao.importar(str(pasta / "lote.jsonl.gz"))["recebidas"] == 0
+    assert len(db.listar_clientes()) == 1 and db.contar_historico_periodo("2024-01-01", "2024-12-31") == 1
+
+def test_volta_so_o_que_a_filial_mudou(filiais):
+    a, b, pasta = filiais
+    matriz = _abrir(a)
+    sincronizacao.exportar(str(pasta / "ida.jsonl.gz"))
+    filial = _abrir(b)
+    sincronizacao.importar(str(pasta / "ida.jsonl.gz"))
+    (id_cliente,) = [c[0] for c in db.listar_clientes()]
+    db.atualizar_status(id_cliente, "Aberto")
+    novo = db.salvar_cliente("Bruno", "", "", "", "", "", "", "")
+    db.deletar_cliente(novo)
+    # Sem o que veio da matriz: só as três alterações feitas aqui
+    assert sincronizacao.exportar(str(pasta / "volta.jsonl.gz"), desde=0, par=matriz) == 3
+
+    _abrir(a)
+    res = sincronizacao.importar(str(pasta / "volta.jsonl.gz"))
+    assert (res["par"], res["recebidas"]) == (filial, 3)
+    assert [(nome, status) for nome, status in _clientes().values()] == [("Ana", "Aberto")]
+    # O que chegou entra no registro daqui com a origem original (para uma terceira filial)
+    _, entradas, _ = db.alteracoes_desde(0, excluir_origem=filial)
+    assert len(entradas) == 4
+
+def test_importar_recusa_lacuna_e_o_proprio_arquivo(filiais):
+    a, b, pasta = filiais
+    _abrir(a)
+    sincronizacao.exportar(str(pasta / "parcial.jsonl.gz"), desde=2)
+    with pytest.raises(sincronizacao.ErroSincronizacao, match="próprio|mesma base"):
+        sincronizacao.importar(str(pasta / "parcial.jsonl.gz"))
+    _abrir(b)
+    with pytest.raises(sincronizacao.ErroSincronizacao, match="--desde 0"):
+        sincronizacao.importar(str(pasta / "parcial.jsonl.gz"))
+    assert db.listar_clientes() == []
+
+def test_entradas_ate_a_marca_sao_puladas(banco):
+    id_cliente = db.salvar_cliente("Ana", "", "", "", "", "", "", "")
+    uid = db.conectar().execute("SELECT uid FROM clientes WHERE id = ?", (id_cliente,)).fetchone()[0]
+    entrada = [7, "outra", "clientes", db.ATUALIZADO, uid, json.dumps({"nome": "Ana", "status": "Entregue"})]
+    assert db.aplicar_alteracoes("outra", [entrada], 7) == 1
+    assert db.marca_recebida("outra") == 7
+    entrada[5] = json.dumps({"nome": "Ana", "status": "Cancelado"})
+    assert db.aplicar_alteracoes("outra", [entrada], 7) == 0
+    assert db.obter_cliente(id_cliente)[1] == "Entregue"
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import models.db as db
+
+def _catalogo(*nomes):
+    for nome in nomes:
+        db.salvar_produto(nome, 10.0)
+
+def _usar(nome, vezes):
+    for _ in range(vezes):
+        db.salvar_historico(None, "2024-05-10", json.dumps([[1, nome, 10.0]]), 10.0, "")
+
+def test_prefixo_sem_diferenciar_maiusculas_e_mais_usados_primeiro(banco):
+    _catalogo("Filtro de ar", "filtro de combustível", "Filtro de óleo", "Fluido de freio", "Amortecedor")
+    _usar("filtro de óleo", 3)
+    _usar("Filtro de ar", 1)
+    assert db.sugerir_produtos("FILTRO") == ["Filtro de óleo", "Filtro de ar", "filtro de combustível"]
+    assert db.sugerir_produtos("  fl ") == ["Fluido de freio"]
+    assert db.sugerir_produtos("filtro", limite=2) == ["Filtro de óleo", "Filtro de ar"]
+    assert db.sugerir_produtos("") == [] and db.sugerir_produtos("x") == []
+
+def test_curingas_do_sql_valem_como_texto(banco):
+    _catalogo("Óleo 5W30", "Óleo_sintético", "Óleo%promo")
+    assert db.sugerir_produtos("Óleo_") == ["Óleo_sintético"]
+    assert db.sugerir_produtos("Óleo%") == ["Óleo%promo"]
+
+def test_busca_por_faixa_no_indice(banco):
+    plano = " ".join(str(linha) for linha in db.conectar().execute(
+        "EXPLAIN QUERY PLAN SELECT nome FROM produtos WHERE nome >= ? COLLATE NOCASE AND nome < ? COLLATE NOCASE",
+        ("fil", "fil\U0010ffff")))
+    assert "idx_produtos_nome" in plano and "SCAN" not in plano
+
+# --- MODELO DO QCOMPLETER ---
+@pytest.fixture
+def modelo(qapp, banco):
+    import main
+    m = main.ModeloSugestoes()
+    yield m
+    main.notificador().alterado.disconnect(m._alterado)
+
+def test_modelo_consulta_uma_vez_por_prefixo(modelo, esperar, monkeypatch):
+    _catalogo("Vela de ignição", "Velocímetro")
+    consultas = []
+    original = db.sugerir_produtos
+
+    def contar(prefixo, limite):
+        consultas.append(prefixo)
+        return original(prefixo, limite)
+    monkeypatch.setattr(db, "sugerir_produtos", contar)
+    modelo.buscar("vel")
+    esperar(lambda: modelo.stringList() == ["Vela de ignição", "Velocímetro"])
+    modelo.buscar("velo")
+    esperar(lambda: modelo.stringList() == ["Velocímetro"])
+    modelo.buscar("vel")
+    assert modelo.stringList() == ["Vela de ignição", "Velocímetro"]
+    assert consultas == ["vel", "velo"]
+
+    # Produto novo limpa o cache
+    db.salvar_produto("Velas (jogo)", 80.0)
+    modelo.buscar("vel")
+    esperar(lambda: len(modelo.stringList()) == 3)
+    assert consultas == ["vel", "velo", "vel"]
+
+def test_resposta_de_prefixo_antigo_nao_troca_a_lista(modelo, esperar):
+    _catalogo("Pastilha de freio", "Palheta")
+    modelo.buscar("pa")
+    modelo.buscar("pas")
+    esperar(lambda: "pa" in modelo._cache and "pas" in modelo._cache)
+    assert modelo.stringList() == ["Pastilha de freio"]
+    modelo.buscar(" ")
+    assert modelo.stringList() == []
+
+def test_cache_limitado(modelo, esperar, monkeypatch):
+    monkeypatch.setattr(modelo, "TAMANHO_CACHE", 3)
+    for prefixo in ("a", "b", "c", "d"):
+        modelo.buscar(prefixo)
+    esperar(lambda: "d" in modelo._cache)
+    assert list(modelo._cache) == ["b", "c", "d"]
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from servicos import diagnostico
+
+@pytest.fixture
+def trabalhador(qapp):
+    import main
+    t = main.TrabalhadorBanco()
+    yield t
+    t.encerrar()
+
+def test_chamadas_numa_unica_thread_em_ordem(trabalhador, esperar):
+    threads, resultados = set(), []
+
+    def tarefa(n):
+        threads.add(threading.current_thread().name)
+        return n * 2
+    for n in range(20):
+        trabalhador.executar(tarefa, n, ao_concluir=resultados.append)
+    assert trabalhador.pendentes() == 20
+    esperar(lambda: trabalhador.pendentes() == 0)
+    assert resultados == [n * 2 for n in range(20)]
+    assert len(threads) == 1 and threading.main_thread().name not in threads
+
+def test_erro_vai_para_ao_falhar(trabalhador, esperar, capsys):
+    erros = []
+
+    def quebrar():
+        raise ValueError("cliente não encontrado")
+    trabalhador.executar(quebrar, ao_concluir=lambda _: erros.append("não deveria"), ao_falhar=erros.append)
+    trabalhador.executar(quebrar)
+    esperar(lambda: trabalhador.pendentes() == 0)
+    assert erros == ["cliente não encontrado"]
+    assert "Erro no banco: cliente não encontrado" in capsys.readouterr().out
+
+def test_janela_fechada_antes_da_resposta(trabalhador, esperar):
+    def janela_destruida(_):
+        raise RuntimeError("wrapped C/C++ object has been deleted")
+    trabalhador.executar(lambda: 1, ao_concluir=janela_destruida)
+    resultados = []
+    trabalhador.executar(lambda: 2, ao_concluir=resultados.append)
+    esperar(lambda: resultados == [2])
+
+def test_interface_nao_espera_o_banco(trabalhador, esperar):
+    liberar = threading.Event()
+    feito = []
+    trabalhador.executar(liberar.wait, 5, ao_concluir=feito.append)
+    # executar() já voltou com o banco ainda ocupado
+    assert feito == [] and trabalhador.pendentes() == 1
+    liberar.set()
+    esperar(lambda: feito == [True])
+
+def test_resposta_medida_ate_o_retorno(trabalhador, esperar):
+    def resumo_lento():
+        time.sleep(0.05)
+        return 1
+    diagnostico.limpar()
+    diagnostico.ativar()
+    try:
+        # O tempo vai da chamada até o fim do ao_concluir, não só até entrar na fila
+        trabalhador.executar(resumo_lento, ao_concluir=lambda _: time.sleep(0.05))
+        esperar(lambda: trabalhador.pendentes() == 0)
+    finally:
+        diagnostico.desativar()
+    medida, = [e for e in diagnostico.resumo() if e["tipo"] == diagnostico.RESPOSTA]
+    assert medida["nome"] == "resumo_lento" and medida["total_ms"] >= 100